@@ -0,0 +1,82 @@
+"""Benchmarks for both servers, with the emulated sticks, phone and camera they drive.
+
+Run from a server:  python python_server.py --bench <name> [key=value ...] [--out runs.jsonl]
+(prints one JSON document to stdout). The suite measures whichever server module
+it is given: use() points every bench module's `srv` at it, the way the tests
+load a server.
+"""
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import time
+
+srv = None  # The server module being measured; use() sets it
+BENCHMARKS = {}
+
+def benchmark(name):
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+def use(server):
+    """Measure `server` from now on, in every bench module."""
+    global srv
+    srv = server
+    for module in (emulators, audio, network, vision, pipeline): module.srv = server
+    return server
+
+def load_server(path):
+    """The server module at `path`: the one already running when there is one, else a fresh import.
+
+    Spawned emulator processes land here; under `--bench` their parent's script
+    is already loaded as __mp_main__.
+    """
+    path = os.path.abspath(path)
+    for module in list(sys.modules.values()):
+        if os.path.abspath(getattr(module, "__file__", None) or "") == path: return module
+    name = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+def run_benchmark(name, params=None, out=None, json_out=None):
+    params = params or {}
+    if name not in BENCHMARKS:
+        print(f" [BENCH] Unknown benchmark '{name}'. Available: {', '.join(sorted(BENCHMARKS))}")
+        return
+    result = {"benchmark": name, "server": os.path.basename(srv.__file__), "commit": git_commit(),
+              "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "params": params}
+    result.update(BENCHMARKS[name](**params))
+    print(json.dumps(result, indent=2), file=json_out or sys.stdout, flush=True)
+    if out:  # One JSON object per line, so runs from every commit can be collected into one file
+        with open(out, "a") as f: f.write(json.dumps(result) + "\n")
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+                              cwd=os.path.dirname(os.path.abspath(srv.__file__))).stdout.strip() or None
+    except Exception: return None
+
+def parse_bench_args(args):
+    """["seconds=5", "source=phone", "--out", "runs.jsonl"] -> (params, out). Values are JSON when they parse."""
+    params, out = {}, None
+    it = iter(args)
+    for arg in it:
+        if arg == "--out": out = next(it, None)
+        elif "=" in arg:
+            key, value = arg.split("=", 1)
+            try: params[key] = json.loads(value)
+            except ValueError: params[key] = value
+    return params, out
+
+def main(server, args, json_out=None):
+    """`--bench <name> [key=value ...] [--out runs.jsonl]` for `server`; args start at the name."""
+    use(server)
+    run_benchmark(args[0], *parse_bench_args(args[1:]), json_out=json_out)
+
+from bench import emulators, audio, network, vision, pipeline  # Registers the benchmarks
@@ -0,0 +1,158 @@
+"""Mixer, voice allocation and sample kit benchmarks."""
+import collections
+import json
+import os
+import time
+import wave
+
+import numpy as np
+import pygame
+
+from bench import benchmark
+
+srv = None  # The server module being measured; bench.use() sets it
+
+@benchmark("mixer")
+def bench_mixer(blocks=2000, voice_counts=(1, 4, 8, 16, 32, 64)):
+    """Callback CPU time of the NumPy mixer vs. number of simultaneously ringing voices."""
+    budget_us = srv.MIXER_BLOCK / srv.SAMPLE_RATE * 1e6
+    noise = (np.random.default_rng(0).standard_normal((srv.SAMPLE_RATE * 4, 2)) * 0.1).astype(np.float32)
+    results = {"block_frames": srv.MIXER_BLOCK, "budget_us": round(budget_us, 1), "voices": {}}
+    for n in voice_counts:
+        engine = srv.NumpyMixerEngine(files={}, sink=srv.NullSink(realtime=False), max_voices=n)
+        engine.sink.stop()
+        engine.add_sample("BENCH", noise)
+        engine.callback_time = srv.LatencyHistogram()
+        for i in range(blocks):
+            while engine.active_voices() + len(engine.pending) < n: engine.play("BENCH", 0.5)
+            engine.render()
+        summary = engine.callback_time.summary()
+        summary["p99_budget_pct"] = round(summary["p99_ms"] * 1000 / budget_us * 100, 1)
+        results["voices"][n] = summary
+    return results
+
+@benchmark("voices")
+def bench_voices(seconds=30.0, rate=40.0, engine="numpy"):
+    """Stress: `rate` hits/s spread evenly over all six drums, with cymbals ringing for seconds.
+
+    "numpy" renders block by block in simulated time; "pygame" plays the same
+    hits in real time on SDL's channels. No hit may be dropped, and kick /
+    snare voices should only be cut by hits of the same priority.
+    `legacy_pool_drops` is what one shared pool with Sound.play() dropped.
+    """
+    if engine == "numpy":
+        eng = srv.NumpyMixerEngine(files={}, sink=srv.NullSink(realtime=False))
+        eng.sink.stop()
+    else: eng = srv.PygameAudioEngine(files={})
+    lengths = {"KICK": 0.6, "SNARE": 0.5, "HI-HAT": 0.4, "FLOOR TOM": 1.0, "CRASH": 4.0, "RIDE": 3.0}
+    rng = np.random.default_rng(0)
+    samples = {}
+    for zone, sec in lengths.items():
+        data = srv.load_sample(srv.SOUND_FILES[zone]) if os.path.exists(srv.SOUND_FILES[zone]) else None
+        if data is None:  # Decaying noise as long as a typical sample
+            n = int(sec * srv.SAMPLE_RATE)
+            data = (rng.standard_normal((n, 2)) * 0.1 * np.exp(-np.linspace(0, 5, n))[:, None]).astype(np.float32)
+        samples[zone] = data
+        if engine == "numpy": eng.add_sample(zone, data)
+        else:
+            eng.kit.set(zone, [pygame.sndarray.make_sound(np.ascontiguousarray(data * 32767.0, dtype=np.int16))])
+            eng.set_kit(eng.kit)
+    zones = list(samples)
+    hits = [(i / rate, zones[int(rng.integers(len(zones)))]) for i in range(int(seconds * rate))]
+
+    ringing, legacy_drops = [], 0
+    for t, zone in hits:
+        ringing = [end for end in ringing if end > t]
+        if len(ringing) < srv.MAX_VOICES: ringing.append(t + len(samples[zone]) / srv.SAMPLE_RATE)
+        else: legacy_drops += 1
+
+    steals, allocate = collections.Counter(), eng.voices.allocate
+    def tracked(zone, busy):  # Counts (thief, victim) for every stolen voice
+        held = list(eng.voices.zone)
+        v, stop = allocate(zone, busy)
+        if v is not None and stop and stop[-1] == v: steals[(zone, held[v])] += 1
+        return v, stop
+    eng.voices.allocate = tracked
+
+    if engine == "numpy":
+        t, i, block_s = 0.0, 0, srv.MIXER_BLOCK / srv.SAMPLE_RATE
+        while i < len(hits):
+            while i < len(hits) and hits[i][0] <= t:
+                eng.play(hits[i][1])
+                i += 1
+            eng.render()
+            t += block_s
+    else:
+        t0 = time.perf_counter()
+        for t, zone in hits:
+            delay = t0 + t - time.perf_counter()
+            if delay > 0: time.sleep(delay)
+            eng.play(zone)
+    snap = eng.voices.stats.snapshot()
+    per_zone = lambda outcome: {zone: snap.get((outcome, zone), 0) for zone in zones}
+    return {"engine": engine, "hits": len(hits), "hits_per_s": rate, "voices": srv.MAX_VOICES,
+            **eng.voices.stats.totals(), "stolen_from": per_zone("stolen"), "choked_by": per_zone("choked"),
+            "kick_snare_cut_by_lower_priority": sum(n for (thief, victim), n in steals.items() if victim in ("KICK", "SNARE")
+                                                    and srv.VOICE_GROUPS[thief][1] < srv.VOICE_GROUPS[victim][1]),
+            "legacy_pool_drops": legacy_drops}
+
+def write_bench_kit(root, name, drums, layers, takes, seconds, src_rate, rng):
+    """A kit.json with `layers` velocity layers of `takes` round-robin mono WAVs per drum."""
+    os.makedirs(os.path.join(root, name), exist_ok=True)
+    n = int(seconds * src_rate)
+    envelope = np.exp(-np.linspace(0, 5, n))
+    zones = {}
+    for d in range(drums):
+        zone = f"PAD {d + 1}"
+        zones[zone] = []
+        for layer in range(layers):
+            files = []
+            for take in range(takes):
+                files.append(f"{d}_{layer}_{take}.wav")
+                pcm = (rng.standard_normal(n) * 3000 * (layer + 1) * envelope).astype("<i2")
+                with wave.open(os.path.join(root, name, files[-1]), "wb") as w:
+                    w.setnchannels(1); w.setsampwidth(2); w.setframerate(src_rate)
+                    w.writeframes(pcm.tobytes())
+            zones[zone].append({"max_velocity": (layer + 1) / layers, "samples": files})
+    path = os.path.join(root, name, "kit.json")
+    with open(path, "w") as f: json.dump({"name": name, "zones": zones}, f)
+    return path
+
+@benchmark("kits")
+def bench_kits(drums=6, layers=2, takes=4, seconds=1.5, src_rate=48000, hit_rate=200):
+    """Kit load: WAV parse + resample every start vs. first conversion vs. mapping the cache;
+    then hit and mixer timing while a second, uncached kit loads and swaps in the background."""
+    import tempfile
+    saved, rng = srv.SAMPLE_CACHE_DIR, np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as root:
+        srv.SAMPLE_CACHE_DIR = os.path.join(root, "cache")
+        try:
+            kits = [write_bench_kit(root, name, drums, layers, takes, seconds, src_rate, rng) for name in ("one", "two")]
+            name, spec = srv.read_kit(kits[0])
+            timings = {}
+            for stage, load in (("wav_parse", srv.load_sample), ("cache_convert", srv.cached_sample), ("cache_map", srv.cached_sample)):
+                t0 = time.perf_counter()
+                srv.build_kit(name, spec, load)
+                timings[stage] = round((time.perf_counter() - t0) * 1000, 1)
+
+            engine = srv.NumpyMixerEngine(files={}, sink=srv.NullSink(realtime=False))
+            engine.sink.stop()
+            engine.set_kit(srv.build_kit(name, spec, engine.native_sample))
+            zones = list(spec)
+            play_time, render_time = srv.LatencyHistogram(), srv.LatencyHistogram()
+            loader = srv.load_kit_async(engine, kits[1])
+            hits = failed = 0
+            while loader.is_alive() or hits < hit_rate:
+                t0 = time.perf_counter()
+                failed += not engine.play(zones[hits % len(zones)], float(rng.random()))
+                play_time.add(time.perf_counter() - t0)
+                hits += 1
+                t0 = time.perf_counter()
+                engine.render()
+                render_time.add(time.perf_counter() - t0)
+                time.sleep(1 / hit_rate)
+        finally:
+            srv.SAMPLE_CACHE_DIR = saved
+    return {"files": drums * layers * takes, "seconds_per_file": seconds, "source_rate": src_rate,
+            "kit_load_ms": timings, "hits_during_swap": hits, "failed_hits": failed, "kit_after": engine.kit.name,
+            "play": play_time.summary(), "render": render_time.summary()}
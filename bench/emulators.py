@@ -0,0 +1,225 @@
+"""Stand-ins for the hardware, so the whole pipeline can be measured on one machine.
+
+stick_emulator_main and phone_emulator_main run in spawned processes; they are
+handed the server's path and load it there.
+"""
+import base64
+import collections
+import os
+import socket
+import struct
+import threading
+import time
+
+import numpy as np
+
+from bench import load_server, use
+
+srv = None  # The server module being measured; bench.use() sets it
+
+STICK_PATTERNS = {
+    # name: ([(stick, hits per second, phase offset s)], hits per burst, gap inside a burst s)
+    "roll": ([("LEFT", 15.0, 0.0), ("RIGHT", 15.0, 1 / 30.0), ("KICK", 4.0, 0.0)], 1, 0.0),  # 30 Hz alternating roll
+    "double-roll": ([("LEFT", 30.0, 0.0), ("RIGHT", 30.0, 1 / 60.0), ("KICK", 4.0, 0.0)], 1, 0.0),
+    "flams": ([("LEFT", 4.0, 0.0), ("RIGHT", 4.0, 0.125)], 2, 0.015),
+}
+
+class StickEmulator:
+    """Virtual ESP32 sticks: binary v1 hit packets over UDP on a STICK_PATTERNS schedule.
+
+    `delay_ms` plus a gamma-distributed extra averaging `jitter_ms` holds back
+    every packet in both directions, like a busy Wi-Fi link, and `loss` drops
+    each datagram with that probability. Every hit goes out `repeats` times,
+    `repeat_gap_us` apart, under the stick's next sequence number. With `sync`
+    each stick also runs the firmware's clock pings. The stick clock counts
+    from start(), `drift_ppm` fast.
+    """
+    def __init__(self, port=None, pattern="roll", host="127.0.0.1", delay_ms=0.0, jitter_ms=0.0,
+                 sync=False, drift_ppm=0.0, sync_interval=0.25, loss=0.0, repeats=1, repeat_gap_us=300.0):
+        self.streams, self.burst, self.burst_gap = STICK_PATTERNS[pattern]
+        self.addr = (host, port or srv.UDP_HIT_PORT)
+        self.delay_ms, self.jitter_ms, self.drift = delay_ms, jitter_ms, drift_ppm * 1e-6
+        self.sync, self.sync_interval = sync, sync_interval
+        self.loss, self.repeats, self.repeat_gap = loss, repeats, repeat_gap_us / 1e6
+        self.sent = collections.Counter()
+        self.lost = collections.Counter()  # Hits none of whose copies got through
+        self.link = srv.TimerQueue()
+        self.running = False
+
+    def clock_us(self): return int((time.time() - self.t0) * (1.0 + self.drift) * 1e6)
+
+    def latency(self, rng):
+        extra = rng.gamma(2.0, self.jitter_ms / 2.0) if self.jitter_ms else 0.0
+        return (self.delay_ms + extra) / 1000.0
+
+    def send(self, packet, rng, after=0.0):
+        """Returns False when the link drops the packet."""
+        if self.loss and rng.random() < self.loss: return False
+        delay = after + self.latency(rng)
+        if delay > 0: self.link.call_at(time.time() + delay, self.tx.sendto, packet, self.addr)
+        else: self.tx.sendto(packet, self.addr)
+        return True
+
+    def start(self):
+        self.running = True
+        self.tx, self.t0 = socket.socket(socket.AF_INET, socket.SOCK_DGRAM), time.time()
+        self.threads = [threading.Thread(target=self.run, daemon=True)]
+        if self.sync: self.threads += [threading.Thread(target=self.run_sync, daemon=True)]
+        for thread in self.threads: thread.start()
+        return self
+
+    def run(self):
+        seq, t0, rng = collections.Counter(), time.time(), np.random.default_rng(1)
+        # Every event: (due time, stick, stream period); bursts are queued as extra events
+        events = [(t0 + phase, stick, 1.0 / hz) for stick, hz, phase in self.streams]
+        while self.running:
+            events.sort(key=lambda e: e[0])
+            due, stick, period = events[0]
+            delay = due - time.time()
+            if delay > 0: time.sleep(delay)
+            seq[stick] += 1
+            packet = srv.HIT_PACKET.pack(srv.HIT_MAGIC, srv.HIT_VERSION, srv.STICK_NAMES.index(stick), seq[stick], self.clock_us(), 30.0)
+            if not sum(self.send(packet, rng, k * self.repeat_gap) for k in range(self.repeats)): self.lost[stick] += 1
+            self.sent[stick] += 1
+            if period is None: events.pop(0)
+            else:
+                events[0] = (due + period, stick, period)
+                events += [(due + self.burst_gap * k, stick, None) for k in range(1, self.burst)]
+
+    def run_sync(self):
+        """Each stick pings every sync_interval, carrying when the reply to its previous ping arrived."""
+        ids = sorted({srv.STICK_NAMES.index(stick) for stick, hz, phase in self.streams})
+        last = {stick_id: (0, 0) for stick_id in ids}  # Stick id -> (seq, stick micros) of the last reply
+        lock, rng = threading.Lock(), np.random.default_rng(2)
+        def arrived(data):
+            magic, version, stick_id, seq, t1_us, t2, t3 = srv.SYNC_PONG.unpack(data)
+            with lock: last[stick_id] = (seq, self.clock_us())
+        def receive():
+            self.tx.settimeout(0.2)
+            back = np.random.default_rng(3)
+            while self.running:
+                try: data = self.tx.recv(64)
+                except OSError: continue
+                if len(data) == srv.SYNC_PONG.size and data[:2] == srv.SYNC_MAGIC:
+                    self.link.call_at(time.time() + self.latency(back), arrived, data)
+        threading.Thread(target=receive, daemon=True).start()
+        seq = 0
+        while self.running:
+            for stick_id in ids:
+                seq += 1
+                with lock: prev_seq, prev_t4 = last[stick_id]
+                self.send(srv.SYNC_PING.pack(srv.SYNC_MAGIC, srv.SYNC_VERSION, stick_id, seq, self.clock_us(), prev_seq, prev_t4), rng)
+            time.sleep(self.sync_interval)
+
+    def true_offset(self):
+        """Our time minus stick time, now (what a perfect sync would report)."""
+        now = time.time()
+        return now - (now - self.t0) * (1.0 + self.drift)
+
+    def stop(self):
+        self.running = False
+        for thread in self.threads: thread.join(1.0)
+        time.sleep((self.delay_ms + 10 * self.jitter_ms) / 1000.0)  # Let delayed packets go out
+        self.tx.close()
+
+def stick_emulator_main(server, port, pattern, ready, go, seconds, result, **link):
+    # Own process, like real sticks: inference holding our GIL must not delay (and then bunch up) sends
+    use(load_server(server))
+    ready.set()
+    go.wait()
+    emulator = StickEmulator(port, pattern, **link).start()
+    time.sleep(seconds)
+    offset = emulator.true_offset()
+    emulator.stop()
+    result.put({"sent": dict(emulator.sent), "true_offset": offset})
+
+def phone_emulator_main(path, server, port, ready, go, seconds, fps, result):
+    """The page, in its own process: enveloped JPEGs as bare WebSocket messages, or as Socket.IO "frame" events.
+
+    `path` is the server module's file and `server` the web server under test.
+    fps=0 sends back to back, paced only by the socket blocking.
+    """
+    use(load_server(path))
+    ok, jpeg = srv.cv2.imencode(".jpg", srv.synthetic_frame(180, 320), [srv.cv2.IMWRITE_JPEG_QUALITY, 50])
+    jpeg = jpeg.tobytes()
+    sock = socket.create_connection(("127.0.0.1", port))
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    rfile, lock = sock.makefile("rb"), threading.Lock()
+    path = "/ws" if server == "asyncio" else "/socket.io/?EIO=4&transport=websocket"
+    sock.sendall(f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                 f"Sec-WebSocket-Key: {base64.b64encode(os.urandom(16)).decode()}\r\nSec-WebSocket-Version: 13\r\n\r\n".encode())
+    while rfile.readline() not in (b"\r\n", b""): pass
+
+    def send(*frames):
+        with lock: sock.sendall(b"".join(srv.ws_frame(payload, opcode, os.urandom(4)) for payload, opcode in frames))
+
+    def read():
+        b0, b1 = rfile.read(2)
+        n = b1 & 0x7F
+        if n == 126: n = struct.unpack("!H", rfile.read(2))[0]
+        elif n == 127: n = struct.unpack("!Q", rfile.read(8))[0]
+        return rfile.read(n)
+
+    if server == "socketio":
+        read()  # Engine.IO open
+        send((b"40", 0x1))  # Socket.IO connect, answered with its own "40"
+        read()
+        def pong():  # Engine.IO pings every ping_interval and drops clients that don't answer
+            try:
+                while True:
+                    if read() == b"2": send((b"3", 0x1))
+            except (OSError, ValueError): pass
+        threading.Thread(target=pong, daemon=True).start()
+    ready.set()
+    go.wait()
+    sent, t0 = 0, time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        sent += 1
+        envelope = srv.PHONE_FRAME_HEADER.pack(srv.PHONE_FRAME_MAGIC, 1, sent, time.time()) + jpeg
+        if server == "asyncio": send((envelope, 0x2))
+        else: send((b'451-["frame",{"_placeholder":true,"num":0}]', 0x1), (envelope, 0x2))
+        if fps: time.sleep(max(0.0, t0 + sent / fps - time.perf_counter()))
+    result.put(sent)
+    sock.close()
+
+class FrameSource:
+    """Stands in for WebcamStream (read / read_timed / stop) at a fixed FPS.
+
+    Frames are the camera and phone frames of a session recording when `path`
+    is given, else one synthetic frame. jpegs() hands the same frames out
+    encoded, for driving the phone path.
+    """
+    def __init__(self, fps=30, path=None, width=640, height=360, arrived=None):
+        self.fps = fps
+        self.arrived = arrived or threading.Event()
+        if path:
+            reader = srv.SessionReader(path)
+            records = [reader[i] for i in range(len(reader))]
+            reader.close()
+            blobs = [srv.parse_phone_frame(p, w)[2] if k == srv.REC_PHONE else p for k, m, w, p in records if k in (srv.REC_CAMERA, srv.REC_PHONE)]
+            self.frames = [f for f in (srv.cv2.imdecode(np.frombuffer(b, np.uint8), srv.cv2.IMREAD_COLOR) for b in blobs) if f is not None]
+        else:
+            self.frames = [srv.synthetic_frame(height, width)]
+        self.latest = (self.frames[0], time.time())
+        self.stopped = False
+
+    def start(self):
+        threading.Thread(target=self.update, daemon=True).start()
+        return self
+
+    def update(self):
+        i, next_t = 0, time.perf_counter()
+        while not self.stopped:
+            next_t += 1.0 / self.fps
+            delay = next_t - time.perf_counter()
+            if delay > 0: time.sleep(delay)
+            i += 1
+            self.latest = (self.frames[i % len(self.frames)], time.time())
+            self.arrived.set()
+
+    def jpegs(self, quality=50):
+        return [srv.cv2.imencode(".jpg", f, [srv.cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes() for f in self.frames]
+
+    def read(self): return self.latest[0]
+    def read_timed(self): return self.latest
+    def stop(self): self.stopped = True
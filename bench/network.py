@@ -0,0 +1,294 @@
+"""Stick hits and phone frames over the network: receive, parse, clock sync, redundancy and ingest."""
+import multiprocessing
+import socket
+import threading
+import time
+
+import numpy as np
+
+from bench import benchmark
+from bench.emulators import StickEmulator, phone_emulator_main, stick_emulator_main
+
+srv = None  # The server module being measured; bench.use() sets it
+
+@benchmark("hit-receiver")
+def bench_hit_receiver(hits=300, spacing=0.01):
+    """Legacy 1 ms poll loop vs selector wake-up (epoll or select(), per platform), same hits through play_sound()."""
+    results = {}
+    for mode in ("poll", "select"):
+        rx_hist, e2e_hist = srv.LatencyHistogram(), srv.LatencyHistogram()
+        sent = {}
+
+        def on_hit(data, t_rx):
+            srv.play_sound("SNARE")
+            done = time.time()
+            rx_hist.add(done - t_rx)
+            seq = int(data.split(b":")[-1])
+            e2e_hist.add(done - sent[seq])
+
+        rx = srv.HitReceiver(on_hit=on_hit, port=0, mode=mode, broadcast=False).start()
+        tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        for seq in range(hits):
+            sent[seq] = time.time()
+            tx.sendto(b"HIT:LEFT:%d" % seq, ("127.0.0.1", rx.port))
+            time.sleep(spacing)
+        time.sleep(0.1)
+        rx.stop(); tx.close()
+        results[mode] = {"receive_to_play": rx_hist.summary(), "send_to_play": e2e_hist.summary()}
+    return results
+
+@benchmark("clock-sync")
+def bench_clock_sync(seconds=10.0, pattern="roll", delay_ms=5.0, jitter_ms=5.0, drift_ppm=40.0,
+                     modes=("immediate", "jitter-buffer")):
+    """Impact-to-sound latency of emulated sticks on a jittery link: play on receipt vs. the jitter buffer.
+
+    The emulator (own process) holds every packet back `delay_ms` plus a
+    gamma-distributed extra averaging `jitter_ms`, both ways, and runs its
+    clock `drift_ppm` fast. Impact-to-sound is taken when the mixer renders a
+    hit's first sample, so the spread includes the mixer's own block timing.
+    Per stick: offset error against the emulator's true clock, ping round trips
+    and one-way hit delays.
+    """
+    saved = srv.audio, srv.hit_latency, srv.hit_clock_latency, srv.HIT_SCHEDULE
+    srv.audio = srv.NumpyMixerEngine(files={}, sink=srv.NullSink(realtime=True))
+    click = (np.random.default_rng(0).standard_normal((srv.SAMPLE_RATE // 10, 2)) * 0.1).astype(np.float32)
+    for zone in srv.SOUND_FILES: srv.audio.add_sample(zone, click)
+    results = {"config": {"seconds": seconds, "pattern": pattern, "delay_ms": delay_ms, "jitter_ms": jitter_ms,
+                          "drift_ppm": drift_ppm, "jitter_target_ms": srv.JITTER_TARGET_MS}}
+    ctx = multiprocessing.get_context("spawn")
+    try:
+        for mode in modes:
+            srv.HIT_SCHEDULE = mode
+            srv.hit_latency, srv.hit_clock_latency = srv.LatencyHistogram(), srv.LatencyHistogram()
+            srv.hit_stats.reset()
+            srv.hit_windows.clear()
+            srv.stick_clocks.clear()
+            for player in srv.players: player.last_hit.clear()
+            rx = srv.HitReceiver(port=0, broadcast=False).start()
+            ready, go, out = ctx.Event(), ctx.Event(), ctx.Queue()
+            sticks = ctx.Process(target=stick_emulator_main, args=(srv.__file__, rx.port, pattern, ready, go, seconds, out),
+                                 daemon=True, kwargs={"delay_ms": delay_ms, "jitter_ms": jitter_ms, "sync": True, "drift_ppm": drift_ppm})
+            sticks.start()
+            ready.wait(60.0)
+            go.set()
+            emulated = out.get(timeout=seconds + 60.0)
+            sticks.join(2.0)
+            rx.stop()
+            time.sleep(srv.JITTER_TARGET_MS / 1000.0 + 0.05)  # Hits still in the jitter buffer start sounding
+            clock_rows = {}
+            for stick, clock in sorted(srv.stick_clocks.items()):
+                error = None if clock.offset is None else round((clock.offset - emulated["true_offset"]) * 1000.0, 3)
+                clock_rows[stick] = {"offset_error_ms": error, "rtt": clock.rtt.summary(), "one_way": clock.one_way.summary()}
+            impact = srv.hit_clock_latency.summary()
+            results[mode] = {"hits": {"sent": sum(emulated["sent"].values()), **srv.hit_stats.totals()},
+                             "impact_to_sound": impact, "impact_to_sound_spread_ms": round(impact["p99_ms"] - impact["p50_ms"], 3),
+                             "receive_to_play": srv.hit_latency.summary(), "sticks": clock_rows}
+    finally:
+        srv.audio.close()
+        srv.audio, srv.hit_latency, srv.hit_clock_latency, srv.HIT_SCHEDULE = saved
+    return results
+
+@benchmark("redundancy")
+def bench_redundancy(seconds=5.0, pattern="roll", losses=(0.0, 0.02, 0.05, 0.1), repeats=(1, 2, 3),
+                     repeat_gap_us=300.0, jitter_ms=1.0):
+    """Emulated sticks on a lossy link sending every hit 1-3 times: hits missed, copies dropped, loss estimates.
+
+    Each datagram is dropped with probability `loss`, and a gamma-distributed
+    delay averaging `jitter_ms` lets copies overtake each other. Missed hits
+    are counted against the emulator's own tally; the loss the server
+    estimated from sequence gaps is checked against the hits whose every copy
+    was dropped.
+    """
+    saved = srv.audio
+    srv.audio = srv.NumpyMixerEngine(files={}, sink=srv.NullSink(realtime=True))
+    click = (np.random.default_rng(0).standard_normal((srv.SAMPLE_RATE // 10, 2)) * 0.1).astype(np.float32)
+    for zone in srv.SOUND_FILES: srv.audio.add_sample(zone, click)
+    results = {"config": {"seconds": seconds, "pattern": pattern, "repeat_gap_us": repeat_gap_us, "jitter_ms": jitter_ms}}
+    try:
+        for loss in losses:
+            rows = results[f"loss_{loss:g}"] = {}
+            for n in repeats:
+                srv.hit_stats.reset()
+                srv.hit_windows.clear()
+                for player in srv.players: player.last_hit.clear()
+                rx = srv.HitReceiver(port=0, broadcast=False).start()
+                sticks = StickEmulator(rx.port, pattern, jitter_ms=jitter_ms, loss=loss, repeats=n,
+                                       repeat_gap_us=repeat_gap_us).start()
+                time.sleep(seconds)
+                sticks.stop()
+                time.sleep(0.05)  # Let the last datagrams land
+                rx.stop()
+                sent, arrived = sum(sticks.sent.values()), sum(w.unique for w in srv.hit_windows.values())
+                rows[f"x{n}"] = {"sent": sent, "missed": sent - arrived, "missed_pct": round(100.0 * (sent - arrived) / max(1, sent), 2),
+                                 "lost_true": sum(sticks.lost.values()), "lost_estimated": sum(w.lost for w in srv.hit_windows.values()),
+                                 "duplicates": sum(w.duplicates for w in srv.hit_windows.values()),
+                                 "reordered": sum(w.reordered for w in srv.hit_windows.values()), "debounced": srv.hit_stats["debounced"],
+                                 "sticks": {stick: w.summary() for stick, w in sorted(srv.hit_windows.items())}}
+    finally:
+        srv.audio.close()
+        srv.audio = saved
+    return results
+
+@benchmark("hit-parse")
+def bench_hit_parse(packets=100000):
+    """Per-packet parse cost (best of 5): legacy text vs. binary v1."""
+    legacy = b"HIT:Right"
+    binary = srv.HIT_PACKET.pack(srv.HIT_MAGIC, srv.HIT_VERSION, 1, 42, 123456789, -30.0)
+    results = {}
+    for name, data in (("legacy_text", legacy), ("binary_v1", binary)):
+        best = float("inf")
+        for _ in range(5):
+            t0 = time.perf_counter()
+            for _ in range(packets): srv.parse_hit(data, 0.0)
+            best = min(best, time.perf_counter() - t0)
+        results[name] = {"ns_per_packet": round(best / packets * 1e9, 1)}
+    return results
+
+@benchmark("phone-decode")
+def bench_phone_decode(frames=300):
+    """Per-frame JPEG decode cost: full size vs. each libjpeg reduction, at two phone sizes."""
+    results = {}
+    for w, h in ((320, 180), (640, 360)):
+        ok, jpeg = srv.cv2.imencode(".jpg", srv.synthetic_frame(h, w), [srv.cv2.IMWRITE_JPEG_QUALITY, 50])
+        buf = np.frombuffer(jpeg.tobytes(), np.uint8)
+        row = {"jpeg_bytes": len(buf)}
+        for name, flag in [("full", srv.cv2.IMREAD_COLOR)] + [(f"reduced_{f}", getattr(srv.cv2, f"IMREAD_REDUCED_COLOR_{f}")) for f in reversed(srv.JPEG_REDUCED_FACTORS)]:
+            t0 = time.perf_counter()
+            for _ in range(frames): img = srv.cv2.imdecode(buf, flag)
+            row[name] = {"ms": round((time.perf_counter() - t0) / frames * 1000.0, 3), "shape": list(img.shape[:2])}
+        results[f"{w}x{h}"] = row
+    return results
+
+@benchmark("phone-frame-age")
+def bench_phone_frame_age(seconds=5.0, phone_fps=30, network_ms=(5.0, 120.0)):
+    """Glass-to-zone age of enveloped phone frames over a jittery link, with stale dropping."""
+    ok, jpeg = srv.cv2.imencode(".jpg", srv.synthetic_frame(180, 320), [srv.cv2.IMWRITE_JPEG_QUALITY, 50])
+    jpeg, player = jpeg.tobytes(), srv.players[0]
+    stop = threading.Event()
+    def phone():
+        seq, rng = 0, np.random.default_rng(1)
+        while not stop.is_set():
+            seq += 1
+            envelope = srv.PHONE_FRAME_HEADER.pack(srv.PHONE_FRAME_MAGIC, 1, seq, time.time()) + jpeg
+            delay = rng.uniform(*network_ms) / 1000.0
+            threading.Timer(delay, srv.h, (envelope, player)).start()
+            time.sleep(1.0 / phone_fps)
+    threading.Thread(target=phone, daemon=True).start()
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        jpeg_in, t_capture = srv.take_phone_jpeg(player)
+        if jpeg_in is None:
+            time.sleep(0.002)
+            continue
+        f, prescale = srv.decode_phone_jpeg(player, jpeg_in)
+        srv.infer_frame(player, f, t_capture, prescale, "phone")
+    stop.set()
+    return {"max_age_ms": srv.PHONE_MAX_FRAME_AGE * 1000.0, "phone": srv.phone_stats.totals(),
+            "age_at_ingest": srv.frame_age_ingest.summary(), "age_at_zone": srv.frame_age_zone.summary()}
+
+@benchmark("stream-adapt")
+def bench_stream_adapt(seconds=20.0, link_kBps=(1000.0, 100.0), modes=("fixed", "adaptive")):
+    """Phone frames over a bandwidth-limited link into the live vision loop: fixed settings vs. the StreamController.
+
+    The emulated page encodes the synthetic frame at the settings it was last
+    sent and paces itself at their fps. The link carries one frame at a time
+    at `link_kBps` plus 5 ms, so frames queue behind each other when it is
+    too slow. Per run: glass-to-zone age and rate of the phone frames
+    inferred, frames dropped as stale or superseded, and the stream changes.
+    """
+    saved = srv.ADAPTIVE_STREAM, srv.frame_age_zone, srv.players[0].stream
+    player, frame, link = srv.players[0], srv.synthetic_frame(), srv.TimerQueue()
+    results = {"config": {"seconds": seconds, "start": srv.STREAM_LEVELS[srv.STREAM_START_LEVEL], "age_budget_ms": srv.STREAM_AGE_BUDGET_MS}}
+
+    def page(settings, rate, stop):
+        seq, free, next_t = 0, time.time(), time.perf_counter()
+        deliver = lambda envelope: None if stop.is_set() else srv.h(envelope, player)
+        while not stop.is_set():
+            width, height, quality, fps = settings["width"], settings["height"], settings["quality"], settings["fps"]
+            small = srv.cv2.resize(frame, (width, height), interpolation=srv.cv2.INTER_AREA)
+            t = time.time()
+            seq += 1
+            envelope = srv.PHONE_FRAME_HEADER.pack(srv.PHONE_FRAME_MAGIC, 1, seq, t) + srv.cv2.imencode(
+                ".jpg", small, [srv.cv2.IMWRITE_JPEG_QUALITY, int(quality * 100)])[1].tobytes()
+            free = max(free, t) + len(envelope) / (rate * 1000.0)
+            link.call_at(free + 0.005, deliver, envelope)
+            next_t += 1.0 / fps
+            time.sleep(max(0.0, next_t - time.perf_counter()))
+
+    try:
+        for rate in link_kBps:
+            rows = results[f"{rate:g}_kBps"] = {}
+            for mode in modes:
+                srv.ADAPTIVE_STREAM = mode == "adaptive"
+                srv.frame_age_zone = srv.LatencyHistogram()
+                srv.phone_stats.reset()
+                player.stream = srv.StreamController(player.name)
+                settings = player.stream.settings()
+                player.stream.send = settings.update  # The page applies new settings from its next frame
+                stop = threading.Event()
+                threading.Thread(target=srv.vision_loop, args=(player, None, stop), daemon=True).start()
+                threading.Thread(target=page, args=(settings, rate, stop), daemon=True).start()
+                time.sleep(seconds)
+                stop.set()
+                time.sleep(0.2)
+                rows[mode] = {"glass_to_zone": srv.frame_age_zone.summary(),
+                              "inferred_fps": round(srv.phone_stats["processed"] / seconds, 1),
+                              "dropped": srv.phone_stats["stale"] + srv.phone_stats["discarded"], "stream": player.stream.status()}
+    finally:
+        srv.ADAPTIVE_STREAM, srv.frame_age_zone, srv.players[0].stream = saved
+    return results
+
+@benchmark("web-ingest")
+def bench_web_ingest(seconds=5.0, fps=(30, 0), servers=("socketio", "asyncio")):
+    """Phone frames into h(): socketio.run() vs. IngestServer, from a page emulated in its own process.
+
+    fps=0 sends frames back to back. Per run: frames ingested per second,
+    this process's CPU per ingested frame and send-to-ingest latency, all
+    within the run, then how many queued frames were still ingested after it.
+    The Socket.IO server has no clean stop, so it is left running.
+    """
+    saved = srv.frame_age_ingest
+    results = {"config": {"seconds": seconds, "jpeg": "320x180 q50"}}
+    ctx = multiprocessing.get_context("spawn")
+    try:
+        for server in servers:
+            if server == "asyncio":
+                ingest = srv.IngestServer(host="127.0.0.1", port=0).start()
+                port = ingest.port
+            else:
+                probe = socket.socket()
+                probe.bind(("127.0.0.1", 0))
+                port = probe.getsockname()[1]
+                probe.close()
+                threading.Thread(target=srv.run_web, args=(port, server), daemon=True).start()
+                for _ in range(100):
+                    try: socket.create_connection(("127.0.0.1", port), 0.1).close(); break
+                    except OSError: time.sleep(0.1)
+            rows = results[server] = {}
+            for rate in fps:
+                srv.frame_age_ingest = srv.LatencyHistogram()
+                ready, go, out = ctx.Event(), ctx.Event(), ctx.Queue()
+                phone = ctx.Process(target=phone_emulator_main, args=(srv.__file__, server, port, ready, go, seconds, rate, out), daemon=True)
+                phone.start()
+                ready.wait(60.0)
+                received0, cpu0, t0 = srv.phone_stats["received"], time.process_time(), time.perf_counter()
+                go.set()
+                time.sleep(seconds)
+                received = srv.phone_stats["received"] - received0
+                cpu, elapsed = time.process_time() - cpu0, time.perf_counter() - t0
+                latency = srv.frame_age_ingest.summary()
+                sent = out.get(timeout=60.0)
+                phone.join(2.0)
+                backlog, quiet = srv.phone_stats["received"], 0
+                while quiet < 20:  # A server that fell behind works through its backlog (until 2 s without a frame)
+                    time.sleep(0.1)
+                    quiet = quiet + 1 if srv.phone_stats["received"] == backlog else 0
+                    backlog = srv.phone_stats["received"]
+                rows[f"{rate}fps" if rate else "unpaced"] = {
+                    "sent": sent, "ingested": received, "ingested_late": backlog - received0 - received,
+                    "fps": round(received / elapsed, 1), "cpu_ms_per_frame": round(cpu * 1000.0 / max(1, received), 3),
+                    "latency": latency}
+            if server == "asyncio": ingest.stop()
+    finally:
+        srv.frame_age_ingest = saved
+    return results
@@ -0,0 +1,230 @@
+"""Whole-server benchmarks: startup, UI, session replay, several players and camera-to-sound end to end."""
+import math
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+import numpy as np
+import pygame
+
+from bench import benchmark
+from bench.emulators import FrameSource, stick_emulator_main
+
+srv = None  # The server module being measured; bench.use() sets it
+
+@benchmark("players")
+def bench_players(seconds=6.0, counts=(1, 2, 3, 4), fps=30, hit_rate=20, modes=("inline", "process")):
+    """Pose throughput and hit latency as drummers are added: one emulated camera and two sticks per player.
+
+    "inline" runs every player's pose on its own thread in this process;
+    "process" spreads the players over the worker pool (INFERENCE_WORKERS).
+    """
+    saved = srv.audio, srv.hit_latency, srv.players
+    srv.audio = srv.NumpyMixerEngine(files={}, sink=srv.NullSink(realtime=True))
+    click = (np.random.default_rng(0).standard_normal((srv.SAMPLE_RATE // 10, 2)) * 0.1).astype(np.float32)
+    for zone in srv.SOUND_FILES: srv.audio.add_sample(zone, click)
+    results = {"cores": os.cpu_count(), "fps_per_player": fps, "hits_per_s_per_stick": hit_rate, "modes": {}}
+    try:
+        for mode in modes:
+            rows = results["modes"][mode] = {}
+            for n in counts:
+                group = [srv.PlayerSession(f"P{i + 1}", {3 * i: "LEFT", 3 * i + 1: "RIGHT", 3 * i + 2: "KICK"}) for i in range(n)]
+                srv.set_players(group)
+                if mode == "process": srv.start_inference_pool(group, wait=True)
+                workers = len(srv.inference_pool)
+                srv.hit_latency = srv.LatencyHistogram()
+                srv.hit_stats.reset(); srv.player_stats.reset()
+                srv.hit_windows.clear()
+                rx = srv.HitReceiver(port=0, broadcast=False).start()
+                stop = threading.Event()
+                cams = [FrameSource(fps=fps, arrived=player.arrived["camera"]).start() for player in group]
+                for player, cam in zip(group, cams):
+                    threading.Thread(target=srv.vision_loop, args=(player, cam, stop), daemon=True).start()
+                def sticks():
+                    tx, seq, next_t = socket.socket(socket.AF_INET, socket.SOCK_DGRAM), 0, time.perf_counter()
+                    while not stop.is_set():
+                        seq += 1
+                        for stick_id in [3 * i + arm for i in range(n) for arm in (0, 1)]:
+                            tx.sendto(srv.HIT_PACKET.pack(srv.HIT_MAGIC, srv.HIT_VERSION, stick_id, seq, 0, srv.IMPACT_HARD), ("127.0.0.1", rx.port))
+                        next_t += 1.0 / hit_rate
+                        delay = next_t - time.perf_counter()
+                        if delay > 0: time.sleep(delay)
+                    tx.close()
+                threading.Thread(target=sticks, daemon=True).start()
+                time.sleep(seconds)
+                stop.set()
+                for cam in cams: cam.stop()
+                time.sleep(0.05)  # Let the last datagrams land
+                rx.stop()
+                srv.stop_inference_pool()
+                frames = srv.player_stats.snapshot()
+                per_player = [round(frames.get(("frames", player.name), 0) / seconds, 1) for player in group]
+                rows[n] = {"workers": workers, "pose_fps_per_player": per_player, "pose_fps_total": round(sum(per_player), 1),
+                           "hits_played": srv.hit_stats["played"], "hit_latency": srv.hit_latency.summary()}
+    finally:
+        srv.audio.close()
+        srv.audio, srv.hit_latency, saved_players = saved
+        srv.set_players(saved_players)
+    return results
+
+@benchmark("startup")
+def bench_startup():
+    """Startup timeline: module import, then the (normally background) vision and web warm-up."""
+    imported = dict(srv.startup_timeline)
+    srv.warm_up_vision()
+    return {"module_import_s": round(imported["module"], 3),
+            "timeline_s": {stage: round(t, 3) for stage, t in srv.startup_timeline},
+            "web_routes": sorted(r.rule for r in srv.create_web_app().url_map.iter_rules())}
+
+@benchmark("ui")
+def bench_ui(passes=600):
+    """Control panel cost per pass: full repaint with uncached text and a whole-window flip, vs. changed regions only.
+
+    One slider moves every pass, as while dragging it; the rest of the panel is static.
+    """
+    screen = pygame.display.set_mode((700, 450))
+    saved, results = srv.volumes["SNARE"], {}
+    for name, regions in (("full_repaint", False), ("changed_regions", True)):
+        panel = srv.ControlPanel(screen, "127.0.0.1", cache_text=regions)
+        hist = srv.LatencyHistogram()
+        for i in range(passes):
+            srv.volumes["SNARE"] = (i % 100) / 100.0
+            t0 = time.perf_counter()
+            if not regions: panel.page = None  # Repaints everything, as the old loop did
+            panel.draw("MIXER", "MOBILE", True)
+            if regions: panel.flush()
+            else:
+                panel.dirty = []
+                pygame.display.flip()
+            hist.add(time.perf_counter() - t0)
+        results[name] = hist.summary()
+    srv.volumes["SNARE"] = saved
+    return results
+
+def record_synthetic_session(path, seconds=10.0, rate=30, hit_rate=4, camera_fps=1):
+    """Writes a synthetic session to `path`. Returns {wall-clock time: true zone} for its pose packets and hits.
+
+    The left arm sweeps the kit in phone pose packets, the right arm stays on the
+    snare, the left stick hits at `hit_rate` and `camera_fps` camera frames a
+    second are mixed in (0 = none, so replaying needs no pose model).
+    """
+    tip = lambda t: (0.5 + 0.35 * math.cos(math.pi / 2 * t), 0.5 + 0.35 * math.sin(math.pi / 2 * t))
+    rec, expected, t_base = srv.SessionRecorder(path), {}, 1000.0
+    frame = srv.synthetic_frame()
+    for i in range(int(seconds * rate)):
+        t = i / rate
+        # Tip = wrist + (wrist - elbow) * STICK_EXTENSION, in the mirrored frame; packets carry unmirrored x
+        (tip_x, tip_y), (ex, ey) = tip(t), (0.5, 0.9)
+        wx, wy = (tip_x + ex * srv.STICK_EXTENSION) / (1 + srv.STICK_EXTENSION), (tip_y + ey * srv.STICK_EXTENSION) / (1 + srv.STICK_EXTENSION)
+        rec.add(srv.REC_POSE, t_base + t + 0.02, srv.PHONE_POSE_PACKET.pack(
+            srv.PHONE_POSE_MAGIC, 1, i, t_base + t, 1.0 - ex, ey, 1.0, 1.0 - wx, wy, 1.0, 0.5, 0.9, 1.0, 0.55, 0.75, 1.0))
+        expected[round(t_base + t, 6)] = srv.get_drum_zone(tip_x, tip_y)
+        if i % int(rate / hit_rate) == 0:
+            t_hit = t + 0.5 / rate
+            rec.add(srv.REC_HIT, t_base + t_hit, srv.HIT_PACKET.pack(srv.HIT_MAGIC, srv.HIT_VERSION, 0, i, int(t_hit * 1e6), 30.0))
+            expected[round(t_base + t_hit, 6)] = srv.get_drum_zone(*tip(t_hit))
+        if camera_fps and i % int(rate / camera_fps) == 0: rec.add(srv.REC_CAMERA, t_base + t, frame)
+    rec.close()
+    return expected
+
+@benchmark("session-replay")
+def bench_session_replay(seconds=10.0, rate=30, hit_rate=4, camera_fps=1):
+    """Records a synthetic session, replays it twice: determinism, zone agreement, stage costs.
+
+    Zones are checked against the tip the landmarks were generated from.
+    """
+    import tempfile
+    with tempfile.TemporaryDirectory() as root:  # Removed even when a replay fails
+        path = os.path.join(root, "session_replay.sdr")
+        expected = record_synthetic_session(path, seconds, rate, hit_rate, camera_fps)
+        runs = [srv.replay_session(path) for _ in range(2)]
+
+    decisions = runs[0]["decisions"]
+    # The filter lags the true tip, so a few packets around each zone border disagree
+    pose = [(expected[t], left) for kind, t, left, right in decisions if kind == srv.REC_POSE]
+    hits = [(expected[t], zone) for kind, t, stick, zone in decisions if kind == srv.REC_HIT]
+    return {"records": runs[0]["records"], "deterministic": runs[0]["digest"] == runs[1]["digest"],
+            "digest": runs[0]["digest"],
+            "left_zone_agreement": round(sum(a == b for a, b in pose) / max(1, len(pose)), 3),
+            "hit_zone_agreement": round(sum(a == b for a, b in hits) / max(1, len(hits)), 3),
+            "right_zones": sorted({right for kind, t, left, right in decisions if kind == srv.REC_POSE}),
+            "stages": runs[1]["stages"]}
+
+@benchmark("e2e")
+def bench_e2e(seconds=10.0, pattern="roll", source="camera", fps=30, session=None, inference=None):
+    """Whole pipeline on one machine: emulated sticks, emulated camera or phone, null audio.
+
+    source="camera" drives the WebcamStream path, source="phone" sends frame
+    envelopes through the Socket.IO handler. `session` replays the frames of a
+    recording instead of a synthetic one. `inference` defaults to the server's INFERENCE_MODE.
+    """
+    inference = inference or srv.INFERENCE_MODE
+    saved = srv.audio, srv.hit_latency, srv.frame_age_ingest, srv.frame_age_zone
+    srv.audio = srv.NumpyMixerEngine(files={}, sink=srv.NullSink(realtime=True))
+    click = (np.random.default_rng(0).standard_normal((srv.SAMPLE_RATE // 10, 2)) * 0.1).astype(np.float32)
+    for zone in srv.SOUND_FILES: srv.audio.add_sample(zone, click)
+    srv.hit_latency, srv.frame_age_ingest, srv.frame_age_zone = srv.LatencyHistogram(), srv.LatencyHistogram(), srv.LatencyHistogram()
+    srv.hit_stats.reset()
+    srv.hit_windows.clear()
+    player = srv.players[0]
+    player.last_hit.clear()
+
+    if inference == "process": srv.start_inference_pool([player], wait=True)
+    try: rx = srv.HitReceiver(broadcast=False).start()
+    except OSError: rx = srv.HitReceiver(port=0, broadcast=False).start()  # A live server already owns the port
+    ctx = multiprocessing.get_context("spawn")
+    ready, go, sent = ctx.Event(), ctx.Event(), ctx.Queue()
+    sticks = ctx.Process(target=stick_emulator_main, args=(srv.__file__, rx.port, pattern, ready, go, seconds, sent), daemon=True)
+    sticks.start()
+    ready.wait(60.0)
+    cam = FrameSource(fps=fps, path=session).start()
+    go.set()
+    stop = threading.Event()
+    if source == "phone":
+        def phone():
+            seq, jpegs = 0, cam.jpegs()
+            while not stop.is_set():
+                seq += 1
+                srv.h(srv.PHONE_FRAME_HEADER.pack(srv.PHONE_FRAME_MAGIC, 1, seq, time.time()) + jpegs[seq % len(jpegs)], player)
+                time.sleep(1.0 / fps)
+        threading.Thread(target=phone, daemon=True).start()
+
+    frames, last_t, done0 = 0, None, player.worker.frames_done(player) if player.worker else 0
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        if source == "phone":
+            jpeg, t_frame = srv.take_phone_jpeg(player)
+            frame, prescale = srv.decode_phone_jpeg(player, jpeg) if jpeg is not None else (None, 1.0)
+        else:
+            (frame, t_frame), prescale = cam.read_timed(), 1.0
+            if t_frame == last_t: frame = None
+        if frame is None:
+            time.sleep(0.001)
+            continue
+        last_t = t_frame
+        srv.infer_frame(player, frame, t_frame, prescale, source)
+        frames += 1
+    elapsed = time.perf_counter() - t0
+    if player.worker: frames = player.worker.frames_done(player) - done0
+
+    stop.set(); cam.stop()
+    sent = sent.get(timeout=10.0)["sent"]
+    sticks.join(2.0)
+    time.sleep(0.05)  # Let the last datagrams land
+    rx.stop()
+    srv.stop_inference_pool()
+    result = {
+        "config": {"seconds": seconds, "pattern": pattern, "source": source, "fps": fps,
+                   "session": session, "inference": inference, "debounce_ms": srv.DEBOUNCE_TIME * 1000.0},
+        "hits": {"sent": sum(sent.values()), "sent_per_stick": sent,
+                 "dropped": sum(sent.values()) - srv.hit_stats["received"], **srv.hit_stats.totals()},
+        "hit_latency": srv.hit_latency.summary(),
+        "frame_to_zone": srv.frame_age_zone.summary(),
+        "inference_fps": round(frames / elapsed, 1),
+    }
+    if source == "phone": result["phone_frame_age_at_ingest"] = srv.frame_age_ingest.summary()
+    srv.audio.close()
+    srv.audio, srv.hit_latency, srv.frame_age_ingest, srv.frame_age_zone = saved
+    return result
@@ -0,0 +1,297 @@
+"""Pose inference, zone lookup, tip tracking and camera/phone fusion benchmarks."""
+import socket
+import threading
+import time
+
+import numpy as np
+
+from bench import benchmark
+from bench.emulators import FrameSource
+
+srv = None  # The server module being measured; bench.use() sets it
+
+@benchmark("inference-modes")
+def bench_inference_modes(seconds=5.0, camera_fps=60, hit_rate=200):
+    """Pose FPS and hit-path jitter with inference inline vs. in the worker process."""
+    frame, player = srv.synthetic_frame(), srv.players[0]
+    results = {}
+    for mode in ("inline", "process"):
+        if mode == "process": srv.start_inference_pool([player], wait=True)
+        hist, sent = srv.LatencyHistogram(), {}
+        def on_hit(data, t_rx): hist.add(time.time() - sent[int(data.split(b":")[-1])])
+        rx = srv.HitReceiver(on_hit=on_hit, port=0, broadcast=False).start()
+        stop = threading.Event()
+        def sender():
+            tx, seq = socket.socket(socket.AF_INET, socket.SOCK_DGRAM), 0
+            while not stop.is_set():
+                sent[seq] = time.time()
+                tx.sendto(b"HIT:LEFT:%d" % seq, ("127.0.0.1", rx.port))
+                seq += 1
+                time.sleep(1.0 / hit_rate)
+            tx.close()
+        threading.Thread(target=sender, daemon=True).start()
+
+        inline_frames, done0 = 0, player.worker.frames_done(player) if player.worker else 0
+        t0 = next_t = time.perf_counter()
+        while time.perf_counter() - t0 < seconds:
+            srv.infer_frame(player, frame, time.time())
+            inline_frames += 1
+            next_t += 1.0 / camera_fps
+            delay = next_t - time.perf_counter()
+            if delay > 0: time.sleep(delay)
+        elapsed = time.perf_counter() - t0
+        frames = player.worker.frames_done(player) - done0 if player.worker else inline_frames
+        stop.set(); rx.stop()
+        srv.stop_inference_pool()
+
+        lat = hist.summary()
+        results[mode] = {"inference_fps": round(frames / elapsed, 1), "hit_latency": lat,
+                         "hit_jitter_ms": round(lat["p99_ms"] - lat["p50_ms"], 3)}
+    return results
+
+@benchmark("pose-backends")
+def bench_pose_backends(seconds=8.0, fps=30, session=None, backends=("solutions", "tasks")):
+    """One feed through each pose backend: blocking pose.process() vs. the PoseLandmarker in LIVE_STREAM mode.
+
+    Frames come from the recording `session` (one synthetic frame without
+    it), offered at `fps` from one thread as the vision loop would. Both run
+    POSE_COMPLEXITY at full scale. Per backend: how long each frame holds the
+    caller, frames whose pose reached the tracker per second, pose latency,
+    capture-to-zone age and frames the backend skipped.
+    """
+    saved = srv.POSE_BACKEND, srv.ADAPTIVE_INFERENCE, srv.frame_age_zone, srv.inference_time
+    player = srv.players[0]
+    saved_inference, frames = player.inference, FrameSource(path=session).frames
+    results = {}
+    try:
+        srv.ADAPTIVE_INFERENCE = False
+        for backend in backends:
+            srv.POSE_BACKEND = backend
+            player.inference = srv.InferenceController(start_level=srv.INFERENCE_LEVELS.index((srv.POSE_COMPLEXITY, 1.0)))
+            player.reset()
+            try:
+                if backend == "tasks":
+                    stream = player.landmarker("camera")
+                    stream.submit(frames[0], time.time())  # The first result pays the graph warm-up
+                    deadline = time.time() + 10.0
+                    while not stream.completed and time.time() < deadline: time.sleep(0.01)
+                else:
+                    player.inference.process(frames[0])
+            except Exception as e:
+                results[backend] = {"error": str(e)}
+                continue
+            srv.frame_age_zone, srv.inference_time, hold = srv.LatencyHistogram(), srv.LatencyHistogram(), srv.LatencyHistogram()
+            if backend == "tasks": stream.latency, skipped0 = srv.LatencyHistogram(), stream.skipped
+            done0 = srv.player_stats.snapshot().get(("frames", player.name), 0)
+
+            offered, t0 = 0, time.perf_counter()
+            next_t = t0
+            while time.perf_counter() - t0 < seconds:
+                t = time.perf_counter()
+                srv.infer_frame(player, frames[offered % len(frames)], time.time())
+                hold.add(time.perf_counter() - t)
+                offered += 1
+                next_t += 1.0 / fps
+                delay = next_t - time.perf_counter()
+                if delay > 0: time.sleep(delay)
+            elapsed = time.perf_counter() - t0
+            if backend == "tasks": time.sleep(0.5)  # Let the frames still in the graph report back
+
+            done = srv.player_stats.snapshot().get(("frames", player.name), 0) - done0
+            results[backend] = {"offered_fps": round(offered / elapsed, 1), "results_fps": round(done / elapsed, 1),
+                                "caller_hold": hold.summary(), "capture_to_zone": srv.frame_age_zone.summary(),
+                                "pose_latency": (stream.latency if backend == "tasks" else srv.inference_time).summary(),
+                                "skipped": stream.skipped - skipped0 if backend == "tasks" else 0}
+    finally:
+        srv.POSE_BACKEND, srv.ADAPTIVE_INFERENCE, srv.frame_age_zone, srv.inference_time = saved
+        player.reset()
+        player.inference = saved_inference
+    return results
+
+@benchmark("inference-levels")
+def bench_inference_levels(frames=30):
+    """Calibration table: p95 inference time of every (complexity, scale) level."""
+    srv.inference_ctl.calibrate(frames=frames)
+    return srv.inference_ctl.status()
+
+def grid_zone_layout(pads, cols=6):
+    """`pads` circles on a grid, for benchmarking bigger kits."""
+    rows = -(-pads // cols)
+    return {"default": "SNARE", "pads": [
+        {"zone": f"PAD {i + 1}", "circle": [(i % cols + 0.5) / cols, (i // cols + 0.5) / rows, 0.4 / cols]}
+        for i in range(pads)]}
+
+@benchmark("zones")
+def bench_zones(lookups=100000, pads=30, shape=(360, 640)):
+    """Zone lookup cost (old if-chain vs. label map, 5 and `pads` pads), rasterize time, lookups during a hot swap."""
+    def if_chain(x, y):
+        if y < srv.CYMBAL_HEIGHT: return "CRASH" if x < srv.DIVIDER_2 else "RIDE"
+        if x < srv.DIVIDER_1: return "HI-HAT"
+        return "SNARE" if x < srv.DIVIDER_2 else "FLOOR TOM"
+
+    rng = np.random.default_rng(0)
+    points = rng.random((lookups, 2)).tolist()
+    def per_lookup_ns(fn):
+        t0 = time.perf_counter()
+        for x, y in points: fn(x, y)
+        return round((time.perf_counter() - t0) / lookups * 1e9, 1)
+
+    kit, grid = srv.ZoneLayout(shape=shape), srv.ZoneLayout(grid_zone_layout(pads), shape)
+    results = {"lookup_ns": {"if_chain": per_lookup_ns(if_chain), "map_5_pads": per_lookup_ns(kit.zone_at),
+                             f"map_{pads}_pads": per_lookup_ns(grid.zone_at)},
+               "agreement_with_if_chain": round(sum(if_chain(x, y) == kit.zone_at(x, y) for x, y in points) / lookups, 4)}
+    rasterize = {}
+    for name, layout in (("5_pads", srv.default_zone_layout()), (f"{pads}_pads", grid_zone_layout(pads))):
+        for h, w in ((360, 640), (720, 1280)):
+            t0 = time.perf_counter()
+            srv.rasterize_zones(layout, (h, w))
+            rasterize[f"{name}_{w}x{h}"] = round((time.perf_counter() - t0) * 1000.0, 2)
+    results["rasterize_ms"] = rasterize
+
+    # Hot swap: keep looking up while the grid rasterizes at 720p on the background thread
+    took = []
+    kit.request(layout=grid_zone_layout(pads), shape=(720, 1280))
+    while kit.swaps == 0:
+        t0 = time.perf_counter()
+        kit.zone_at(*points[len(took) % lookups])
+        took.append(time.perf_counter() - t0)
+    took = np.array(took) * 1e6
+    results["during_swap"] = {"lookups": len(took), "p99_us": round(float(np.percentile(took, 99)), 2),
+                              "worst_us": round(float(took.max()), 1), "zones_after": len(kit.current[0])}
+    return results
+
+def legacy_tip_predictions(tips, alpha=0.6, beta=0.2, frames_ahead=4):
+    """The pre-dt filter over a stream of measured tips: gains per frame, look-ahead in frames. The tracker's baseline."""
+    pred = np.zeros((len(tips), 2))
+    kx, ky, kvx, kvy = tips[0][0], tips[0][1], 0.0, 0.0
+    for i, (zx, zy) in enumerate(np.asarray(tips).tolist()):
+        if i:
+            px, py = kx + kvx, ky + kvy
+            kx, ky = px + alpha * (zx - px), py + alpha * (zy - py)
+            kvx, kvy = kvx + beta * (zx - px), kvy + beta * (zy - py)
+        pred[i] = min(1.0, max(0.0, kx + kvx * frames_ahead)), min(1.0, max(0.0, ky + kvy * frames_ahead))
+    return pred
+
+def drumming_tip(t):
+    """Synthetic stick tip: 2 strokes/s up and down while sweeping across the kit."""
+    return 0.5 + 0.3 * np.sin(2 * np.pi * 0.4 * t), 0.55 + 0.1 * np.sin(2 * np.pi * 2.0 * t)
+
+@benchmark("tracker")
+def bench_tracker(seconds=20.0, session=None, noise=0.01):
+    """Prediction accuracy and update cost: legacy per-frame filter vs. dt alpha-beta vs. Kalman.
+
+    Scored against where the tip really is PREDICTION_MS after each frame. The
+    synthetic trajectory is sampled at several frame rates with timestamp jitter
+    and dropped frames; with `session`, the tips of its pose packets are used
+    (scored against the later measured tips).
+    """
+    rng = np.random.default_rng(7)
+    ahead = srv.PREDICTION_MS / 1000.0
+    streams = {}
+    if session:
+        reader, t, tips = srv.SessionReader(session), [], []
+        for i in range(len(reader)):
+            kind, mono, wall, payload = reader[i]
+            if kind != srv.REC_POSE or len(payload) != srv.PHONE_POSE_PACKET.size: continue
+            magic, version, seq, t_capture, *v = srv.PHONE_POSE_PACKET.unpack(payload)
+            if v[5] <= 0.3: continue
+            t.append(t_capture)
+            tips.append(srv.extend_line(1.0 - v[0], v[1], 1.0 - v[3], v[4], srv.STICK_EXTENSION))
+        reader.close()
+        t, tips = np.array(t), np.array(tips)
+        truth = lambda q: (np.interp(q, t, tips[:, 0]), np.interp(q, t, tips[:, 1]))
+        keep = t + ahead <= t[-1]
+        streams["session"] = (t[keep], tips[keep], truth)
+    else:
+        for fps in (20, 30, 60):
+            t = np.arange(0.0, seconds, 1.0 / fps)
+            t = t + rng.uniform(-0.003, 0.003, len(t))  # Capture timestamp jitter
+            t = np.sort(t[rng.random(len(t)) > 0.1])  # ~10% of frames lost
+            x, y = drumming_tip(t)
+            tips = np.stack([x, y], axis=1) + rng.normal(0.0, noise, (len(t), 2))
+            streams[f"{fps}fps"] = (t, tips, drumming_tip)
+
+    results = {"prediction_ms": srv.PREDICTION_MS}
+    for stream, (t, tips, truth) in streams.items():
+        true_x, true_y = truth(t + ahead)
+        true_zone = [srv.get_drum_zone(min(1.0, max(0.0, a)), min(1.0, max(0.0, b))) for a, b in zip(true_x, true_y)]
+        row = {"frames": len(t)}
+        for mode in ("legacy", "alpha-beta", "kalman"):
+            pred = np.zeros((len(t), 2))
+            t0 = time.perf_counter()
+            if mode == "legacy": pred = legacy_tip_predictions(tips)
+            else:
+                tracker, z, mask = srv.TipTracker(mode=mode), np.zeros((2, 2)), np.array([True, True])
+                for i, tip in enumerate(tips):
+                    z[0] = z[1] = tip
+                    tracker.update(t[i], z, mask)
+                    pred[i] = tracker.predict(ahead)[0]
+            cost = (time.perf_counter() - t0) / len(t)
+            err = np.hypot(pred[:, 0] - true_x, pred[:, 1] - true_y)
+            zones = [srv.get_drum_zone(a, b) for a, b in pred.tolist()]
+            row[mode] = {"rmse": round(float(np.sqrt(np.mean(err ** 2))), 4), "p95_error": round(float(np.percentile(err, 95)), 4),
+                         "zone_accuracy": round(sum(a == b for a, b in zip(zones, true_zone)) / len(t), 3),
+                         "update_us": round(cost * 1e6, 2)}
+        results[stream] = row
+    return results
+
+@benchmark("fusion")
+def bench_fusion(seconds=20.0, camera_fps=30, phone_fps=30, camera_ms=40.0, phone_ms=60.0, stall=(8.0, 10.0),
+                 wrist_lost=(14.0, 16.0), hit_rate=8, noise=0.01):
+    """Zone updates and hit zones from the webcam alone, the phone alone, and both fused.
+
+    Landmarks come from drumming_tip (the right arm a quarter second behind)
+    and reach process_landmarks() in arrival order, `camera_ms` / `phone_ms`
+    plus jitter after capture. The phone stalls during `stall`; the webcam
+    loses the left wrist during `wrist_lost`. Both sticks hit at `hit_rate`,
+    scored against the true tip. Single feeds track with TRACKER_MODE, the
+    fused run with FUSION_TRACKER.
+    """
+    rng = np.random.default_rng(11)
+    lags = {"LEFT": 0.0, "RIGHT": 0.25}
+    elbow = (0.5, 0.95)
+
+    def arms(t, visibility):
+        out = []
+        for (role, lag), vis in zip(lags.items(), visibility):
+            tx, ty = drumming_tip(t - lag) + rng.normal(0.0, noise, 2)
+            wx, wy = [(tip + e * srv.STICK_EXTENSION) / (1 + srv.STICK_EXTENSION) for tip, e in zip((tx, ty), elbow)]
+            out.append((role.title(), elbow[0], elbow[1], wx, wy, vis))
+        return out
+
+    feeds = {}
+    for source, fps, ms in (("camera", camera_fps, camera_ms), ("phone", phone_fps, phone_ms)):
+        t = np.arange(rng.uniform(0.0, 1.0 / fps), seconds, 1.0 / fps)
+        if source == "phone": t = t[(t < stall[0]) | (t >= stall[1])]
+        arrive = t + (ms + rng.uniform(0.0, 10.0, len(t))) / 1000.0
+        lost = (source == "camera") & (t >= wrist_lost[0]) & (t < wrist_lost[1])
+        feeds[source] = [(a, c, source, arms(c, (0.0 if gone else 0.95, 0.95))) for a, c, gone in zip(arrive, t, lost)]
+    hits = [(t + 0.005, t, "hit", role) for t in np.arange(0.5 / hit_rate, seconds, 1.0 / hit_rate) for role in lags]
+
+    saved = srv.source_age
+    results = {"config": {"seconds": seconds, "camera": [camera_fps, camera_ms], "phone": [phone_fps, phone_ms],
+                          "phone_stall": stall, "camera_left_wrist_lost": wrist_lost, "age_half_ms": srv.FUSION_AGE_HALF * 1000.0}}
+    try:
+        for run, used in (("camera", ["camera"]), ("phone", ["phone"]), ("fused", ["camera", "phone"])):
+            player = srv.PlayerSession("bench", {})
+            player.set_fusing(len(used) > 1)
+            srv.source_stats.reset()
+            srv.source_age = {"camera": srv.LatencyHistogram(), "phone": srv.LatencyHistogram()}
+            updates, right = {role: [] for role in lags}, 0
+            for arrive, t, source, data in sorted([e for s in used for e in feeds[s]] + hits, key=lambda e: e[0]):
+                if source == "hit":
+                    x, y = drumming_tip(t - lags[data])
+                    right += srv.stick_zone(player, data, t) == srv.get_drum_zone(min(1.0, max(0.0, x)), min(1.0, max(0.0, y)))
+                    continue
+                tracked = srv.process_landmarks(player, data, t, source, now=arrive)
+                if tracked: srv.source_age[source].add(arrive - t)
+                for name, *_ in tracked: updates[name.upper()].append(arrive)
+            results[run] = {
+                "zone_updates_per_s": {role: round(len(u) / seconds, 1) for role, u in updates.items()},
+                "max_gap_ms": {role: round(float(np.diff([0.0] + u + [seconds]).max()) * 1000.0) for role, u in updates.items()},
+                "hit_zone_accuracy": round(right / len(hits), 3),
+                "feeds": {source: srv.feed_summary(source) for source in used}}
+    finally:
+        srv.source_age = saved
+        srv.source_stats.reset()
+    return results
@@ -14,6 +14,7 @@
 
 // ==================== STICK IDENTITY ====================
 #define STICK_ID "Right"  // Options: "LEFT" or "RIGHT"
+#define STICK_NUM 1       // Binary packet id: 0 = LEFT, 1 = RIGHT (2 = KICK)
 
 // ==================== PIN CONFIGURATION ====================
 const int PIN_SDA  = 7;
@@ -23,6 +24,47 @@ const int PIN_INT1 = 10;
 // ==================== NETWORK CONFIGURATION ====================
 const uint16_t UDP_DISCOVERY_PORT = 5555; // Listening for Server Broadcast
 const uint16_t UDP_HIT_PORT       = 5556; // Sending Hits to Server
+#define SEND_BINARY_PACKETS 1              // 0 = legacy "HIT:<STICK_ID>" text
+const uint32_t SYNC_INTERVAL_MS = 250;  // Clock-sync ping period (binary packets only)
+const int HIT_COPIES = 3;               // Each binary hit is sent this many times, so one lost datagram isn't a lost note
+const uint32_t HIT_COPY_GAP_US = 300;   // Spacing between copies
+
+// Binary hit packet v1 (20 bytes, little-endian), parsed by the server's HIT_PACKET
+struct __attribute__((packed)) HitPacket {
+    char     magic[2];   // "SD"
+    uint8_t  version;    // 1
+    uint8_t  stick;      // STICK_NUM
+    uint32_t seq;        // Increments per hit; copies of a hit share it
+    uint64_t timeUs;     // esp_timer_get_time() at detection
+    float    impact;     // Linear Z acceleration at impact (m/s^2)
+};
+
+struct HitEvent {
+    uint64_t timeUs;
+    float    impact;
+};
+
+// Clock sync v1: pings answered by the server on UDP_HIT_PORT, NTP-style, so it
+// learns our clock offset and can play every hit at the same latency
+struct __attribute__((packed)) SyncPing {
+    char     magic[2];   // "SY"
+    uint8_t  version;    // 1
+    uint8_t  stick;      // STICK_NUM
+    uint32_t seq;        // Increments per ping
+    uint64_t sentUs;     // esp_timer_get_time() when sent
+    uint32_t prevSeq;    // Last ping answered...
+    uint64_t prevRecvUs; // ...and when its reply arrived here (0 = none yet)
+};
+
+struct __attribute__((packed)) SyncPong {
+    char     magic[2];   // "SY"
+    uint8_t  version;    // 1
+    uint8_t  stick;      // STICK_NUM
+    uint32_t seq;        // The ping's seq
+    uint64_t sentUs;     // The ping's sentUs, echoed
+    double   serverRx;   // Server clock (s) when the ping arrived
+    double   serverTx;   // Server clock (s) when this reply left
+};
 
 // ==================== HIT DETECTION TUNING ====================
 // (Your tuned values - DO NOT TOUCH)
@@ -54,6 +96,10 @@ volatile bool serverFound = false;
 unsigned long lastServerSeen = 0;
 
 QueueHandle_t hitQueue;
+uint32_t hitSeq = 0;
+uint32_t syncSeq = 0, lastPongSeq = 0;
+uint64_t lastPongUs = 0;
+unsigned long lastSyncMs = 0;
 
 // ==================== CALIBRATION ROUTINE ====================
 void calibrateGravity() {
@@ -122,7 +168,7 @@ void imuTask(void* param) {
                 velocityZ = 0.0f;
                 
                 // Signal the Network Task
-                uint8_t hit = 1;
+                HitEvent hit = { (uint64_t)esp_timer_get_time(), accelZ_ms2 };
                 xQueueSend(hitQueue, &hit, 0);
                 
                 // Debug Print
@@ -167,21 +213,52 @@ void networkTask(void* param) {
         }
 
         // 3. SEND HITS FROM QUEUE
-        uint8_t hit;
+        HitEvent hit;
         while (xQueueReceive(hitQueue, &hit, 0) == pdTRUE) {
             if (serverFound) {
-                udpTx.beginPacket(serverIP, UDP_HIT_PORT);
-                
-                // --- THE CRITICAL UPDATE ---
+#if SEND_BINARY_PACKETS
+                // Same packet, same seq, HIT_COPIES times: the server plays the first copy to arrive
+                HitPacket pkt = { {'S', 'D'}, 1, STICK_NUM, hitSeq++, hit.timeUs, hit.impact };
+                for (int copy = 0; copy < HIT_COPIES; copy++) {
+                    if (copy > 0) delayMicroseconds(HIT_COPY_GAP_US);
+                    udpTx.beginPacket(serverIP, UDP_HIT_PORT);
+                    udpTx.write((const uint8_t*)&pkt, sizeof(pkt));
+                    udpTx.endPacket();
+                }
+#else
                 // Sends "HIT:LEFT" or "HIT:RIGHT"
+                udpTx.beginPacket(serverIP, UDP_HIT_PORT);
                 udpTx.print("HIT:");
                 udpTx.print(STICK_ID); 
-                
                 udpTx.endPacket();
+#endif
             } else {
                 Serial.println("[NET] Hit ignored - No Server Found");
             }
         }
+
+#if SEND_BINARY_PACKETS
+        // 4. CLOCK SYNC (replies come back to udpTx's port; polled every tick, so t4 is up to ~1 ms late)
+        int pongSize = udpTx.parsePacket();
+        if (pongSize == sizeof(SyncPong)) {
+            uint64_t nowUs = esp_timer_get_time();
+            SyncPong pong;
+            udpTx.read((uint8_t*)&pong, sizeof(pong));
+            if (pong.magic[0] == 'S' && pong.magic[1] == 'Y' && pong.stick == STICK_NUM) {
+                lastPongSeq = pong.seq;
+                lastPongUs = nowUs;
+            }
+        } else if (pongSize > 0) {
+            udpTx.flush();
+        }
+        if (serverFound && millis() - lastSyncMs >= SYNC_INTERVAL_MS) {
+            lastSyncMs = millis();
+            SyncPing ping = { {'S', 'Y'}, 1, STICK_NUM, ++syncSeq, (uint64_t)esp_timer_get_time(), lastPongSeq, lastPongUs };
+            udpTx.beginPacket(serverIP, UDP_HIT_PORT);
+            udpTx.write((const uint8_t*)&ping, sizeof(ping));
+            udpTx.endPacket();
+        }
+#endif
         vTaskDelay(1);
     }
 }
@@ -215,7 +292,7 @@ void setup() {
     }
 
     // Task & Queue Init
-    hitQueue = xQueueCreate(16, sizeof(uint8_t));
+    hitQueue = xQueueCreate(16, sizeof(HitEvent));
     calibrateGravity(); // Get initial orientation
 
     // Multithreading: 
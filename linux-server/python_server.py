@@ -1,18 +1,74 @@
 import socket
+import selectors
+import struct
 import threading
+import queue
+import math
+import wave
+import collections
+import heapq
+import itertools
+import weakref
+import multiprocessing
+from multiprocessing import shared_memory
+import json
+import mmap
+import hashlib
+import base64
+import urllib.parse
+import urllib.request
+import importlib
 import time
-import pygame
+STARTUP_T0 = time.perf_counter()  # Before the imports below, for the startup timeline
 import os
-import cv2
-import mediapipe as mp
+import sys
+# --bench / --replay print one JSON document: stdout is kept for it and fd 1 becomes stderr, so the
+# pygame banner, the log thread, status lines, MediaPipe's own logging and worker processes stay out of it
+JSON_OUT = None
+if __name__ == "__main__" and sys.argv[1:2] in (["--bench"], ["--replay"]):
+    JSON_OUT = os.fdopen(os.dup(1), "w")
+    os.dup2(2, 1)
+import pygame
 import numpy as np
 import logging
-import sys
-from flask import Flask, render_template_string, jsonify, send_file
-from flask_socketio import SocketIO
+
+# ================= STARTUP =================
+# cv2, MediaPipe and the web stack take seconds to import, so they load on
+# first use (normally from the warm-up thread) and the window and hit path
+# come up first.
+startup_timeline = []  # (stage, seconds since launch)
+
+def startup_mark(stage):
+    startup_timeline.append((stage, round(time.perf_counter() - STARTUP_T0, 3)))
+
+class LazyModule:
+    """Stands in for a module and imports it on first attribute access."""
+    def __init__(self, name):
+        self._name, self._module, self._lock = name, None, threading.Lock()
+
+    def load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    module = importlib.import_module(self._name)
+                    startup_mark(f"import {self._name}")
+                    self._module = module
+        return self._module
+
+    def __getattr__(self, attr): return getattr(self.load(), attr)
+
+cv2 = LazyModule("cv2")
+mp = LazyModule("mediapipe")
+flask = LazyModule("flask")
+flask_socketio = LazyModule("flask_socketio")
+asyncio = LazyModule("asyncio")
 
 # --- PERFORMANCE & TRACKING ---
 HEADLESS_MODE = True  # Set to True to disable all video rendering for maximum FPS!
+INFERENCE_MODE = "inline"  # "inline" = pose.process() on each player's vision thread, "process" = pool of worker processes
+UI_FPS = 30        # Control panel redraw rate; vision runs on its own thread as frames arrive
+PREVIEW_FPS = 15   # Cap on cv2 preview window refreshes (when not HEADLESS_MODE)
+IS_MAIN_PROCESS = multiprocessing.current_process().name == "MainProcess"
 
 # ================= LINUX PRIORITY =================
 try:
@@ -25,70 +81,777 @@ except:
 UDP_DISCOVERY_PORT = 5555
 UDP_HIT_PORT = 5556
 WEB_PORT = 5000
+METRICS_IN_PC_MODE = False  # Also start the web server in PC Camera mode for /metrics, on 127.0.0.1 only
+WEB_SERVER = "socketio"  # "socketio" = Flask-SocketIO, "asyncio" = IngestServer: bare WebSocket frames, standard library only
+WS_MAX_MESSAGE = 1 << 20  # Bytes; a bigger WebSocket message closes the connection
+BROADCAST_INTERVAL = 1.0
+HIT_RECEIVER_MODE = "select"  # "select" = epoll wake-up, "poll" = legacy 1 ms sleep loop
+SO_TIMESTAMPNS = getattr(socket, "SO_TIMESTAMPNS", 35)  # Kernel receive timestamps (Linux)
 
-# Drum Zones
+# Drum Zones (the default five-pad layout; ZONE_LAYOUT_PATH replaces it)
 CYMBAL_HEIGHT = 0.4
 DIVIDER_1 = 0.35  
 DIVIDER_2 = 0.65  
 STICK_EXTENSION = 1.2 
+ZONE_LAYOUT_PATH = None      # e.g. "zones.json": rect / polygon / circle pads, hot-swapped when the file changes
+ZONE_LAYOUT_POLL = 1.0       # Seconds between checks of ZONE_LAYOUT_PATH
+ZONE_MAP_SHAPE = (360, 640)  # Label map size until the first frame resizes it to the inference resolution
+ZONE_RASTER_ROWS = 32        # Label map rows built between GIL releases, so a hot swap never stalls the hit path
 
 # --- DEBOUNCE SETTINGS ---
 DEBOUNCE_TIME = 0.04  # 40 milliseconds cooldown per stick
-last_hit_time = {"LEFT": 0.0, "RIGHT": 0.0, "KICK": 0.0}
 
-# Lightweight Kalman Filter (Alpha-Beta)
-KALMAN_ALPHA = 0.6     
+# --- HIT PACKETS ---
+# Binary v1 (20 bytes, little-endian): "SD", version, stick id, sequence,
+# stick micros, impact acceleration in m/s^2. Plain "HIT:LEFT" text still works.
+HIT_PACKET = struct.Struct("<2sBBIQf")
+HIT_MAGIC = b"SD"
+HIT_VERSION = 1
+STICK_NAMES = ["LEFT", "RIGHT", "KICK"]  # Binary stick id -> name, higher ids become STICK3, STICK4...
+STICK_FIXED_ZONES = {"KICK": "KICK"}     # Sticks that always play the same drum
+# Sticks send each binary hit 2-3 times under one sequence number, so a single
+# lost datagram doesn't lose the note; the first copy to arrive plays.
+HIT_SEQ_WINDOW = 64      # Sequence numbers remembered per stick for spotting copies
+HIT_SEQ_RESTART = 2.0    # Seconds without hits after which an old number means the stick rebooted
+IMPACT_SOFT = 14.0   # m/s^2 at the firmware trigger threshold -> MIN_VELOCITY
+IMPACT_HARD = 60.0   # m/s^2 and above -> full volume
+MIN_VELOCITY = 0.3
+
+# --- STICK CLOCK SYNC ---
+# Sticks ping the hit port every 250 ms (28 bytes: "SY", version, stick id,
+# seq, stick micros when sent, then the previous ping's seq and the stick
+# micros its reply arrived) and each ping is answered with our receive and
+# send times, NTP-style. The next ping completes the exchange, so the server
+# learns every stick's clock offset and the network delay.
+SYNC_PING = struct.Struct("<2sBBIQIQ")
+SYNC_PONG = struct.Struct("<2sBBIQdd")  # magic, version, stick id, seq, echoed stick micros, our receive / send time (s)
+SYNC_MAGIC = b"SY"
+SYNC_VERSION = 1
+SYNC_WINDOW = 32              # Exchanges kept per stick (8 s of pings); the lowest-delay one sets the offset
+HIT_SCHEDULE = "immediate"    # "immediate" = play on receipt, "jitter-buffer" = play at impact + JITTER_TARGET_MS
+JITTER_TARGET_MS = 25.0       # Impact -> sound for synced sticks; hits that arrive later play at once (counted late)
+
+# Stick-tip tracker, stepped by the real time between frames
+TRACKER_MODE = "alpha-beta"  # "alpha-beta" or "kalman" (constant-velocity Kalman)
+KALMAN_ALPHA = 0.7     # Was 0.6 per frame; with real dt the tracker wants a little less smoothing
 KALMAN_BETA = 0.2      
-PREDICTION_FRAMES = 4  
+PREDICTION_MS = 66.0   # Look-ahead for the live zone, independent of FPS (the old 4 frames at 60 FPS)
+KALMAN_PROCESS_NOISE = 40.0        # Acceleration noise density, (frame widths / s^2)^2 * s
+KALMAN_MEASUREMENT_NOISE = 0.001   # Tip position variance, frame widths^2 (~3% of the frame)
+TRACK_RESET_AFTER = 0.5  # Seconds without a detection before an arm's track restarts
+
+# Adaptive inference: (model complexity, input scale) from best quality to cheapest
+POSE_COMPLEXITY = 0          # Model used until calibration / with ADAPTIVE_INFERENCE off
+POSE_BACKEND = "solutions"  # "solutions" = pose.process() per frame; "tasks" = Tasks PoseLandmarker in LIVE_STREAM mode (see PoseStream)
+POSE_TASK_MODEL = os.path.join("models", "pose_landmarker_{0}.task")  # lite / full / heavy by POSE_COMPLEXITY, downloaded on first use
+POSE_TASK_MODEL_URL = "https://storage.googleapis.com/mediapipe-models/pose_landmarker/pose_landmarker_{0}/float16/1/pose_landmarker_{0}.task"
+ADAPTIVE_INFERENCE = True
+INFERENCE_BUDGET_MS = 15.0   # p95 target for one pose.process() call
+INFERENCE_LEVELS = [(1, 1.0), (1, 0.75), (0, 1.0), (0, 0.75), (0, 0.5)]
+ADAPT_WINDOW = 30            # Frames per p95 decision
+ADAPT_HEADROOM = 0.6         # Step up only when p95 is under 60% of the budget
+ADAPT_RETRY_AFTER = 10.0     # Seconds before retrying a level that was over budget
+
+# Phone frames are kept as JPEG bytes and decoded only when inference takes one
+JPEG_MIN_DECODE_WIDTH = 256  # Never decode narrower than this (MediaPipe's landmark input is 256 px)
+JPEG_REDUCED_FACTORS = (8, 4, 2)  # libjpeg's DCT-domain downscales (cv2.IMREAD_REDUCED_COLOR_<n>)
+PHONE_MAX_FRAME_AGE = 0.25  # Seconds from capture; older phone frames are dropped instead of inferred
+PHONE_FRAME_HEADER = struct.Struct("<2sBxId")  # magic, version, frame seq, capture time (server clock, s)
+PHONE_FRAME_MAGIC = b"SF"
+# Phone-side pose: the page runs the landmarker and sends only elbows and wrists
+PHONE_POSE_PACKET = struct.Struct("<2sBxId12f")  # magic, version, seq, capture time, then x, y, visibility
+PHONE_POSE_MAGIC = b"SL"                         # for left elbow, left wrist, right elbow, right wrist
+# Adaptive phone streaming: the server picks what the page sends, from best quality to cheapest
+ADAPTIVE_STREAM = True
+STREAM_LEVELS = [(480, 270, 0.6, 30), (320, 180, 0.5, 30), (320, 180, 0.4, 24), (256, 144, 0.4, 20), (256, 144, 0.3, 15)]  # width, height, JPEG quality, fps
+STREAM_START_LEVEL = 1           # 320x180 at quality 0.5, 30 fps: what the page always sent before
+STREAM_WINDOW = 2.0              # Seconds of phone frames per decision
+STREAM_AGE_BUDGET_MS = 150.0     # p90 glass-to-zone age (capture -> zones updated)
+STREAM_NETWORK_BUDGET_MS = 60.0  # p90 capture -> arrival here; above it the link is queueing frames
+STREAM_MAX_DROPPED = 0.15        # Share of frames superseded in the ingest slot or gone stale
+SESSION_RECORD_PATH = None  # e.g. "session.sdr": record camera/phone frames, pose packets and hits for --replay
+SESSION_JPEG_QUALITY = 90   # Camera frames are JPEG-encoded (on the recorder thread) before writing
+
+# Hit-time zone lookup
+HIT_ZONE_MODE = "history"     # "history" = zone at the hit's timestamp, "latest" = last processed frame
+TIP_HISTORY_SIZE = 64         # Frames of tip positions kept per stick (~1 s at 60 FPS)
+TIP_MAX_EXTRAPOLATION = 0.1   # Seconds past the newest frame we project along the tip velocity
+TIP_VELOCITY_SPAN = 0.012     # That velocity spans at least this long (two fused feeds' frames can land ms apart)
+TIP_STALE_AFTER = 0.5         # Fall back to the latest zone if tracking is older than this
+FUSION_AGE_HALF = 0.1         # Fusing two feeds: a measurement this many seconds old counts half as much as a fresh one
+FUSION_TRACKER = "kalman"     # Tracker while fusing; alpha-beta's beta / dt turns noise into speed at ms intervals
+
+# --- PLAYERS ---
+# One entry per drummer. "sticks" maps hit-packet stick ids to LEFT / RIGHT or
+# a fixed-zone stick (KICK); "camera" is a webcam index, "phone" (the page
+# opened as /?player=<name>), a list of both such as [0, "phone"] (fused frame
+# by frame), or None to follow the PC Camera / Mobile App / PC + Phone choice.
+PLAYERS = [
+    {"name": "P1", "sticks": {0: "LEFT", 1: "RIGHT", 2: "KICK"}, "camera": None},
+    # {"name": "P2", "sticks": {3: "LEFT", 4: "RIGHT", 5: "KICK"}, "camera": "phone"},
+]
+INFERENCE_WORKERS = None  # Pose processes in "process" mode; None = one per spare core, at most one per player
+
+# ================= BACKGROUND LOGGING =================
+# print() on the hit path can block on the terminal, so hot paths only queue text.
+log_queue = queue.SimpleQueue()
+
+def log_event(msg): log_queue.put(msg)
+
+def log_worker():
+    while True:
+        print(log_queue.get())
+
+threading.Thread(target=log_worker, daemon=True).start()
+
+# ================= LATENCY STATS =================
+class LatencyHistogram:
+    # Log-spaced buckets from 1 us to 10 s, 20 per decade. add() is a couple of
+    # float ops and a list increment under an uncontended lock, cheap enough for
+    # the hit path. The lock matters: frame_age_zone, inference_time and
+    # source_age are fed from the ingest, vision and pose-worker threads at once.
+    PER_DECADE = 20
+    NUM_BUCKETS = 7 * PER_DECADE + 1
+
+    def __init__(self):
+        self.counts = [0] * self.NUM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.lock = threading.Lock()
 
-# Global State
-current_zone_left = "SNARE"
-current_zone_right = "SNARE"
-kalman_state = {"Left": None, "Right": None} 
-latest_frame_from_phone = None
-frame_lock = threading.Lock()
+    def add(self, seconds):
+        us = seconds * 1e6
+        idx = 0 if us <= 1.0 else min(self.NUM_BUCKETS - 1, int(math.log10(us) * self.PER_DECADE))
+        with self.lock:
+            self.counts[idx] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max: self.max = seconds
+
+    def snapshot(self):
+        """(bucket counts, count, total, max), all from the same moment."""
+        with self.lock: return list(self.counts), self.count, self.total, self.max
+
+    def percentile(self, p, snap=None):
+        counts, count, _, peak = snap or self.snapshot()
+        if count == 0: return 0.0
+        target = count * p / 100.0
+        seen = 0
+        for idx, c in enumerate(counts):
+            seen += c
+            if seen >= target:
+                return min(peak, 10 ** ((idx + 1) / self.PER_DECADE) * 1e-6)
+        return peak
+
+    def summary(self):
+        ms = lambda v: round(v * 1000.0, 3)
+        snap = self.snapshot()
+        _, count, total, peak = snap
+        return {
+            "count": count,
+            "mean_ms": ms(total / count) if count else 0.0,
+            "p50_ms": ms(self.percentile(50, snap)), "p90_ms": ms(self.percentile(90, snap)),
+            "p99_ms": ms(self.percentile(99, snap)), "max_ms": ms(peak),
+        }
+
+class ShardOwner:
+    """Held only by one thread's slot in a Counters' threading.local, so it goes away when that thread ends."""
+    __slots__ = ("__weakref__",)
+
+class Counters:
+    """Named counters kept per thread and only summed when read.
+
+    inc() touches just the calling thread's own dict, so the hit path takes no
+    lock; the stats lines and /metrics add the shards up. A key is a name or a
+    (name, label) pair such as ("played", "LEFT"); reading a name sums its labels.
+    When a thread exits its shard is folded into `retired`, so threads that come
+    and go (per-connection handlers, restarted workers) don't pile up shards.
+    """
+    def __init__(self, *names):
+        self.names = names
+        self.local = threading.local()
+        self.shards, self.retired, self.lock = {}, {}, threading.Lock()
+        self.shard_ids = itertools.count()
+
+    def shard(self):
+        counts, key = collections.defaultdict(int), next(self.shard_ids)
+        with self.lock: self.shards[key] = counts  # Once per thread
+        self.local.counts, self.local.owner = counts, ShardOwner()
+        weakref.finalize(self.local.owner, self.retire, key)
+        return counts
+
+    def retire(self, key):
+        """Its thread has exited: move the shard's counts into the retired totals."""
+        with self.lock:
+            for k, n in self.shards.pop(key).items(): self.retired[k] = self.retired.get(k, 0) + n
+
+    def inc(self, key, n=1):
+        try: counts = self.local.counts
+        except AttributeError: counts = self.shard()
+        counts[key] += n
+
+    def snapshot(self):
+        """{key: total over threads}, with every name in `names` present."""
+        with self.lock: shards, total = list(self.shards.values()), dict(self.retired)
+        for name in self.names: total.setdefault(name, 0)
+        for counts in shards:
+            for key, n in counts.copy().items():  # dict.copy() is atomic under the GIL
+                total[key] = total.get(key, 0) + n
+        return total
+
+    def totals(self):
+        """{name: total over threads and labels}."""
+        out = dict.fromkeys(self.names, 0)
+        for key, n in self.snapshot().items():
+            name = key[0] if isinstance(key, tuple) else key
+            out[name] = out.get(name, 0) + n
+        return out
+
+    def __getitem__(self, name): return self.totals().get(name, 0)
+
+    def reset(self):
+        with self.lock:
+            for counts in self.shards.values(): counts.clear()
+            self.retired.clear()
+
+hit_latency = LatencyHistogram()  # UDP receive -> Sound.play() returned
+hit_clock_latency = LatencyHistogram()  # Synced sticks: impact (stick clock) -> the engine starting the sound
+frame_age_ingest = LatencyHistogram()  # Phone capture -> frame arrives here
+frame_age_zone = LatencyHistogram()  # Camera capture -> zones updated from that frame
+vision_pass = LatencyHistogram()  # Vision thread: take + decode + pose for one frame
+ui_pass = LatencyHistogram()      # Control panel: events + changed regions + display update
+preview_pass = LatencyHistogram() # cv2.imshow + waitKey for one preview frame
+inference_time = LatencyHistogram()  # One pose.process() call, inline or in the worker
+phone_stats = Counters("received", "decoded", "processed", "discarded", "stale", "decode_ms", "landmarks")
+camera_stats = Counters("received", "processed")
+zone_stats = Counters("lookups", "differs_from_latest")
+hit_stats = Counters("received", "debounced", "no_zone", "played", "late", "unsynced")  # Counted as (outcome, stick)
+net_stats = Counters("recv_errors", "send_errors", "bad_packets", "handler_errors")  # Hit socket
+player_stats = Counters("frames")  # Counted as ("frames", player): frames whose pose updated that player's zones
+source_stats = Counters("frames", "fused", "late", "lost", "visibility")  # Counted as (stat, feed, player), feed = camera / phone
+source_age = {"camera": LatencyHistogram(), "phone": LatencyHistogram()}  # Capture -> zones updated, per feed
+
+def feed_summary(source):
+    """One feed over all players: frames, arms fused / late / lost, mean wrist visibility and frame age."""
+    stats = source_stats.snapshot()
+    total = lambda stat: sum(n for key, n in stats.items() if isinstance(key, tuple) and key[:2] == (stat, source))
+    frames = total("frames")
+    return {"frames": frames, "fused": total("fused"), "late": total("late"), "lost": total("lost"),
+            "confidence": round(total("visibility") / max(1, 2 * frames), 3), "age": source_age[source].summary()}
 
 # ================= LOW-LATENCY AUDIO (ALSA) =================
-pygame.mixer.pre_init(frequency=44100, size=-16, channels=2, buffer=64)
-pygame.mixer.init() 
-pygame.init()       
-pygame.mixer.set_num_channels(16)
+AUDIO_BACKEND = "pygame"  # "pygame" = SDL mixer, "numpy" = our own sample mixer
+AUDIO_SINK = "device"     # numpy backend only: "device", "null" or a path to a .wav file
+SAMPLE_RATE = 44100
+MIXER_BLOCK = 64          # Frames per callback (64 @ 44.1 kHz = 1.45 ms)
+MAX_VOICES = 16
+# Per drum: (reserved voices, priority). Higher priority is stolen last; unreserved voices are shared
+VOICE_GROUPS = {"KICK": (2, 3), "SNARE": (3, 3), "HI-HAT": (2, 2), "FLOOR TOM": (2, 2), "CRASH": (2, 1), "RIDE": (2, 1)}
+DEFAULT_VOICE_GROUP = (1, 1)  # Layout pads with their own sound
+CHOKE_GROUPS = [["HI-HAT"]]   # A hit stops every ringing voice of its group (a new hi-hat cuts the last one)
+SAMPLE_CACHE_DIR = os.path.join("sounds", ".cache")  # WAVs converted to the mixer's rate/format, memory-mapped at startup
+KITS_DIR = "kits"             # One folder per kit with a kit.json; K in the control panel loads the next one
 
 volumes = {
     "SNARE": 1.0, "HI-HAT": 1.0, "FLOOR TOM": 1.0, 
     "CRASH": 1.0, "RIDE": 1.0, "KICK": 1.0
 }
 
-def load_sound(path):
-    if os.path.exists(path): return pygame.mixer.Sound(path)
-    print(f" [WARNING] Sound not found: {path}")
-    return None
-
-sounds = {
-    "SNARE": load_sound("sounds/snare.wav"),
-    "HI-HAT": load_sound("sounds/hihat.wav"),
-    "FLOOR TOM": load_sound("sounds/tom.wav"),
-    "CRASH": load_sound("sounds/crash.wav"),
-    "RIDE": load_sound("sounds/ride.wav"), 
-    "KICK": load_sound("sounds/kick.wav")  
+SOUND_FILES = {
+    "SNARE": "sounds/snare.wav",
+    "HI-HAT": "sounds/hihat.wav",
+    "FLOOR TOM": "sounds/tom.wav",
+    "CRASH": "sounds/crash.wav",
+    "RIDE": "sounds/ride.wav",
+    "KICK": "sounds/kick.wav"
 }
 
-def play_sound(zone):
-    if zone in sounds and sounds[zone]:
-        sounds[zone].play()
-        print(f" > {zone}") 
+def load_sample(path, rate=SAMPLE_RATE):
+    """Reads a 16-bit WAV into a float32 (frames, 2) array at the mixer rate."""
+    if not os.path.exists(path):
+        print(f" [WARNING] Sound not found: {path}")
+        return None
+    with wave.open(path, "rb") as w:
+        if w.getsampwidth() != 2:
+            print(f" [WARNING] Only 16-bit WAV is supported: {path}")
+            return None
+        channels, src_rate = w.getnchannels(), w.getframerate()
+        pcm = np.frombuffer(w.readframes(w.getnframes()), dtype="<i2").reshape(-1, channels)
+    data = pcm.astype(np.float32) / 32768.0
+    if channels == 1: data = np.repeat(data, 2, axis=1)
+    elif channels > 2: data = data[:, :2]
+    if src_rate != rate:
+        n_out = int(len(data) * rate / src_rate)
+        src_t = np.arange(len(data)) / src_rate
+        dst_t = np.arange(n_out) / rate
+        data = np.stack([np.interp(dst_t, src_t, data[:, c]) for c in range(2)], axis=1).astype(np.float32)
+    return np.ascontiguousarray(data)
+
+def cached_sample(path, rate=SAMPLE_RATE, dtype=np.float32):
+    """The WAV at `path` as a (frames, 2) array in the mixer's rate and sample format, memory-mapped.
+
+    Converted once into SAMPLE_CACHE_DIR, named by a hash of the file's bytes and
+    the target format, so editing a WAV or changing the rate makes a new entry
+    and later startups only hash and map.
+    """
+    if not os.path.exists(path):
+        print(f" [WARNING] Sound not found: {path}")
+        return None
+    dtype = np.dtype(dtype)
+    with open(path, "rb") as f: digest = hashlib.sha1(f.read())
+    digest.update(f"{rate}/{dtype.str}/2".encode())
+    cache = os.path.join(SAMPLE_CACHE_DIR, digest.hexdigest()[:20] + ".npy")
+    if os.path.exists(cache): return np.load(cache, mmap_mode="r")
+    data = load_sample(path, rate)
+    if data is None: return None
+    if dtype == np.int16: data = np.clip(data * 32767.0, -32768, 32767).astype(np.int16)
+    try:
+        os.makedirs(SAMPLE_CACHE_DIR, exist_ok=True)
+        tmp = f"{cache}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f: np.save(f, data)
+        os.replace(tmp, cache)  # Another process mapping the same entry never sees half a file
+    except OSError as e:
+        print(f" [AUDIO] Sample cache not writable ({e}), using {path} from memory")
+        return data
+    return np.load(cache, mmap_mode="r")
+
+class Kit:
+    """Samples per zone in one engine's native form: velocity layers, each with round-robin takes.
+
+    layers[zone] = [(max velocity, [takes...]), ...], softest layer first. Engines
+    replace their whole Kit in one assignment, so a hit picks either from the
+    old kit or the new one, never from a half-loaded one.
+    """
+    def __init__(self, name="default"):
+        self.name = name
+        self.layers = {}
+        self.next_take = {}  # Zone -> itertools.count: next() is atomic, and hits pick from several threads
+
+    def set(self, zone, takes, max_velocity=1.0):
+        self.next_take.setdefault(zone, itertools.count())
+        self.layers[zone] = [(max_velocity, list(takes))]
+
+    def add_layer(self, zone, takes, max_velocity=1.0):
+        self.next_take.setdefault(zone, itertools.count())
+        layers = self.layers.get(zone, []) + [(max_velocity, list(takes))]
+        self.layers[zone] = sorted(layers, key=lambda layer: layer[0])
+
+    def pick(self, zone, velocity):
+        layers = self.layers.get(zone)
+        if not layers: return None
+        takes = next((takes for max_v, takes in layers if velocity <= max_v), layers[-1][1])
+        return takes[next(self.next_take[zone]) % len(takes)]
+
+def kit_from_files(files):
+    """SOUND_FILES-style {zone: wav} as a kit spec: one layer with one take per zone."""
+    return {zone: [(1.0, [path])] for zone, path in files.items()}
+
+def read_kit(path):
+    """kit.json -> (name, {zone: [(max velocity, [wav paths])]}).
+
+    {"name": "rock", "zones": {"KICK": "kick.wav",
+     "SNARE": [{"max_velocity": 0.5, "samples": ["soft1.wav", "soft2.wav"]}, {"samples": ["hard.wav"]}]}}
+    Paths are relative to the kit.json.
+    """
+    with open(path) as f: spec = json.load(f)
+    base = os.path.dirname(path)
+    zones = {}
+    for zone, layers in spec["zones"].items():
+        if isinstance(layers, str): layers = [{"samples": [layers]}]
+        zones[zone] = [(float(layer.get("max_velocity", 1.0)), [os.path.join(base, p) for p in layer["samples"]])
+                       for layer in layers]
+    return spec.get("name", os.path.basename(base)), zones
+
+def build_kit(name, spec, load):
+    """Loads every take of a kit spec through `load` (an engine's native_sample)."""
+    kit = Kit(name)
+    for zone, layers in spec.items():
+        for max_velocity, paths in layers:
+            takes = [t for t in (load(p) for p in paths) if t is not None]
+            if takes: kit.add_layer(zone, takes, max_velocity)
+    return kit
+
+def available_kits(root=KITS_DIR):
+    if not os.path.isdir(root): return []
+    return sorted(os.path.join(root, d, "kit.json") for d in os.listdir(root)
+                  if os.path.exists(os.path.join(root, d, "kit.json")))
+
+def load_kit_async(engine, path):
+    """Builds the kit on its own thread and swaps it in; hits keep using the current kit meanwhile."""
+    def load():
+        t0 = time.perf_counter()
+        try: kit = build_kit(*read_kit(path), engine.native_sample)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f" [AUDIO] Kit rejected ({path}): {e}")
+            return
+        engine.set_kit(kit)
+        print(f" [AUDIO] Kit '{kit.name}' loaded in {(time.perf_counter() - t0) * 1000:.0f} ms ({len(kit.layers)} drums)")
+    thread = threading.Thread(target=load, daemon=True)
+    thread.start()
+    return thread
+
+class VoiceManager:
+    """Decides which voice a hit gets: reserved voices per drum, choke groups, priority stealing.
+
+    A hit takes a free voice while its drum is under its reservation, or when
+    enough free voices stay for every other drum's unused reservation. Otherwise
+    it steals the lowest-priority, oldest voice among drums over their
+    reservation (or its own drum's oldest), so a cymbal roll runs out of its
+    own voices before it can touch kick or snare. A hit in a choke group first
+    stops every ringing voice of that group.
+    """
+    def __init__(self, n_voices, groups=VOICE_GROUPS, chokes=CHOKE_GROUPS):
+        self.n = n_voices
+        self.groups = groups
+        self.chokes = {zone: group for group in chokes for zone in group}
+        self.reserved = {}  # Zones the engine has a sound for -> reserved voices
+        self.zone = [None] * n_voices
+        self.started = [0] * n_voices
+        self.clock = 0
+        self.stats = Counters("played", "stolen", "choked", "dropped")  # Counted as (outcome, zone)
+
+    def group(self, zone): return self.groups.get(zone, DEFAULT_VOICE_GROUP)
+
+    def add_zone(self, zone): self.reserved[zone] = self.group(zone)[0]
+
+    def allocate(self, zone, busy):
+        """`busy`: per-voice flags from the engine. Returns (voice or None, voices to stop first)."""
+        zones = [z if b else None for z, b in zip(self.zone, busy)]
+        stop = []
+        for z in self.chokes.get(zone, ()):
+            for v, ringing in enumerate(zones):
+                if ringing == z:
+                    stop.append(v)
+                    zones[v] = None
+        if stop: self.stats.inc(("choked", zone), len(stop))
+
+        active = collections.Counter(zones)
+        free = [v for v, z in enumerate(zones) if z is None]
+        reserve, priority = self.group(zone)
+        owed = sum(max(0, r - active[z]) for z, r in self.reserved.items() if z != zone)
+        if free and (active[zone] < reserve or len(free) > owed):
+            v = free[0]
+        else:
+            entitled = active[zone] < reserve  # May take any voice held beyond a reservation
+            victims = [v for v, z in enumerate(zones) if z is not None and (z == zone or (
+                active[z] > self.reserved.get(z, 0) and (entitled or self.group(z)[1] <= priority)))]
+            if not victims:
+                self.stats.inc(("dropped", zone))
+                return None, stop
+            v = min(victims, key=lambda v: (self.group(zones[v])[1], self.started[v]))
+            stop.append(v)
+            self.stats.inc(("stolen", zones[v]))
+        self.zone[v] = zone
+        self.clock += 1
+        self.started[v] = self.clock
+        self.stats.inc(("played", zone))
+        return v, stop
+
+class TimerQueue:
+    """Calls functions at time.time() stamps, in order, from one thread started on first use."""
+    def __init__(self):
+        self.heap, self.seq = [], 0
+        self.cond = threading.Condition()
+        self.thread = None
+
+    def call_at(self, at, fn, *args):
+        with self.cond:
+            self.seq += 1
+            heapq.heappush(self.heap, (at, self.seq, fn, args))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+            self.cond.notify()
+
+    def run(self):
+        while True:
+            with self.cond:
+                if not self.heap:
+                    self.cond.wait()
+                    continue
+                delay = self.heap[0][0] - time.time()
+                if delay > 0:
+                    self.cond.wait(delay)
+                    continue
+                at, seq, fn, args = heapq.heappop(self.heap)
+            fn(*args)
+
+class PygameAudioEngine:
+    """The original SDL mixer path: 16 shared channels, 64-frame buffer."""
+    name = "pygame"
+
+    def __init__(self, files=SOUND_FILES):
+        pygame.mixer.pre_init(frequency=SAMPLE_RATE, size=-16, channels=2, buffer=MIXER_BLOCK)
+        pygame.mixer.init()
+        pygame.mixer.set_num_channels(MAX_VOICES)
+        self.rate = pygame.mixer.get_init()[0]  # What SDL actually opened, so cached buffers need no conversion
+        self.channels = [pygame.mixer.Channel(i) for i in range(MAX_VOICES)]
+        self.voices = VoiceManager(MAX_VOICES)
+        self.timer = TimerQueue()  # SDL starts a sound on its next buffer, so scheduled hits wait here
+        self.lock = threading.Lock()  # The timer and the hit thread can both start sounds
+        self.gain = {}
+        self.kit = Kit()
+        self.set_kit(build_kit("default", kit_from_files(files), self.native_sample))
+
+    def native_sample(self, path):
+        data = cached_sample(path, self.rate, np.int16)
+        return None if data is None else pygame.mixer.Sound(buffer=data)
+
+    def set_kit(self, kit):
+        for zone in kit.layers:
+            if zone not in self.gain:
+                self.gain[zone] = volumes.get(zone, 1.0)
+                self.voices.add_zone(zone)
+        self.kit = kit
+
+    def play(self, zone, velocity=1.0, at=None, started=None):
+        """`started(t)` is called with the time.time() the channel actually starts, if it does."""
+        if at is not None and at - time.time() > 0.001:
+            if not self.kit.layers.get(zone): return False
+            self.timer.call_at(at, self.play, zone, velocity, None, started)
+            return True
+        with self.lock:
+            snd = self.kit.pick(zone, velocity)
+            if snd is None: return False
+            v, stop = self.voices.allocate(zone, [ch.get_busy() for ch in self.channels])
+            for s in stop: self.channels[s].stop()
+            if v is None: return False
+            ch = self.channels[v]
+            ch.play(snd)
+            ch.set_volume(velocity * self.gain[zone])
+        if started: started(time.time())
+        return True
+
+    def add_sound(self, zone, path):
+        snd = self.native_sample(path)
+        if snd is None: return
+        self.kit.set(zone, [snd])
+        self.set_kit(self.kit)
+
+    def active_voices(self): return sum(ch.get_busy() for ch in self.channels)
+
+    def set_volume(self, zone, vol):
+        if zone in self.gain: self.gain[zone] = vol
+
+    def close(self): pygame.mixer.quit()
+
+class NullSink:
+    """Pulls blocks from the mixer and discards them. realtime=False runs flat out."""
+    def __init__(self, realtime=True):
+        self.realtime = realtime
+        self.running = False
+
+    def start(self, engine):
+        self.engine = engine
+        self.running = True
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def run(self):
+        period = self.engine.block / self.engine.rate
+        next_t = time.perf_counter()
+        while self.running:
+            self.write(self.engine.render())
+            if self.realtime:
+                next_t += period
+                delay = next_t - time.perf_counter()
+                if delay > 0: time.sleep(delay)
+                else: next_t = time.perf_counter()
+
+    def write(self, block): pass
+    def stop(self): self.running = False
+
+class WavFileSink(NullSink):
+    """Renders the mix into a 16-bit stereo WAV file, for listening back to a benchmark."""
+    def __init__(self, path, realtime=True):
+        super().__init__(realtime)
+        self.path = path
+
+    def start(self, engine):
+        self.wav = wave.open(self.path, "wb")
+        self.wav.setnchannels(2); self.wav.setsampwidth(2); self.wav.setframerate(engine.rate)
+        super().start(engine)
+
+    def write(self, block): self.wav.writeframes(block.tobytes())
+
+    def stop(self):
+        super().stop()
+        time.sleep(2 * self.engine.block / self.engine.rate)
+        self.wav.close()
+
+class DeviceSink:
+    """Sound card output through a PortAudio callback stream (needs `sounddevice`)."""
+    def start(self, engine):
+        import sounddevice
+        def callback(outdata, frames, t, status):
+            outdata[:] = engine.render()
+        self.stream = sounddevice.OutputStream(samplerate=engine.rate, blocksize=engine.block, channels=2,
+                                               dtype="int16", latency="low", callback=callback)
+        self.stream.start()
+
+    def stop(self): self.stream.close()
+
+class NumpyMixerEngine:
+    """Mixes preloaded float32 samples in a fixed-size block callback.
+
+    play() only appends to a deque; voices are started inside render(), so a hit
+    can land at an exact frame offset within the block (`at` is a time.time()
+    stamp). All mixing buffers are allocated up front.
+    """
+    name = "numpy"
+
+    def __init__(self, files=SOUND_FILES, sink=None, rate=SAMPLE_RATE, block=MIXER_BLOCK, max_voices=MAX_VOICES):
+        self.rate, self.block, self.max_voices = rate, block, max_voices
+        self.zones, self.zone_gain = {}, []
+        self.voices = VoiceManager(max_voices)
+        self.kit = Kit()
+        self.set_kit(build_kit("default", kit_from_files(files), self.native_sample))
+
+        self.v_zone = np.full(max_voices, -1, dtype=np.int32)  # -1 = free
+        self.v_active = [False] * max_voices  # Kept by start_voice()/release(); render() and allocate() read it as is
+        self.v_data = [None] * max_voices  # The take each voice plays, held even if its kit is swapped out
+        self.v_started = [None] * max_voices  # started(t) callbacks of voices whose first sample is still to come
+        self.v_pos = np.zeros(max_voices, dtype=np.int64)
+        self.v_delay = np.zeros(max_voices, dtype=np.int64)
+        self.v_gain = np.zeros(max_voices, dtype=np.float32)
+        self.mix = np.zeros((block, 2), dtype=np.float32)
+        self.scratch = np.zeros((block, 2), dtype=np.float32)
+        self.out = np.zeros((block, 2), dtype=np.int16)
+
+        self.pending = collections.deque()
+        self.blocks_rendered = 0
+        self.block_start = time.time()
+        self.callback_time = LatencyHistogram()
+
+        self.sink = sink if sink is not None else NullSink()
+        self.sink.start(self)
+
+    def native_sample(self, path): return cached_sample(path, self.rate, np.float32)
+
+    def set_kit(self, kit):
+        for zone in kit.layers:
+            if zone not in self.zones:
+                self.zone_gain.append(volumes.get(zone, 1.0))
+                self.voices.add_zone(zone)
+                self.zones[zone] = len(self.zone_gain) - 1
+        self.kit = kit
+
+    def add_sample(self, zone, data):
+        self.kit.set(zone, [data])
+        self.set_kit(self.kit)
+
+    def add_sound(self, zone, path):
+        data = self.native_sample(path)
+        if data is not None: self.add_sample(zone, data)
+
+    def play(self, zone, velocity=1.0, at=None, started=None):
+        """`started(t)` is called from render() with the time.time() of the voice's first sample, if it sounds."""
+        data = self.kit.pick(zone, velocity)
+        if data is None: return False
+        self.pending.append((zone, data, velocity, at, started))
+        return True
+
+    def set_volume(self, zone, vol):
+        if zone in self.zones: self.zone_gain[self.zones[zone]] = vol
+
+    def start_voice(self, zone, data, velocity, at, started=None):
+        v, stop = self.voices.allocate(zone, self.v_active)
+        for s in stop: self.release(s)
+        if v is None: return
+        delay = 0
+        if at is not None:
+            delay = max(0, int((at - self.block_start) * self.rate))
+        idx = self.zones[zone]
+        self.v_active[v] = True
+        self.v_zone[v] = idx
+        self.v_data[v] = data
+        self.v_pos[v] = 0
+        self.v_delay[v] = delay
+        self.v_gain[v] = velocity * self.zone_gain[idx]
+        self.v_started[v] = started
+
+    def release(self, v):
+        self.v_active[v] = False
+        self.v_zone[v] = -1
+        self.v_data[v] = None
+        self.v_started[v] = None
+
+    def render(self):
+        t0 = time.perf_counter()
+        self.block_start = time.time()
+        while self.pending:
+            self.start_voice(*self.pending.popleft())
+
+        mix, scratch, block, active = self.mix, self.scratch, self.block, self.v_active
+        mix.fill(0.0)
+        for v in range(self.max_voices):
+            if not active[v]: continue
+            delay = self.v_delay[v]
+            if delay >= block:
+                self.v_delay[v] = delay - block
+                continue
+            if self.v_started[v] is not None:  # Its first sample goes out in this block
+                self.v_started[v](self.block_start + delay / self.rate)
+                self.v_started[v] = None
+            sample = self.v_data[v]
+            pos = self.v_pos[v]
+            n = min(block - delay, len(sample) - pos)
+            np.multiply(sample[pos:pos + n], self.v_gain[v], out=scratch[:n])
+            np.add(mix[delay:delay + n], scratch[:n], out=mix[delay:delay + n])
+            self.v_delay[v] = 0
+            self.v_pos[v] = pos + n
+            if pos + n >= len(sample): self.release(v)
+
+        np.clip(mix, -1.0, 1.0, out=mix)
+        np.multiply(mix, 32767.0, out=mix)
+        self.out[:] = mix
+        self.blocks_rendered += 1
+        self.callback_time.add(time.perf_counter() - t0)
+        return self.out
+
+    def active_voices(self): return self.v_active.count(True)
+
+    def close(self): self.sink.stop()
+
+def make_sink(kind):
+    if kind == "null": return NullSink()
+    if kind == "device": return DeviceSink()
+    return WavFileSink(kind)
+
+def create_audio_engine(backend=AUDIO_BACKEND):
+    if backend == "numpy":
+        try: return NumpyMixerEngine(sink=make_sink(AUDIO_SINK))
+        except Exception as e: print(f" [AUDIO] NumPy mixer unavailable ({e}), falling back to pygame")
+    return PygameAudioEngine()
+
+if IS_MAIN_PROCESS:  # The inference worker re-imports this file and needs none of this
+    pygame.display.init()
+    pygame.font.init()
+audio = None
+
+def init_audio():
+    # Mixer and WAV parsing come after the window; pre_init() still applies as pygame.init() is never called
+    global audio
+    audio = create_audio_engine()
+    print(f" [AUDIO] Engine: {audio.name}")
+
+def play_sound(zone, velocity=1.0, at=None, started=None):
+    if audio.play(zone, velocity, at, started):
+        log_event(f" > {zone}")
 
 # ================= V4L2 CAMERA =================
 class WebcamStream:
-    def __init__(self, src=0, width=640, height=360):
+    def __init__(self, src=0, width=640, height=360, arrived=None):
         self.stream = cv2.VideoCapture(src, cv2.CAP_V4L2)
         self.stream.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc('M', 'J', 'P', 'G'))
         self.stream.set(cv2.CAP_PROP_FRAME_WIDTH, width)
         self.stream.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
         self.stream.set(cv2.CAP_PROP_FPS, 60)
         self.stream.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-        (self.grabbed, self.frame) = self.stream.read()
+        (self.grabbed, frame) = self.stream.read()
+        self.latest = (frame, time.time())  # Swapped as one tuple so frame and time always match
         self.stopped = False
+        self.arrived = arrived or threading.Event()  # The owning player's arrived["camera"]
 
     def start(self):
         threading.Thread(target=self.update, args=(), daemon=True).start()
@@ -100,97 +863,995 @@ class WebcamStream:
             if not grabbed: self.stopped = True
             else:
                 self.grabbed = True
-                self.frame = frame
+                self.latest = (frame, time.time())
+                camera_stats.inc("received")
+                self.arrived.set()
+                if session_recorder: session_recorder.add(REC_CAMERA, self.latest[1], frame)
     
-    def read(self): return self.frame
+    def read(self): return self.latest[0]
+    def read_timed(self): return self.latest
     def stop(self): self.stopped = True; self.stream.release()
 
 # ================= VISION LOGIC =================
-mp_pose = mp.solutions.pose
-pose = mp_pose.Pose(model_complexity=0, min_detection_confidence=0.5, min_tracking_confidence=0.5)
-
-def get_drum_zone(x, y):
-    if y < CYMBAL_HEIGHT:
-        if x < DIVIDER_2: return "CRASH"
-        return "RIDE"
-    else:
-        if x < DIVIDER_1: return "HI-HAT"
-        if x < DIVIDER_2: return "SNARE"
-        return "FLOOR TOM"
+
+def synthetic_frame(h=360, w=640):
+    """Deterministic stand-in camera frame: a gradient with noise on top."""
+    rng = np.random.default_rng(0)
+    grad = np.linspace(0, 255, w, dtype=np.float32)[None, :, None]
+    return np.clip(grad + rng.normal(0, 20, (h, w, 3)), 0, 255).astype(np.uint8)
+
+class InferenceController:
+    """Picks the Pose model complexity and input scale that keep p95 inference under budget.
+
+    Levels run from best quality to cheapest. Every ADAPT_WINDOW frames the p95
+    of the current level is checked: over budget steps down, comfortably under
+    budget (with the next level up last measured in budget) steps back up.
+    """
+    def __init__(self, levels=INFERENCE_LEVELS, budget_ms=INFERENCE_BUDGET_MS, start_level=0):
+        self.levels = list(levels)
+        self.budget_ms = budget_ms
+        self.level = start_level
+        self.models = {}
+        self.window = collections.deque(maxlen=ADAPT_WINDOW)
+        self.level_p95 = [None] * len(self.levels)  # Last measured p95 per level
+        self.level_seen = [0.0] * len(self.levels)
+        self.switches = 0
+        self.last_ms = 0.0
+        self.broken = set()  # Levels whose model failed to load (e.g. offline first run)
+        self.lock = threading.Lock()  # Calibration runs off the UI thread
+
+    def model(self, complexity):
+        if complexity not in self.models:
+            self.models[complexity] = mp.solutions.pose.Pose(
+                model_complexity=complexity, min_detection_confidence=0.5, min_tracking_confidence=0.5)
+        return self.models[complexity]
+
+    def process(self, frame, prescale=1.0):
+        """BGR frame -> pose results at the current level (landmarks stay normalised).
+
+        `prescale` says the frame was already shrunk (e.g. 0.5 by a reduced JPEG
+        decode), so only the remainder of the level's scale is applied here.
+        """
+        with self.lock:
+            complexity, scale = self.levels[self.level]
+            scale /= prescale
+            if scale < 1.0: frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            t0 = time.perf_counter()
+            results = self.model(complexity).process(rgb)
+            self.last_ms = (time.perf_counter() - t0) * 1000.0
+            inference_time.add(self.last_ms / 1000.0)
+            self.record(self.last_ms)
+        return results
+
+    def record(self, ms):
+        self.window.append(ms)
+        if not ADAPTIVE_INFERENCE or len(self.window) < ADAPT_WINDOW: return
+        p95 = float(np.percentile(self.window, 95))
+        self.level_p95[self.level] = p95
+        self.level_seen[self.level] = time.time()
+        down = next((i for i in range(self.level + 1, len(self.levels)) if i not in self.broken), None)
+        up = next((i for i in range(self.level - 1, -1, -1) if i not in self.broken), -1)
+        if p95 > self.budget_ms and down is not None:
+            self.set_level(down, p95)
+        elif up >= 0 and p95 < self.budget_ms * ADAPT_HEADROOM and (
+                self.level_p95[up] is None or self.level_p95[up] < self.budget_ms
+                or time.time() - self.level_seen[up] > ADAPT_RETRY_AFTER):
+            self.set_level(up, p95)
+        else:
+            self.window.clear()
+
+    def usable(self, level):
+        """Loads the level's model on first use; a level whose model fails is never picked again."""
+        if level in self.broken: return False
+        try: self.model(self.levels[level][0])
+        except Exception as e:
+            log_event(f" [VISION] Pose complexity {self.levels[level][0]} unavailable: {e}")
+            self.broken.add(level)
+            self.level_p95[level] = float("inf")
+            return False
+        return True
+
+    def set_level(self, level, p95):
+        if not self.usable(level):
+            self.window.clear()
+            return
+        self.level = level
+        self.window.clear()
+        self.switches += 1
+        complexity, scale = self.levels[level]
+        log_event(f" [VISION] p95 {p95:.1f} ms vs budget {self.budget_ms:.0f} ms -> complexity {complexity}, scale {scale}")
+
+    def calibrate(self, frame=None, frames=10):
+        """Times every level on a test frame and starts on the best one that fits the budget."""
+        if frame is None: frame = synthetic_frame()
+        with self.lock:
+            for i, (complexity, scale) in enumerate(self.levels):
+                if not self.usable(i): continue
+                model = self.model(complexity)
+                small = frame if scale == 1.0 else cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+                rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+                model.process(rgb)  # First call pays the warm-up
+                times = []
+                for _ in range(frames):
+                    t0 = time.perf_counter()
+                    model.process(rgb)
+                    times.append((time.perf_counter() - t0) * 1000.0)
+                self.level_p95[i] = float(np.percentile(times, 95))
+                self.level_seen[i] = time.time()
+            usable = [i for i in range(len(self.levels)) if i not in self.broken] or [self.level]
+            fits = [i for i in usable if self.level_p95[i] <= self.budget_ms]
+            self.level = fits[0] if fits else usable[-1]
+            self.window.clear()
+        complexity, scale = self.levels[self.level]
+        log_event(f" [VISION] Calibrated: complexity {complexity}, scale {scale} (p95 {self.level_p95[self.level]:.1f} ms, budget {self.budget_ms:.0f} ms)")
+
+    def current_scale(self): return self.levels[self.level][1]
+
+    def reset(self):
+        """Drops MediaPipe's cross-frame tracking state in every loaded model."""
+        with self.lock:
+            for model in self.models.values(): model.reset()
+            self.window.clear()
+
+    def status(self):
+        complexity, scale = self.levels[self.level]
+        window = list(self.window)
+        return {
+            "complexity": complexity, "scale": scale, "budget_ms": self.budget_ms,
+            "window_p95_ms": round(float(np.percentile(window, 95)), 2) if window else None,
+            "switches": self.switches,
+            "levels": [{"complexity": c, "scale": s, "available": i not in self.broken,
+                        "p95_ms": None if p is None or i in self.broken else round(p, 2)}
+                       for i, ((c, s), p) in enumerate(zip(self.levels, self.level_p95))],
+        }
+
+def pose_task_model(complexity=POSE_COMPLEXITY):
+    """Path of the PoseLandmarker bundle matching a Pose model complexity, downloaded the first time."""
+    variant = ("lite", "full", "heavy")[complexity]
+    path = POSE_TASK_MODEL.format(variant)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        log_event(f" [VISION] Downloading {os.path.basename(path)}")
+        urllib.request.urlretrieve(POSE_TASK_MODEL_URL.format(variant), path + ".part")
+        os.replace(path + ".part", path)
+    return path
+
+class PoseStream:
+    """One feed's Tasks PoseLandmarker in LIVE_STREAM mode (POSE_BACKEND = "tasks").
+
+    submit() hands the frame to MediaPipe and returns at once. The graph runs
+    on MediaPipe's own thread, skips frames that arrive while it is busy, and
+    calls done() with the timestamp the frame went in with, so the tracker is
+    stepped at the frame's capture time. One per player feed, like
+    PlayerSession.model(): timestamps must rise and tracking must not jump
+    between cameras.
+    """
+    def __init__(self, player, source, complexity=POSE_COMPLEXITY):
+        self.player, self.source = player, source
+        self.pending = collections.OrderedDict()  # Timestamp (ms) -> (capture time, submitted at)
+        self.last_ts = 0
+        self.submitted = self.completed = self.skipped = 0
+        self.latency = LatencyHistogram()  # submit() -> result callback
+        self.lock = threading.Lock()  # The vision thread submits, MediaPipe's thread calls back
+        vision = mp.tasks.vision
+        options = vision.PoseLandmarkerOptions(
+            base_options=mp.tasks.BaseOptions(model_asset_path=pose_task_model(complexity)),
+            running_mode=vision.RunningMode.LIVE_STREAM, num_poses=1,
+            min_pose_detection_confidence=0.5, min_tracking_confidence=0.5, result_callback=self.done)
+        self.landmarker = vision.PoseLandmarker.create_from_options(options)
+
+    def submit(self, frame, frame_time):
+        """Queues one unmirrored BGR frame; its landmarks reach the tracker from done()."""
+        ts = max(self.last_ts + 1, int(frame_time * 1000))  # LIVE_STREAM needs strictly rising ms timestamps
+        self.last_ts = ts
+        image = mp.Image(image_format=mp.ImageFormat.SRGB, data=cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        with self.lock:
+            self.pending[ts] = (frame_time, time.perf_counter())
+            self.submitted += 1
+        self.landmarker.detect_async(image, ts)
+
+    def done(self, result, image, timestamp_ms):
+        now = time.perf_counter()
+        with self.lock:
+            while self.pending:  # Frames MediaPipe skipped never come back
+                ts, (frame_time, t0) = self.pending.popitem(last=False)
+                if ts == timestamp_ms: break
+                self.skipped += 1
+            else:
+                return
+            self.completed += 1
+        self.latency.add(now - t0)
+        player, source = self.player, self.source
+        if result.pose_landmarks:
+            lm = result.pose_landmarks[0]
+            # Mirror x as cv2.flip does for frames; unmirrored, MediaPipe's left arm is the player's left
+            process_landmarks(player, [(name, 1.0 - lm[e].x, lm[e].y, 1.0 - lm[wr].x, lm[wr].y, lm[wr].visibility)
+                                       for name, e, wr in (("Left", 13, 15), ("Right", 14, 16))], frame_time, source)
+        else:  # No pose at all: both wrists lost on this feed
+            source_stats.inc(("frames", source, player.name))
+            source_stats.inc(("lost", source, player.name), 2)
+        frame_done(player, source, frame_time, (now - t0) * 1000.0)
+
+    def close(self): self.landmarker.close()
+
+    def status(self):
+        return {"submitted": self.submitted, "completed": self.completed, "skipped": self.skipped,
+                "latency": self.latency.summary()}
+
+inference_ctl = InferenceController(start_level=INFERENCE_LEVELS.index((POSE_COMPLEXITY, 1.0)))
+
+class StreamController:
+    """Picks the resolution, JPEG quality and frame rate one player's phone streams at.
+
+    Levels run from best quality to cheapest. Every STREAM_WINDOW seconds of
+    phone frames, glass-to-zone age, network age, inference time against the
+    frame interval and the share of frames dropped before inference are
+    checked: any over budget steps down, all comfortably under (with the next
+    level up not last seen over budget) steps back up. Bytes per second are
+    kept alongside. Changes are logged, kept in `changes` and pushed to the
+    page through `send`, which the web server sets when the page connects.
+    """
+    def __init__(self, name, levels=STREAM_LEVELS, start_level=STREAM_START_LEVEL):
+        self.name, self.levels = name, list(levels)
+        self.level = start_level
+        self.level_over = [None] * len(self.levels)  # Whether a level's last window was over budget
+        self.level_seen = [0.0] * len(self.levels)
+        self.switches = collections.Counter()  # "down" / "up"
+        self.changes = collections.deque(maxlen=64)  # (wall time, level, reason)
+        self.bytes_per_s, self.last_window = 0.0, {}
+        self.send = None
+        self.lock = threading.Lock()  # Frames arrive on the web server's thread, zone ages from the vision thread
+        self.start_window(time.time())
+
+    def start_window(self, now):
+        self.t0, self.frames, self.bytes, self.dropped = now, 0, 0, 0
+        self.network_ms, self.age_ms, self.infer_ms = [], [], []
+
+    def settings(self):
+        width, height, quality, fps = self.levels[self.level]
+        return {"width": width, "height": height, "quality": quality, "fps": fps}
+
+    def describe(self):
+        width, height, quality, fps = self.levels[self.level]
+        return f"{width}x{height} q{quality} @ {fps} fps"
+
+    def received(self, nbytes, network_s, now):
+        """One frame arrived (h); may decide and push new settings to the page."""
+        with self.lock:
+            self.frames += 1
+            self.bytes += nbytes
+            self.network_ms.append(network_s * 1000.0)
+            changed = now - self.t0 >= STREAM_WINDOW and self.decide(now)
+        if changed and self.send: self.send(self.settings())
+
+    def lost(self):
+        with self.lock: self.dropped += 1
+
+    def processed(self, age_s, infer_ms):
+        with self.lock:
+            self.age_ms.append(age_s * 1000.0)
+            if infer_ms: self.infer_ms.append(infer_ms)
+
+    def decide(self, now):
+        p90 = lambda values: float(np.percentile(values, 90)) if values else None
+        self.bytes_per_s = self.bytes / (now - self.t0)
+        checks = [("glass-to-zone p90 ms", p90(self.age_ms), STREAM_AGE_BUDGET_MS),
+                  ("network p90 ms", p90(self.network_ms), STREAM_NETWORK_BUDGET_MS),
+                  ("inference p90 ms", p90(self.infer_ms), 1000.0 / self.levels[self.level][3]),
+                  ("dropped", self.dropped / self.frames, STREAM_MAX_DROPPED)]
+        self.last_window = {name: None if value is None else round(value, 3) for name, value, budget in checks}
+        self.last_window["kB/s"] = round(self.bytes_per_s / 1000.0, 1)
+        self.start_window(now)
+        over = [f"{name} {value:.2f} > {budget:.2f}" for name, value, budget in checks if value is not None and value > budget]
+        calm = all(value is None or value < budget * ADAPT_HEADROOM for name, value, budget in checks)
+        self.level_over[self.level], self.level_seen[self.level] = bool(over), now
+        up = self.level - 1
+        if not ADAPTIVE_STREAM: return False
+        if over and self.level + 1 < len(self.levels):
+            return self.set_level(self.level + 1, ", ".join(over), now)
+        if calm and up >= 0 and (not self.level_over[up] or now - self.level_seen[up] > ADAPT_RETRY_AFTER):
+            return self.set_level(up, "all within budget", now)
+        return False
+
+    def set_level(self, level, reason, now):
+        self.switches["down" if level > self.level else "up"] += 1
+        self.level = level
+        self.changes.append((round(now, 3), level, reason))
+        log_event(f" [STREAM] {self.name}: {reason} ({self.bytes_per_s / 1000.0:.0f} kB/s) -> {self.describe()}")
+        return True
+
+    def status(self):
+        return {"level": self.level, **self.settings(), "switches": dict(self.switches),
+                "last_window": self.last_window, "changes": list(self.changes)}
+
+class TipHistory:
+    """Ring buffer of one stick's filtered tip position (normalised x, y) by frame time.
+
+    Only the vision loop writes. It fills a slot, then publishes it by bumping
+    `count`, so the hit path reads without a lock. A reader that saw `count` = c
+    copies at most size - 2 entries: if the writer has meanwhile published c + 1
+    and is filling the slot after it, neither slot is in the copy. Anything
+    further along means the writer lapped it, and it retries. Passing `buf`
+    places the arrays in shared memory, so the writer can live in another process.
+    """
+    def __init__(self, size=TIP_HISTORY_SIZE, buf=None, offset=0):
+        self.size = size
+        if buf is None: buf, offset = bytearray(TipHistory.nbytes(size)), 0
+        self.t = np.ndarray((size,), np.float64, buf, offset)
+        self.xy = np.ndarray((size, 2), np.float64, buf, offset + size * 8)
+        self.counter = np.ndarray((1,), np.int64, buf, offset + size * 24)
+
+    @staticmethod
+    def nbytes(size=TIP_HISTORY_SIZE): return size * 24 + 8
+
+    @property
+    def count(self): return int(self.counter[0])
+
+    def clear(self): self.counter[0] = 0
+
+    def push(self, t, x, y):
+        c = self.count
+        if c and t <= self.t[(c - 1) % self.size]: return  # Same camera frame processed twice
+        i = c % self.size
+        self.t[i] = t
+        self.xy[i, 0] = x
+        self.xy[i, 1] = y
+        self.counter[0] = c + 1
+
+    def snapshot(self):
+        for _ in range(3):
+            c = self.count
+            n = min(c, self.size - 2)
+            if n <= 0: return None
+            idx = np.arange(c - n, c) % self.size
+            t, xy = self.t[idx], self.xy[idx]
+            if self.count <= c + 1: return t, xy
+        return None
+
+    def position_at(self, t_query):
+        snap = self.snapshot()
+        if snap is None: return None
+        t, xy = snap
+        if t_query - t[-1] > TIP_STALE_AFTER or t_query < t[0]: return None
+        if t_query <= t[-1]:
+            return np.interp(t_query, t, xy[:, 0]), np.interp(t_query, t, xy[:, 1])
+        j = max(0, int(np.searchsorted(t, t[-1] - TIP_VELOCITY_SPAN, "right")) - 1)
+        if t[-1] <= t[j]: return xy[-1, 0], xy[-1, 1]
+        dt = min(t_query - t[-1], TIP_MAX_EXTRAPOLATION)
+        v = (xy[-1] - xy[j]) / (t[-1] - t[j])
+        return xy[-1, 0] + v[0] * dt, xy[-1, 1] + v[1] * dt
+
+# ================= ZONE LAYOUT =================
+# Pads are rectangles, polygons or circles in normalised (mirrored) frame
+# coordinates. The layout is rasterized once into a label map, so a zone lookup
+# costs the same however many pads the kit has: ~0.5 us, against ~0.1 us for the
+# old hard-wired five-zone if-chain (see --bench zones). Later pads paint over
+# earlier ones; anything left uncovered plays the layout's "default" zone.
+#
+#   {"default": "SNARE", "pads": [
+#       {"zone": "CRASH", "rect": [x0, y0, x1, y1]},
+#       {"zone": "TOM 2", "circle": [cx, cy, r], "sound": "sounds/tom2.wav"},   (r in frame widths)
+#       {"zone": "RIDE", "polygon": [[x, y], [x, y], [x, y]]}]}
+def default_zone_layout():
+    """The original kit: cymbals above CYMBAL_HEIGHT, split by DIVIDER_1 / DIVIDER_2."""
+    return {"default": "SNARE", "pads": [
+        {"zone": "CRASH", "rect": [0.0, 0.0, DIVIDER_2, CYMBAL_HEIGHT]},
+        {"zone": "RIDE", "rect": [DIVIDER_2, 0.0, 1.0, CYMBAL_HEIGHT]},
+        {"zone": "HI-HAT", "rect": [0.0, CYMBAL_HEIGHT, DIVIDER_1, 1.0]},
+        {"zone": "SNARE", "rect": [DIVIDER_1, CYMBAL_HEIGHT, DIVIDER_2, 1.0]},
+        {"zone": "FLOOR TOM", "rect": [DIVIDER_2, CYMBAL_HEIGHT, 1.0, 1.0]},
+    ]}
+
+def load_zone_layout(path):
+    with open(path) as f: layout = json.load(f)
+    if not isinstance(layout.get("pads"), list): raise ValueError("layout needs a \"pads\" list")
+    return layout
+
+def pad_bounds(pad, h, w):
+    """(x0, y0, x1, y1): normalised bounding box of a rect, circle or polygon pad."""
+    if "rect" in pad: return pad["rect"]
+    if "circle" in pad:
+        cx, cy, r = pad["circle"]
+        return cx - r, cy - r * w / h, cx + r, cy + r * w / h
+    if "polygon" in pad:
+        pts = np.asarray(pad["polygon"], float)
+        return pts[:, 0].min(), pts[:, 1].min(), pts[:, 0].max(), pts[:, 1].max()
+    raise ValueError(f"pad {pad['zone']!r} needs a rect, circle or polygon")
+
+def pad_mask(pad, x, y, h, w):
+    """Which pixel centres the pad covers; `x` is a row of centres, `y` a column."""
+    if "rect" in pad:
+        x0, y0, x1, y1 = pad["rect"]
+        return (x >= x0) & (x < x1) & (y >= y0) & (y < y1)
+    if "circle" in pad:
+        cx, cy, r = pad["circle"]
+        return (x - cx) ** 2 + ((y - cy) * h / w) ** 2 <= r * r
+    mask = np.zeros((len(y), x.shape[1]), bool)  # Polygon, even-odd rule, one edge at a time
+    pts = np.asarray(pad["polygon"], float)
+    for (xa, ya), (xb, yb) in zip(pts, np.roll(pts, -1, axis=0)):
+        if ya == yb: continue
+        crosses = (ya > y) != (yb > y)
+        mask ^= crosses & (x < xa + (y - ya) * (xb - xa) / (yb - ya))
+    return mask
+
+def rasterize_zones(layout, shape, rows_per_chunk=ZONE_RASTER_ROWS):
+    """Returns (zone names, label map as bytes, h, w, uint8 label map, edge pixels as (rows, cols)).
+
+    Each pad is only tested inside its bounding box, and the map is built
+    `rows_per_chunk` rows at a time with the GIL let go in between, so a
+    rebuild on a background thread never holds up lookups on the hit path.
+    Lookups index the bytes copy, which costs about half a NumPy scalar index.
+    """
+    h, w = shape
+    names, pads = [layout.get("default", "SNARE")], []
+    for pad in layout["pads"]:
+        zone = pad["zone"]
+        if zone not in names: names.append(zone)
+        x0, y0, x1, y1 = pad_bounds(pad, h, w)
+        rows = max(0, math.floor(y0 * h) - 1), min(h, math.ceil(y1 * h) + 1)
+        cols = max(0, math.floor(x0 * w) - 1), min(w, math.ceil(x1 * w) + 1)
+        pads.append((names.index(zone), pad, rows, cols))
+    if len(names) > 256: raise ValueError("at most 256 zones")
+    labels = np.zeros((h, w), np.uint8)
+    x = (np.arange(w) + 0.5) / w  # Pixel centres
+    y = (np.arange(h) + 0.5) / h
+    edge_rows, edge_cols = [], []
+    for r0 in range(0, h, rows_per_chunk):
+        r1 = min(h, r0 + rows_per_chunk)
+        for label, pad, (i0, i1), (j0, j1) in pads:  # Later pads paint over earlier ones
+            i0, i1 = max(i0, r0), min(i1, r1)
+            if i0 < i1 and j0 < j1:
+                labels[i0:i1, j0:j1][pad_mask(pad, x[None, j0:j1], y[i0:i1, None], h, w)] = label
+        edges = np.zeros((r1 - r0, w), bool)
+        edges[:, 1:] = labels[r0:r1, 1:] != labels[r0:r1, :-1]
+        lo = max(r0, 1)  # The row above is already final
+        edges[lo - r0:] |= labels[lo:r1] != labels[lo - 1:r1 - 1]
+        rows, cols = np.nonzero(edges)
+        edge_rows.append(rows + r0)
+        edge_cols.append(cols)
+        time.sleep(0)  # Lets the hit path and vision threads in between chunks
+    return names, labels.tobytes(), h, w, labels, (np.concatenate(edge_rows), np.concatenate(edge_cols))
+
+class ZoneLayout:
+    """The live label map. Rebuilds run on a background thread and swap in with one assignment."""
+    def __init__(self, layout=None, shape=ZONE_MAP_SHAPE):
+        self.layout = layout or default_zone_layout()
+        self.shape = tuple(shape)
+        self.current = rasterize_zones(self.layout, self.shape)
+        self.next_layout, self.next_shape = self.layout, self.shape
+        self.lock = threading.Lock()
+        self.building = False
+        self.swaps = 0
+
+    def zone_at(self, x, y):
+        names, flat, h, w, _, _ = self.current
+        i, j = int(y * h), int(x * w)
+        if i < 0: i = 0
+        elif i >= h: i = h - 1
+        if j < 0: j = 0
+        elif j >= w: j = w - 1
+        return names[flat[i * w + j]]
+
+    def index(self, zone):
+        """Label of `zone` in the current map (what the inference worker reports), -1 if absent."""
+        names = self.current[0]
+        return names.index(zone) if zone in names else -1
+
+    def name(self, label):
+        names = self.current[0]
+        return names[label] if 0 <= label < len(names) else None
+
+    def request(self, layout=None, shape=None):
+        """Queues a new layout and/or resolution. Lookups use the old map until the new one is ready."""
+        with self.lock:
+            if layout is not None: self.next_layout = layout
+            if shape is not None: self.next_shape = tuple(shape)
+            if self.building: return
+            self.building = True
+        threading.Thread(target=self.rebuild, daemon=True).start()
+
+    def rebuild(self):
+        while True:
+            with self.lock:
+                layout, shape = self.next_layout, self.next_shape
+                if layout is self.layout and shape == self.shape:
+                    self.building = False
+                    return
+            try: built = rasterize_zones(layout, shape)
+            except (KeyError, ValueError, TypeError) as e:
+                print(f" [ZONES] Layout rejected: {e!r}")
+                with self.lock:
+                    if self.next_layout is layout: self.next_layout = self.layout
+                continue
+            self.current = built
+            self.layout, self.shape = layout, shape
+            self.swaps += 1
+
+    def fit(self, h, w):
+        """Follows the inference resolution; a no-op tuple compare unless the frame size changed."""
+        if (h, w) != self.next_shape: self.request(shape=(h, w))
+
+    def draw(self, frame, color):
+        _, _, _, _, labels, (rows, cols) = self.current
+        if labels.shape == frame.shape[:2]: frame[rows, cols] = color
+
+zone_layout = ZoneLayout()
+
+def register_pad_sounds(layout):
+    """Loads the sound of any pad whose zone the audio engine doesn't have yet."""
+    for pad in layout["pads"]:
+        zone, path = pad["zone"], pad.get("sound")
+        if audio is None or not path or zone in SOUND_FILES: continue
+        SOUND_FILES[zone] = path
+        audio.add_sound(zone, path)
+
+def watch_zone_layout(path=ZONE_LAYOUT_PATH, interval=ZONE_LAYOUT_POLL):
+    """Hot-swaps the layout whenever the file changes. Runs in the main process and the inference worker."""
+    mtime = None
+    while True:
+        try: changed = os.stat(path).st_mtime_ns
+        except OSError: changed = mtime
+        if changed != mtime:
+            mtime = changed
+            try:
+                layout = load_zone_layout(path)
+                register_pad_sounds(layout)
+                zone_layout.request(layout=layout)
+                print(f" [ZONES] Loaded {path}: {len(layout['pads'])} pads")
+            except (OSError, ValueError, KeyError) as e: print(f" [ZONES] Could not load {path}: {e}")
+        time.sleep(interval)
+
+def get_drum_zone(x, y): return zone_layout.zone_at(x, y)
 
 def extend_line(x1, y1, x2, y2, scale=1.0):
-    return int(x2 + (x2-x1)*scale), int(y2 + (y2-y1)*scale)
+    return x2 + (x2-x1)*scale, y2 + (y2-y1)*scale
 
-def process_pose_frame(frame, mirror_mode=False):
-    global current_zone_left, current_zone_right, kalman_state 
-    h, w, _ = frame.shape
-    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    results = pose.process(rgb_frame)
+class TipTracker:
+    """Both arms' stick tips in one state array, stepped by real frame dt.
 
-    if not HEADLESS_MODE:
-        c = (80,80,80)
-        cymbal_y = int(h * CYMBAL_HEIGHT)
-        div_1_x = int(w * DIVIDER_1)
-        div_2_x = int(w * DIVIDER_2)
+    state rows are Left/Right, columns x, y, vx, vy (normalised units and units
+    per second). "alpha-beta" is the old filter with its gains applied per
+    frame interval; "kalman" is a constant-velocity Kalman filter whose
+    covariance (shared by x and y) is kept per arm as [pp, pv, vv].
+    """
+    ARMS = ("Left", "Right")
 
-        cv2.line(frame, (0, cymbal_y), (w, cymbal_y), c, 1)
-        cv2.line(frame, (div_2_x, 0), (div_2_x, cymbal_y), c, 1)
-        cv2.line(frame, (div_1_x, cymbal_y), (div_1_x, h), c, 1)
-        cv2.line(frame, (div_2_x, cymbal_y), (div_2_x, h), c, 1)
+    def __init__(self, mode=TRACKER_MODE, alpha=KALMAN_ALPHA, beta=KALMAN_BETA,
+                 q=KALMAN_PROCESS_NOISE, r=KALMAN_MEASUREMENT_NOISE):
+        self.mode, self.alpha, self.beta, self.q, self.r = mode, alpha, beta, q, r
+        self.state = np.zeros((2, 4))
+        self.cov = np.zeros((2, 3))
+        self.t = np.full(2, -np.inf)  # Last update per arm
+
+    def reset(self):
+        self.state[:] = 0.0
+        self.cov[:] = 0.0
+        self.t[:] = -np.inf
+
+    def update(self, t, z, mask, weight=None):
+        """z: (2, 2) measured tips, mask: which arms were measured. Returns the state array.
+
+        `weight` (per arm, 1 = a normal measurement) scales how far a
+        measurement pulls the state: fused feeds pass visibility and age here.
+        """
+        dt = t - self.t
+        fresh = mask & (dt > TRACK_RESET_AFTER)
+        step = mask & ~fresh & (dt > 0)  # dt <= 0: same frame again
+        if fresh.any():
+            self.state[fresh, :2] = z[fresh]
+            self.state[fresh, 2:] = 0.0
+            self.cov[fresh] = (self.r, 0.0, 1.0)  # Velocity unknown: ~1 frame width / s
+        if step.any():
+            d = np.where(step, dt, 1.0)[:, None]
+            pos, vel = self.state[:, :2], self.state[:, 2:]
+            pred = pos + vel * d
+            res = z - pred
+            if self.mode == "kalman":
+                pp, pv, vv = self.cov.T
+                d1 = d[:, 0]
+                pp = pp + 2 * d1 * pv + d1 * d1 * vv + self.q * d1 ** 3 / 3
+                pv = pv + d1 * vv + self.q * d1 * d1 / 2
+                vv = vv + self.q * d1
+                r = self.r if weight is None else self.r / np.maximum(weight, 1e-3)
+                k_pos, k_vel = pp / (pp + r), pv / (pp + r)
+                new_pos = pred + k_pos[:, None] * res
+                new_vel = vel + k_vel[:, None] * res
+                cov = np.stack([(1 - k_pos) * pp, (1 - k_pos) * pv, vv - k_vel * pv], axis=1)
+                self.cov[step] = cov[step]
+            else:
+                w = 1.0 if weight is None else weight[:, None]
+                new_pos = pred + self.alpha * w * res
+                new_vel = vel + (self.beta * w / d) * res
+            self.state[step, :2] = new_pos[step]
+            self.state[step, 2:] = new_vel[step]
+        self.t[fresh | step] = t
+        return self.state
+
+    def predict(self, ahead):
+        """Tips `ahead` seconds past each arm's last update, clamped to the frame."""
+        return np.clip(self.state[:, :2] + self.state[:, 2:] * ahead, 0.0, 1.0)
+
+def process_landmarks(player, arms, frame_time, source=None, now=None):
+    """Tip tracking and zone lookup straight from elbow/wrist landmarks.
+
+    `arms` holds (name, ex, ey, wx, wy, wrist visibility) per arm, in normalised
+    and already mirrored image coordinates. Used by both the server-side pose
+    path and phone-side pose packets, for one player. `source` names the feed
+    ("camera" / "phone") for the per-feed counts; while the player fuses two
+    feeds, each arm is weighted by wrist visibility and frame age and frames
+    older than the arm's last update are dropped. Returns (name, wrist,
+    filtered tip, predicted tip, zone) for each visible arm, for drawing.
+    """
+    z, mask, wrists, weight = np.zeros((2, 2)), np.zeros(2, bool), [None, None], np.zeros(2)
+    for name, ex, ey, wx, wy, visibility in arms:
+        if source: source_stats.inc(("visibility", source, player.name), visibility)
+        if visibility <= 0.3:
+            if source: source_stats.inc(("lost", source, player.name))
+            continue
+        i = 0 if name == "Left" else 1
+        z[i] = extend_line(ex, ey, wx, wy, STICK_EXTENSION)
+        mask[i], wrists[i], weight[i] = True, (wx, wy), visibility
+    if source: source_stats.inc(("frames", source, player.name))
+    if not mask.any(): return []
+
+    with player.track_lock:  # Both feeds' vision threads step the same tracker
+        weights = None
+        if player.fusing and source:
+            late = mask & (frame_time <= player.tracker.t)  # Overtaken by a newer frame from the other feed
+            if late.any():
+                source_stats.inc(("late", source, player.name), int(late.sum()))
+                mask &= ~late
+                if not mask.any(): return []
+            age = max(0.0, (time.time() if now is None else now) - frame_time)
+            weights = weight / (1.0 + age / FUSION_AGE_HALF)
+        if source: source_stats.inc(("fused", source, player.name), int(mask.sum()))
+        state = player.tracker.update(frame_time, z, mask, weights).tolist()
+        ahead = player.tracker.predict(PREDICTION_MS / 1000.0).tolist()
+        tracked = []
+        for i in np.flatnonzero(mask):
+            name = TipTracker.ARMS[i]
+            kx, ky = state[i][0], state[i][1]
+            player.tips[name.upper()].push(frame_time, kx, ky)
+            tx, ty = ahead[i]
+
+            detected_zone = get_drum_zone(tx, ty)
+            player.zone[name.upper()] = detected_zone
+            tracked.append((name, wrists[i], (kx, ky), (tx, ty), detected_zone))
+    return tracked
+
+def process_pose_frame(player, frame, mirror_mode=False, frame_time=None, prescale=1.0, source=None):
+    if frame_time is None: frame_time = time.time()
+    h, w, _ = frame.shape
+    results = player.model(source).process(frame, prescale)
+
+    zone_layout.fit(h, w)
+    if not HEADLESS_MODE: zone_layout.draw(frame, (80,80,80))
 
     if results.pose_landmarks:
         lm = results.pose_landmarks.landmark
         arms = [("Right", 13, 15), ("Left", 14, 16)] if mirror_mode else [("Left", 13, 15), ("Right", 14, 16)]
+        tracked = process_landmarks(player, [(name, lm[e].x, lm[e].y, lm[wr].x, lm[wr].y, lm[wr].visibility)
+                                     for name, e, wr in arms], frame_time, source)
+
+        if not HEADLESS_MODE:
+            for name, (wx, wy), (kx, ky), (tx, ty), detected_zone in tracked:
+                wx, wy, tx, ty = int(wx * w), int(wy * h), int(tx * w), int(ty * h)
+                col = (0, 255, 0)
+                cv2.line(frame, (wx, wy), (tx, ty), col, 2) 
+                cv2.circle(frame, (tx, ty), 6, (0, 0, 255), -1) 
+                cv2.putText(frame, detected_zone[:3], (tx, ty-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, col, 1)
+                cv2.circle(frame, (int(kx * w), int(ky * h)), 2, (255, 255, 255), -1)
 
-        for name, idx_elb, idx_wri in arms:
-            elbow = lm[idx_elb]
-            wrist = lm[idx_wri]
-            if wrist.visibility > 0.3:
-                ex, ey = int(elbow.x * w), int(elbow.y * h)
-                wx, wy = int(wrist.x * w), int(wrist.y * h)
-                
-                raw_tx, raw_ty = extend_line(ex, ey, wx, wy, STICK_EXTENSION)
-                
-                if kalman_state[name] is None:
-                    kalman_state[name] = [raw_tx, raw_ty, 0.0, 0.0]
-                    kx, ky = raw_tx, raw_ty
-                    kvx, kvy = 0.0, 0.0
-                else:
-                    kx, ky, kvx, kvy = kalman_state[name]
-                    pred_x = kx + kvx
-                    pred_y = ky + kvy
-                    res_x = raw_tx - pred_x
-                    res_y = raw_ty - pred_y
-                    kx = pred_x + (KALMAN_ALPHA * res_x)
-                    ky = pred_y + (KALMAN_ALPHA * res_y)
-                    kvx = kvx + (KALMAN_BETA * res_x)
-                    kvy = kvy + (KALMAN_BETA * res_y)
-                    kalman_state[name] = [kx, ky, kvx, kvy]
-
-                tx = int(kx + (kvx * PREDICTION_FRAMES))
-                ty = int(ky + (kvy * PREDICTION_FRAMES))
-
-                tx = max(0, min(w, tx))
-                ty = max(0, min(h, ty))
-
-                detected_zone = get_drum_zone(tx/w, ty/h)
-                if name == "Left": current_zone_left = detected_zone
-                else: current_zone_right = detected_zone
-
-                if not HEADLESS_MODE:
-                    col = (0, 255, 0)
-                    cv2.line(frame, (wx, wy), (tx, ty), col, 2) 
-                    cv2.circle(frame, (tx, ty), 6, (0, 0, 255), -1) 
-                    cv2.putText(frame, detected_zone[:3], (tx, ty-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, col, 1)
-                    cv2.circle(frame, (int(kx), int(ky)), 2, (255, 255, 255), -1)
+    elif source:  # No pose at all: both wrists lost on this feed
+        source_stats.inc(("frames", source, player.name))
+        source_stats.inc(("lost", source, player.name), 2)
 
     return frame
     
+# ================= INFERENCE WORKER PROCESS =================
+# Frames go to a separate process through shared-memory ring slots, so
+# MediaPipe never holds this process's GIL. Each player gets a ring per feed; a
+# worker serves one or more players with the same process_pose_frame() and
+# writes their tip histories straight into shared memory.
+FRAME_SLOTS = 3
+MAX_FRAME_SHAPE = (720, 1280)
+# ctrl[] indices
+(C_SEQ, C_SLOT, C_BUSY, C_STOP, C_HEADLESS, C_DONE, C_ZONE_L, C_ZONE_R, C_READY, C_DONE_US, C_INFER_US,
+ C_FUSING, C_FUSED, C_LATE, C_LOST, C_VIS_MILLI) = range(16)
+
+class FrameRing:
+    """Layout of the shared block: control words, per-slot meta, tip histories, frame slots."""
+    def __init__(self, shm, slots=FRAME_SLOTS, max_shape=MAX_FRAME_SHAPE):
+        self.shm, self.slots = shm, slots
+        self.slot_bytes = max_shape[0] * max_shape[1] * 3
+        buf = shm.buf
+        self.ctrl = np.ndarray((16,), np.int64, buf, 0)
+        self.meta = np.ndarray((slots, 6), np.float64, buf, 128)  # h, w, frame time, prescale, inference ms, seq
+        off = 128 + slots * 48
+        self.tips = {}
+        for stick in ("LEFT", "RIGHT"):
+            self.tips[stick] = TipHistory(TIP_HISTORY_SIZE, buf, off)
+            off += TipHistory.nbytes()
+        self.frames_offset = off
+
+    @staticmethod
+    def nbytes(slots=FRAME_SLOTS, max_shape=MAX_FRAME_SHAPE):
+        return 128 + slots * 48 + 2 * TipHistory.nbytes() + slots * max_shape[0] * max_shape[1] * 3
+
+    def frame_view(self, slot, h, w):
+        return np.ndarray((h, w, 3), np.uint8, self.shm.buf, self.frames_offset + slot * self.slot_bytes)
+
+def inference_worker_main(shm_names, feeds, frame_ready, result_ready):
+    global HEADLESS_MODE
+    shms = [shared_memory.SharedMemory(name=name) for name in shm_names]
+    rings = [FrameRing(shm) for shm in shms]
+    if ZONE_LAYOUT_PATH: threading.Thread(target=watch_zone_layout, daemon=True).start()
+    if ADAPTIVE_INFERENCE: inference_ctl.calibrate()
+    # Own model per player and feed, so MediaPipe's tracking never jumps between drummers or cameras
+    served = {}
+    for (name, source), ring in zip(feeds, rings):
+        if name not in served:  # A player's first ring carries its tip histories
+            served[name] = PlayerSession(name, {}, inference=None if served else inference_ctl)
+            served[name].tips = ring.tips
+        ring.ctrl[C_READY] = 1
+    fed = [(served[name], source, ring) for (name, source), ring in zip(feeds, rings)]
+    last_seq = [0] * len(rings)
+    result_ready.set()
+    while not rings[0].ctrl[C_STOP]:
+        if not frame_ready.wait(0.5): continue
+        frame_ready.clear()
+        for i, (player, source, ring) in enumerate(fed):  # Newest frame of every feed, in turn
+            if int(ring.ctrl[C_SEQ]) == last_seq[i]: continue
+            slot = int(ring.ctrl[C_SLOT])
+            while True:  # Claim first: submit() may have published twice since C_SLOT was read and be writing this slot
+                ring.ctrl[C_BUSY] = slot
+                newest = int(ring.ctrl[C_SLOT])
+                if newest == slot: break  # Any write still in flight targets another slot, later ones skip C_BUSY
+                slot = newest  # Discard the overwritten frame for the newest one
+            h, w, frame_time, prescale, _, seq = ring.meta[slot]
+            seq = int(seq)
+            if seq == last_seq[i]:  # Already done: C_SEQ was read before submit() had finished publishing
+                ring.ctrl[C_BUSY] = -1
+                continue
+            HEADLESS_MODE = bool(ring.ctrl[C_HEADLESS])
+            if player.fusing != bool(ring.ctrl[C_FUSING]): player.set_fusing(bool(ring.ctrl[C_FUSING]))
+            t0 = time.perf_counter()
+            process_pose_frame(player, ring.frame_view(slot, int(h), int(w)), True, frame_time, prescale, source)
+            ring.meta[slot, 4] = (time.perf_counter() - t0) * 1000.0
+            ring.ctrl[C_ZONE_L] = zone_layout.index(player.zone["LEFT"])
+            ring.ctrl[C_ZONE_R] = zone_layout.index(player.zone["RIGHT"])
+            ring.ctrl[C_DONE_US] = int(frame_time * 1e6)
+            ring.ctrl[C_INFER_US] = int(player.model(source).last_ms * 1000.0)
+            stats = source_stats.snapshot()  # Running totals; the main process adds the differences
+            for word, stat in ((C_FUSED, "fused"), (C_LATE, "late"), (C_LOST, "lost")):
+                ring.ctrl[word] = stats.get((stat, source, player.name), 0)
+            ring.ctrl[C_VIS_MILLI] = int(stats.get(("visibility", source, player.name), 0) * 1000)
+            ring.ctrl[C_BUSY] = -1
+            ring.ctrl[C_DONE] += 1
+            last_seq[i] = seq
+            result_ready.set()
+    for player in served.values(): player.tips = None
+    rings = fed = None  # Drop the views before closing the blocks
+    for shm in shms:
+        try: shm.close()
+        except BufferError: pass
+
+class InferenceWorker:
+    """One pose process serving one or more players, each feed through its own shared-memory ring."""
+    def __init__(self, group):
+        ctx = multiprocessing.get_context("spawn")  # Same behaviour on Linux and Windows
+        self.feeds, self.shms = [], []
+        for player in group:
+            for source in player.sources():
+                shm = shared_memory.SharedMemory(create=True, size=FrameRing.nbytes())
+                ring = FrameRing(shm)
+                ring.ctrl[:] = 0
+                ring.ctrl[C_BUSY] = ring.ctrl[C_SLOT] = -1
+                ring.ctrl[C_ZONE_L] = zone_layout.index(player.zone["LEFT"])
+                ring.ctrl[C_ZONE_R] = zone_layout.index(player.zone["RIGHT"])
+                if not player.rings: player.tips = ring.tips  # Hit lookups read what the worker writes
+                player.rings[source], player.worker = ring, self
+                self.feeds.append((player, source))
+                self.shms.append(shm)
+        self.frame_ready, self.result_ready = ctx.Event(), ctx.Event()
+        self.proc = ctx.Process(target=inference_worker_main, daemon=True, args=(
+            [shm.name for shm in self.shms], [(player.name, source) for player, source in self.feeds],
+            self.frame_ready, self.result_ready))
+        self.proc.start()
+        self.running = True
+        threading.Thread(target=self.collect, daemon=True).start()
+
+    def wait_ready(self, timeout=30.0):
+        end = time.time() + timeout
+        ready = lambda: all(player.rings[source].ctrl[C_READY] for player, source in self.feeds)
+        while not ready() and time.time() < end and self.proc.is_alive(): time.sleep(0.05)
+        return ready()
+
+    def submit(self, player, frame, frame_time, flip=False, prescale=1.0, source="camera"):
+        """Writes the frame straight into a free slot of the feed's ring (flipping on the way in) and wakes the worker."""
+        ring = player.rings[source]
+        h, w = frame.shape[:2]
+        latest, busy = int(ring.ctrl[C_SLOT]), int(ring.ctrl[C_BUSY])
+        slot = (latest + 1) % ring.slots
+        if slot == busy: slot = (slot + 1) % ring.slots
+        view = ring.frame_view(slot, h, w)
+        if flip: cv2.flip(frame, 1, dst=view)
+        else: np.copyto(view, frame)
+        seq = int(ring.ctrl[C_SEQ]) + 1
+        ring.meta[slot, :4] = (h, w, frame_time, prescale)
+        ring.meta[slot, 5] = seq
+        ring.ctrl[C_HEADLESS] = int(HEADLESS_MODE)
+        ring.ctrl[C_FUSING] = int(player.fusing)
+        ring.ctrl[C_SLOT] = slot
+        ring.ctrl[C_SEQ] = seq
+        self.frame_ready.set()
+
+    def collect(self):
+        """Copies the worker's zones and feed counts into the players' sessions as soon as they land."""
+        seen = [[0] * 5 for _ in self.feeds]  # frames, fused, late, lost, visibility x 1000
+        while self.running:
+            if not self.result_ready.wait(0.5): continue
+            self.result_ready.clear()
+            for i, (player, source) in enumerate(self.feeds):
+                ring = player.rings.get(source)
+                if ring is None or ring.ctrl[C_DONE] == seen[i][0]: continue
+                counts = [int(ring.ctrl[C_DONE])] + ring.ctrl[C_FUSED:C_VIS_MILLI + 1].tolist()
+                # Both processes watch the same layout file, so labels agree once both have swapped
+                player.zone["LEFT"] = zone_layout.name(ring.ctrl[C_ZONE_L]) or player.zone["LEFT"]
+                player.zone["RIGHT"] = zone_layout.name(ring.ctrl[C_ZONE_R]) or player.zone["RIGHT"]
+                if ring.ctrl[C_DONE_US]:
+                    age = time.time() - ring.ctrl[C_DONE_US] / 1e6
+                    frame_age_zone.add(age)
+                    source_age[source].add(age)
+                    if source == "phone": player.stream.processed(age, ring.ctrl[C_INFER_US] / 1000.0)
+                if ring.ctrl[C_INFER_US]: inference_time.add(ring.ctrl[C_INFER_US] / 1e6)
+                player_stats.inc(("frames", player.name), counts[0] - seen[i][0])
+                for stat, now, before in zip(("frames", "fused", "late", "lost", "visibility"), counts, seen[i]):
+                    if now != before: source_stats.inc((stat, source, player.name), (now - before) / 1000.0 if stat == "visibility" else now - before)
+                seen[i] = counts
+
+    def frames_done(self, player=None):
+        return sum(int(p.rings[source].ctrl[C_DONE]) for p, source in self.feeds if player in (None, p))
+
+    def preview(self, player, source="camera"):
+        ring = player.rings[source]
+        slot = int(ring.ctrl[C_SLOT])
+        if slot < 0 or not ring.ctrl[C_DONE]: return None
+        h, w = ring.meta[slot, :2]
+        return ring.frame_view(slot, int(h), int(w))
+
+    def stop(self):
+        self.running = False
+        for player, source in self.feeds: player.rings[source].ctrl[C_STOP] = 1
+        self.frame_ready.set()
+        self.proc.join(2.0)
+        for player, source in self.feeds:
+            player.rings, player.worker = {}, None
+            player.tips = {"LEFT": TipHistory(), "RIGHT": TipHistory()}
+        for shm in self.shms:
+            try: shm.close()
+            except BufferError: pass  # A preview frame still points into the block
+            shm.unlink()
+
+inference_pool = []  # InferenceWorkers while INFERENCE_MODE is "process"; empty = inline
+
+def start_inference_pool(group=None, workers=INFERENCE_WORKERS, wait=False):
+    """Spreads players round-robin over pose processes, one per spare core unless `workers` says otherwise.
+
+    A player stays on one worker for the whole run, so its pose tracking
+    carries over from frame to frame.
+    """
+    global inference_pool
+    group = players if group is None else group
+    n = max(1, min(len(group), workers or (os.cpu_count() or 2) - 1))  # A core stays with audio, hits and the UI
+    inference_pool = [InferenceWorker(group[i::n]) for i in range(n)]
+    if wait:
+        for worker in inference_pool: worker.wait_ready()
+    print(f" [VISION] Pose inference running in {n} worker process(es) for {len(group)} player(s)")
+
+def stop_inference_pool():
+    global inference_pool
+    for worker in inference_pool: worker.stop()
+    inference_pool = []
+
+vision_ready = threading.Event()
+preview_frames = {}  # "<player> <feed>" -> newest annotated frame, shown by the UI loop at PREVIEW_FPS
+
+def warm_up_vision():
+    """Imports the vision stack and runs the pose model once, so the camera starts warm."""
+    if POSE_BACKEND == "tasks": pose_task_model()  # Each feed's landmarker starts with its first frame
+    elif INFERENCE_MODE == "process": start_inference_pool(wait=True)
+    elif ADAPTIVE_INFERENCE: inference_ctl.calibrate()
+    else: inference_ctl.process(synthetic_frame())
+    startup_mark("first inference")
+    vision_ready.set()
+    if WEB_SERVER == "socketio": create_web_app()  # Ready before Mobile App is picked
+    startup_mark("web stack")
+    print(" [STARTUP] " + ", ".join(f"{stage} {t:.2f}s" for stage, t in startup_timeline))
+
+def frame_done(player, source, frame_time, infer_ms):
+    """Frame-age and per-player counts once a frame's pose has reached the tracker."""
+    age = time.time() - frame_time
+    frame_age_zone.add(age)
+    source_age[source].add(age)
+    if source == "phone": player.stream.processed(age, infer_ms)
+    player_stats.inc(("frames", player.name))
+
+def infer_frame(player, frame, frame_time, prescale=1.0, source="camera"):
+    """Mirrors one frame of a player's feed and runs pose on it, inline or in the player's worker process.
+
+    With POSE_BACKEND = "tasks" the unmirrored frame goes to the feed's
+    PoseStream instead and its pose lands later; the preview then shows the
+    zones without the arms.
+    """
+    if POSE_BACKEND == "tasks":
+        player.landmarker(source).submit(frame, frame_time)
+        if HEADLESS_MODE: return None
+        frame = cv2.flip(frame, 1)
+        zone_layout.fit(*frame.shape[:2])
+        zone_layout.draw(frame, (80,80,80))
+        return frame
+    if player.worker is not None:
+        player.worker.submit(player, frame, frame_time, flip=True, prescale=prescale, source=source)
+        return player.worker.preview(player, source)
+    out = process_pose_frame(player, cv2.flip(frame, 1), True, frame_time, prescale, source)
+    frame_done(player, source, frame_time, player.model(source).last_ms)
+    return out
+
+def vision_loop(player, vs, stop):
+    """Runs pose on each new frame of one feed as it arrives: webcam `vs`, or the player's phone when it is None.
+
+    Never waits on the control panel or the preview.
+    """
+    source = "phone" if vs is None else "camera"
+    arrived, last_frame_time = player.arrived[source], None
+    while not stop.is_set():
+        if not arrived.wait(0.1): continue
+        arrived.clear()
+        t0 = time.perf_counter()
+        if vs is not None:
+            f, f_time = vs.read_timed()
+            if f is None or f_time == last_frame_time: continue
+            last_frame_time = f_time
+            frame = infer_frame(player, f, f_time, source=source)
+            camera_stats.inc("processed")
+        else:
+            jpeg, j_time = take_phone_jpeg(player)
+            if jpeg is None: continue
+            f, prescale = decode_phone_jpeg(player, jpeg)
+            if f is None: continue
+            frame = infer_frame(player, f, j_time, prescale, source)
+            phone_stats.inc("processed")
+        vision_pass.add(time.perf_counter() - t0)
+        if not HEADLESS_MODE and frame is not None: preview_frames[f"{player.name} {source}"] = frame
+
+def start_players(camera_mode, stop):
+    """Opens every player's feeds and starts one vision thread per feed. Returns the webcams opened.
+
+    Players without a camera of their own follow the panel: webcam 0 in PC
+    mode, their phone in Mobile mode, both at once (fused) in PC + Phone mode.
+    """
+    streams = []
+    for player in players:
+        feeds = player.camera if player.camera is not None else {"PC": 0, "MOBILE": "phone", "BOTH": [0, "phone"]}[camera_mode]
+        feeds = feeds if isinstance(feeds, list) else [feeds]
+        player.set_fusing(len(feeds) > 1)
+        for feed in feeds:
+            vs = None
+            if feed != "phone":
+                vs = WebcamStream(src=feed, arrived=player.arrived["camera"]).start()
+                streams.append(vs)
+            threading.Thread(target=vision_loop, args=(player, vs, stop), daemon=True).start()
+    return streams
+
 # ================= WEB SERVER =================
-app = Flask(__name__)
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet', ping_interval=5)
+web_app_lock = threading.Lock()
+app = socketio = None  # Built by create_web_app(), which is what imports Flask / Socket.IO / eventlet
 log = logging.getLogger('werkzeug'); log.setLevel(logging.ERROR)
 
+SOCKETIO_CLIENT = '<script src="https://cdnjs.cloudflare.com/ajax/libs/socket.io/4.0.1/socket.io.js"></script>'  # IngestServer serves the page without it
+
 HTML_PAGE = """
 <!DOCTYPE html>
 <html lang="en">
@@ -206,30 +1867,109 @@ HTML_PAGE = """
     <meta name="viewport" content="width=device-width, initial-scale=1.0, maximum-scale=1.0, user-scalable=no">
     <style>
         body { margin: 0; background: #000; display: flex; flex-direction: column; justify-content: center; align-items: center; height: 100vh; overflow: hidden; font-family: sans-serif; color: white; }
-        #start-btn { padding: 15px 40px; font-size: 1.2rem; background: #8A2BE2; color: #fff; border: none; border-radius: 30px; cursor: pointer; }
+        #start-btn, #pose-btn { margin: 8px; padding: 15px 40px; font-size: 1.2rem; background: #8A2BE2; color: #fff; border: none; border-radius: 30px; cursor: pointer; }
         #status { display: none; text-align: center; }
         .pulsing-circle { width: 50px; height: 50px; background: #9932CC; border-radius: 50%; margin: 0 auto 20px auto; animation: pulse 2s infinite; }
         @keyframes pulse { 0% { transform: scale(0.95); opacity: 0.7; } 100% { transform: scale(0.95); opacity: 0; } }
     </style>
-    <script src="https://cdnjs.cloudflare.com/ajax/libs/socket.io/4.0.1/socket.io.js"></script>
+    """ + SOCKETIO_CLIENT + """
 </head>
 <body>
-    <button id="start-btn" onclick="start()">Connect (Space Drums)</button>
+    <button id="start-btn" onclick="start(false)">Connect (Space Drums)</button>
+    <button id="pose-btn" onclick="start(true)">Track On Phone</button>
     <div id="status"><div class="pulsing-circle"></div><h3>LIVE</h3></div>
-    <video id="v" autoplay playsinline muted style="display:none"></video>
+    <video id="v" autoplay playsinline muted style="position:absolute; width:1px; height:1px; opacity:0"></video>
     <canvas id="c" style="display:none"></canvas>
     <script>
-        const s = io(); const v = document.getElementById('v'); const c = document.getElementById('c'); const ctx = c.getContext('2d');
-        async function start(){
+        // Socket.IO when Flask served the page, else a bare WebSocket (WEB_SERVER = "asyncio"): binary messages are
+        // told apart by their magic, and a "clock" text message is answered with the server's time
+        function connect(player){
+            if (typeof io === 'function') return io({ query: { player } });
+            const handlers = {}, replies = [];
+            let ws = null;
+            (function open(){
+                ws = new WebSocket((location.protocol === 'https:' ? 'wss://' : 'ws://') + location.host + '/ws?player=' + encodeURIComponent(player));
+                ws.onopen = () => { if (handlers.connect) handlers.connect(); };
+                ws.onmessage = e => {
+                    if (e.data[0] === '{') { const msg = JSON.parse(e.data); if (handlers[msg.event]) handlers[msg.event](msg.data); }
+                    else { const reply = replies.shift(); if (reply) reply(parseFloat(e.data)); }
+                };
+                ws.onclose = () => { replies.length = 0; setTimeout(open, 1000); };
+            })();
+            return {
+                on: (name, fn) => { handlers[name] = fn; },
+                emit: (name, data) => {
+                    if (ws.readyState !== WebSocket.OPEN) return;
+                    if (name === 'clock') { replies.push(data); ws.send('clock'); }
+                    else if (ws.bufferedAmount === 0) ws.send(data); // Last message still going out: skip this one, don't queue
+                },
+            };
+        }
+        const s = connect(new URLSearchParams(location.search).get('player') || ''); const v = document.getElementById('v'); const c = document.getElementById('c'); const ctx = c.getContext('2d');
+        // Frame envelope: "SF", version, pad, uint32 seq, float64 capture time on the server's clock (s)
+        let clockOffset = 0, bestRtt = Infinity, seq = 0, encoding = false;
+        const wallNow = () => performance.timeOrigin + performance.now();
+        function syncClock(rounds){
+            const t0 = wallNow();
+            s.emit('clock', ts => {
+                const t1 = wallNow();
+                if (t1 - t0 < bestRtt) { bestRtt = t1 - t0; clockOffset = ts * 1000 - (t0 + t1) / 2; }
+                if (rounds > 1) syncClock(rounds - 1);
+            });
+        }
+        s.on('connect', () => { bestRtt = Infinity; syncClock(8); });
+        setInterval(() => { bestRtt = Infinity; syncClock(8); }, 30000);
+        // Stream settings: the server picks them from its own measurements and sends changes as they happen
+        let width = 320, height = 180, quality = 0.5, frameGap = 0, nextDue = 0;
+        s.on('stream', cfg => { width = c.width = cfg.width; height = c.height = cfg.height; quality = cfg.quality; frameGap = 1000 / cfg.fps; });
+        function send(captureMs){
+            if (encoding) return; // Still encoding the last frame: skip this one rather than queue it
+            if (captureMs < nextDue - 2) return; // Ahead of the frame rate asked for
+            encoding = true; nextDue = Math.max(nextDue + frameGap, captureMs);
+            ctx.drawImage(v, 0, 0, width, height);
+            const hdr = new DataView(new ArrayBuffer(16));
+            hdr.setUint8(0, 83); hdr.setUint8(1, 70); hdr.setUint8(2, 1);
+            hdr.setUint32(4, ++seq, true); hdr.setFloat64(8, (captureMs + clockOffset) / 1000, true);
+            c.toBlob(b => { encoding = false; if(b) s.emit('frame', new Blob([hdr.buffer, b])); }, 'image/jpeg', quality);
+        }
+        // Phone-side pose: run the landmarker here and send 64-byte "SL" packets instead of JPEGs
+        const TASKS_URL = 'https://cdn.jsdelivr.net/npm/@mediapipe/tasks-vision@0.10.14';
+        const POSE_MODEL_URL = 'https://storage.googleapis.com/mediapipe-models/pose_landmarker/pose_landmarker_lite/float16/1/pose_landmarker_lite.task';
+        let landmarker = null;
+        async function loadLandmarker(){
+            const vision = await import(TASKS_URL + '/vision_bundle.mjs');
+            const files = await vision.FilesetResolver.forVisionTasks(TASKS_URL + '/wasm');
+            landmarker = await vision.PoseLandmarker.createFromOptions(files, {
+                baseOptions: { modelAssetPath: POSE_MODEL_URL, delegate: 'GPU' }, runningMode: 'VIDEO', numPoses: 1 });
+        }
+        function sendPose(captureMs, now){
+            const r = landmarker.detectForVideo(v, now);
+            if (!r.landmarks.length) return;
+            const lm = r.landmarks[0], p = new DataView(new ArrayBuffer(64));
+            p.setUint8(0, 83); p.setUint8(1, 76); p.setUint8(2, 1);
+            p.setUint32(4, ++seq, true); p.setFloat64(8, (captureMs + clockOffset) / 1000, true);
+            [13, 15, 14, 16].forEach((idx, i) => {  // Left elbow, left wrist, right elbow, right wrist
+                p.setFloat32(16 + i * 12, lm[idx].x, true); p.setFloat32(20 + i * 12, lm[idx].y, true);
+                p.setFloat32(24 + i * 12, lm[idx].visibility ?? 1, true);
+            });
+            s.emit('pose', p.buffer);
+        }
+        function tick(captureMs, now){ if (landmarker) sendPose(captureMs, now); else send(captureMs); }
+        function onFrame(now, meta){
+            // captureTime is only filled in by some cameras; otherwise use when the frame was presented
+            tick(performance.timeOrigin + (meta.captureTime || meta.presentationTime || now), now);
+            v.requestVideoFrameCallback(onFrame);
+        }
+        async function start(phonePose){
             try {
                 const stream = await navigator.mediaDevices.getUserMedia({ video: { facingMode: "environment", width: { ideal: 640 }, height: { ideal: 360 } } });
                 v.srcObject = stream; await v.play();
-                document.getElementById('start-btn').style.display = 'none'; document.getElementById('status').style.display = 'block';
-                c.width = 320; c.height = 180;
-                setInterval(() => {
-                    ctx.drawImage(v, 0, 0, 320, 180);
-                    c.toBlob(b => { if(b) s.emit('frame', b); }, 'image/jpeg', 0.5);
-                }, 33);
+                if (phonePose) { try { await loadLandmarker(); } catch(e) { alert("Phone pose unavailable, streaming video: " + e); } }
+                document.getElementById('start-btn').style.display = 'none'; document.getElementById('pose-btn').style.display = 'none';
+                document.getElementById('status').style.display = 'block';
+                c.width = width; c.height = height;
+                if ('requestVideoFrameCallback' in HTMLVideoElement.prototype) v.requestVideoFrameCallback(onFrame);
+                else setInterval(() => tick(wallNow(), performance.now()), 33);
                 if(document.documentElement.requestFullscreen) document.documentElement.requestFullscreen();
             } catch(e) { alert(e); }
         }
@@ -238,126 +1978,1025 @@ HTML_PAGE = """
 </html>
 """
 
-@app.route('/') 
-def index(): return render_template_string(HTML_PAGE)
+def index(): return flask.render_template_string(HTML_PAGE)
 
-@app.route('/icon.png')
 def icon():
-    if os.path.exists('icon.png'): return send_file('icon.png', mimetype='image/png')
+    if os.path.exists('icon.png'): return flask.send_file('icon.png', mimetype='image/png')
     return "No Icon Found", 404
 
-@app.route('/manifest.json') 
-def m(): 
-    return jsonify({
-        "name": "Space Drums", "short_name": "SpaceDrums", "display": "standalone",
-        "orientation": "landscape", "start_url": "/", "background_color": "#000000",
-        "theme_color": "#000000", "icons": [{"src": "/icon.png", "sizes": "192x192", "type": "image/png"}]
-    })
-
-@socketio.on('frame')
-def h(data):
-    global latest_frame_from_phone
+MANIFEST = {
+    "name": "Space Drums", "short_name": "SpaceDrums", "display": "standalone",
+    "orientation": "landscape", "start_url": "/", "background_color": "#000000",
+    "theme_color": "#000000", "icons": [{"src": "/icon.png", "sizes": "192x192", "type": "image/png"}]
+}
+
+def m(): return flask.jsonify(MANIFEST)
+
+def clock_sync():
+    # Clock handshake: the page keeps the offset from its lowest-RTT round trip
+    return time.time()
+
+def parse_phone_frame(data, t_rx):
+    """Envelope -> (seq, capture time, jpeg). Bare JPEGs (older pages) count as captured on arrival."""
+    if len(data) > PHONE_FRAME_HEADER.size and data[:2] == PHONE_FRAME_MAGIC:
+        magic, version, seq, t_capture = PHONE_FRAME_HEADER.unpack_from(data)
+        if version == 1: return seq, t_capture, memoryview(data)[PHONE_FRAME_HEADER.size:]
+    return 0, t_rx, data
+
+def phone_player():
+    """The player a Socket.IO message is from: the page's ?player=<name>, else the first player."""
+    if not flask.has_request_context(): return players[0]
+    return players_by_name.get(flask.request.args.get("player"), players[0])
+
+def h(data, player=None):
     try:
-        n = np.frombuffer(data, np.uint8)
-        with frame_lock: latest_frame_from_phone = cv2.imdecode(n, cv2.IMREAD_COLOR)
+        t = time.time()
+        if player is None: player = phone_player()
+        if session_recorder: session_recorder.add(REC_PHONE, t, data)
+        seq, t_capture, jpeg = parse_phone_frame(data, t)
+        phone_stats.inc("received")
+        frame_age_ingest.add(t - t_capture)
+        player.stream.received(len(data), t - t_capture, t)
+        if t - t_capture > PHONE_MAX_FRAME_AGE:
+            phone_stats.inc("stale")
+            player.stream.lost()
+            return
+        with player.frame_lock:
+            if player.jpeg is not None:
+                phone_stats.inc("discarded")
+                player.stream.lost()
+            player.jpeg, player.jpeg_time = jpeg, t_capture
+        player.arrived["phone"].set()
     except: pass
 
-def run_web(): socketio.run(app, host="0.0.0.0", port=WEB_PORT)
+def handle_pose_packet(player, data, t_rx):
+    """Phone-side landmarks -> filter and zones, with no decode or inference here.
+
+    Returns the packet's capture time, or None if it was malformed or stale.
+    """
+    if len(data) != PHONE_POSE_PACKET.size or data[:2] != PHONE_POSE_MAGIC: return None
+    magic, version, seq, t_capture, *v = PHONE_POSE_PACKET.unpack(data)
+    if version != 1: return None
+    phone_stats.inc("landmarks")
+    frame_age_ingest.add(t_rx - t_capture)
+    if t_rx - t_capture > PHONE_MAX_FRAME_AGE:
+        phone_stats.inc("stale")
+        return None
+    # Mirror x as cv2.flip does for frames; unmirrored, MediaPipe's left arm is the player's left
+    process_landmarks(player, [("Left", 1.0 - v[0], v[1], 1.0 - v[3], v[4], v[5]),
+                               ("Right", 1.0 - v[6], v[7], 1.0 - v[9], v[10], v[11])], t_capture, "phone", t_rx)
+    return t_capture
+
+def stream_connect(auth=None):
+    """A page connected over Socket.IO: its player's stream settings go to it from now on."""
+    player, sid = phone_player(), flask.request.sid
+    player.stream.send = lambda settings: socketio.emit('stream', settings, to=sid)
+    player.stream.send(player.stream.settings())
+
+def pose_msg(data, player=None):
+    t = time.time()
+    if session_recorder: session_recorder.add(REC_POSE, t, data)
+    t_capture = handle_pose_packet(player or phone_player(), data, t)
+    if t_capture is not None: frame_age_zone.add(time.time() - t_capture)
+
+def take_phone_jpeg(player):
+    """Hands the player's newest unprocessed phone JPEG (and its capture time) to the vision loop."""
+    with player.frame_lock:
+        jpeg, t = player.jpeg, player.jpeg_time
+        player.jpeg = None
+    if jpeg is not None and time.time() - t > PHONE_MAX_FRAME_AGE:
+        phone_stats.inc("stale")  # Went stale while the previous frame was being inferred
+        player.stream.lost()
+        return None, t
+    return jpeg, t
+
+def decode_phone_jpeg(player, jpeg):
+    """Decodes at the largest libjpeg reduction that still covers what inference will use.
+
+    Returns (frame, prescale), where prescale is the reduction applied (1, 0.5, ...).
+    """
+    t0 = time.perf_counter()
+    buf = np.frombuffer(jpeg, np.uint8)
+    frame, prescale = None, 1.0
+    if player.phone_width:
+        target = max(JPEG_MIN_DECODE_WIDTH, player.phone_width * player.model("phone").current_scale())
+        for factor in JPEG_REDUCED_FACTORS:
+            if player.phone_width / factor >= target:
+                frame, prescale = cv2.imdecode(buf, getattr(cv2, f"IMREAD_REDUCED_COLOR_{factor}")), 1.0 / factor
+                break
+    if frame is None: frame, prescale = cv2.imdecode(buf, cv2.IMREAD_COLOR), 1.0
+    if frame is None: return None, 1.0
+    player.phone_width = int(frame.shape[1] / prescale)
+    phone_stats.inc("decoded")
+    phone_stats.inc("decode_ms", (time.perf_counter() - t0) * 1000.0)
+    return frame, prescale
+
+# --- METRICS ---
+# Built from the counters and histograms only when /metrics is scraped.
+def metric_families():
+    """[(name, type, help, samples)]: samples are (labels, value), or (labels, LatencyHistogram) for histograms."""
+    phone, camera, hits, net = phone_stats.snapshot(), camera_stats.snapshot(), hit_stats.snapshot(), net_stats.snapshot()
+    feeds = sorted((key, n) for key, n in source_stats.snapshot().items() if isinstance(key, tuple))
+    frames = [({"source": "camera", "stage": stage}, camera[stage]) for stage in ("received", "processed")]
+    frames.append(({"source": "camera", "stage": "dropped", "reason": "superseded"},  # Replaced before the vision thread took them
+                   max(0, camera["received"] - camera["processed"])))
+    frames += [({"source": "phone", "stage": stage}, phone[stage]) for stage in ("received", "decoded", "processed")]
+    frames += [({"source": "phone", "stage": "dropped", "reason": reason}, phone[key])
+               for reason, key in (("superseded", "discarded"), ("stale", "stale"))]
+    voices = []
+    if audio is not None:
+        voices = [("spacedrums_mixer_voices", "gauge", "Voices playing now.", [({"engine": audio.name}, audio.active_voices())]),
+                  ("spacedrums_mixer_voices_max", "gauge", "Voice limit.", [({"engine": audio.name}, MAX_VOICES)]),
+                  ("spacedrums_mixer_voice_events_total", "counter", "Voice manager: hits played or dropped, voices stolen or choked.",
+                   [({"zone": key[1], "outcome": key[0]}, n) for key, n in sorted(audio.voices.stats.snapshot().items(), key=str)
+                    if isinstance(key, tuple)])]
+        if hasattr(audio, "callback_time"):
+            voices.append(("spacedrums_mixer_callback_seconds", "histogram", "Mixer block render time.", [({}, audio.callback_time)]))
+    return [
+        ("spacedrums_frames_total", "counter", "Camera and phone frames by pipeline stage.", frames),
+        ("spacedrums_phone_pose_packets_total", "counter", "Phone-side landmark packets.", [({}, phone["landmarks"])]),
+        ("spacedrums_inference_seconds", "histogram", "One pose.process() call.", [({}, inference_time)]),
+        ("spacedrums_vision_pass_seconds", "histogram", "Vision thread: take, decode and pose for one frame.", [({}, vision_pass)]),
+        ("spacedrums_ui_pass_seconds", "histogram", "Control panel: events, redraw, display update.", [({}, ui_pass)]),
+        ("spacedrums_frame_age_seconds", "histogram", "Capture to ingest / capture to zones updated.",
+         [({"at": "ingest"}, frame_age_ingest), ({"at": "zone"}, frame_age_zone)]),
+        ("spacedrums_hits_total", "counter", "Hits by stick and outcome (late / unsynced hits are also played).",
+         [({"stick": key[1], "outcome": key[0]}, n) for key, n in sorted(hits.items(), key=str) if isinstance(key, tuple)]),
+        ("spacedrums_player_frames_total", "counter", "Frames whose pose updated a player's zones.",
+         [({"player": key[1]}, n) for key, n in sorted(player_stats.snapshot().items(), key=str) if isinstance(key, tuple)]),
+        ("spacedrums_phone_stream_setting", "gauge", "What each player's phone is asked to stream: width, height, JPEG quality, fps.",
+         [({"player": player.name, "setting": name}, value) for player in players for name, value in player.stream.settings().items()]),
+        ("spacedrums_phone_stream_bytes_per_second", "gauge", "Phone frame bytes received per second, last decision window.",
+         [({"player": player.name}, round(player.stream.bytes_per_s, 1)) for player in players]),
+        ("spacedrums_phone_stream_changes_total", "counter", "Stream setting changes, down (cheaper) or up.",
+         [({"player": player.name, "direction": d}, player.stream.switches[d]) for player in players for d in ("down", "up")]),
+        ("spacedrums_inference_workers", "gauge", "Pose worker processes (0 = inline).", [({}, len(inference_pool))]),
+        ("spacedrums_pose_stream_frames_total", "counter", "POSE_BACKEND tasks: frames submitted, with results, skipped by MediaPipe.",
+         [({"player": player.name, "feed": feed, "outcome": outcome}, getattr(stream, outcome))
+          for player in players for feed, stream in sorted(player.landmarkers.items())
+          for outcome in ("submitted", "completed", "skipped")]),
+        ("spacedrums_pose_stream_latency_seconds", "histogram", "POSE_BACKEND tasks: submit to result callback.",
+         [({"player": player.name, "feed": feed}, stream.latency) for player in players for feed, stream in sorted(player.landmarkers.items())]),
+        ("spacedrums_feed_frames_total", "counter", "Frames per feed and player, with or without a pose.",
+         [({"feed": feed, "player": name}, n) for (stat, feed, name), n in feeds if stat == "frames"]),
+        ("spacedrums_feed_arms_total", "counter", "Arms per feed: fused into the tracker, late (a newer frame won), wrist lost.",
+         [({"feed": feed, "player": name, "outcome": stat}, n) for (stat, feed, name), n in feeds if stat in ("fused", "late", "lost")]),
+        ("spacedrums_feed_visibility_sum", "counter", "Summed wrist visibility; / (2 x frames) = mean confidence.",
+         [({"feed": feed, "player": name}, round(n, 3)) for (stat, feed, name), n in feeds if stat == "visibility"]),
+        ("spacedrums_feed_age_seconds", "histogram", "Capture to zones updated, per feed.",
+         [({"feed": feed}, hist) for feed, hist in source_age.items()]),
+        ("spacedrums_hit_latency_seconds", "histogram", "Hit receive to play() returned.", [({}, hit_latency)]),
+        ("spacedrums_hit_impact_to_sound_seconds", "histogram", "Synced sticks: impact on the stick's clock to sound start.",
+         [({"schedule": HIT_SCHEDULE}, hit_clock_latency)]),
+        ("spacedrums_hit_sequence_total", "counter", "Binary hits per stick: lost (no copy arrived), duplicate copies dropped, reordered.",
+         [({"stick": stick, "kind": kind}, getattr(window, kind)) for stick, window in sorted(hit_windows.items())
+          for kind in ("lost", "duplicates", "reordered")]),
+        ("spacedrums_hit_loss_ratio", "gauge", "Share of each stick's hits that never arrived, from sequence gaps.",
+         [({"stick": stick}, window.loss_rate()) for stick, window in sorted(hit_windows.items())]),
+        ("spacedrums_stick_sync_rtt_seconds", "histogram", "Clock-sync ping round trips, per stick.",
+         [({"stick": stick}, clock.rtt) for stick, clock in sorted(stick_clocks.items())]),
+        ("spacedrums_stick_hit_delay_seconds", "histogram", "Synced hits: impact to receive, per stick.",
+         [({"stick": stick}, clock.one_way) for stick, clock in sorted(stick_clocks.items())]),
+        ("spacedrums_udp_errors_total", "counter", "Hit socket errors and unparseable datagrams.",
+         [({"kind": kind}, n) for kind, n in net.items()]),
+    ] + voices
+
+def histogram_buckets(hist, step=LatencyHistogram.PER_DECADE // 2):
+    """Cumulative (upper bound in s, count) every `step` buckets (two per decade), then the total and the sum."""
+    counts, _, total, _ = hist.snapshot()
+    seen, out = 0, []
+    for idx, c in enumerate(counts):
+        seen += c
+        if (idx + 1) % step == 0: out.append((10 ** ((idx + 1) / hist.PER_DECADE) * 1e-6, seen))
+    return out, seen, total
+
+def render_labels(labels): return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}" if labels else ""
+
+def metrics_text():
+    lines = []
+    for name, kind, doc, samples in metric_families():
+        lines += [f"# HELP {name} {doc}", f"# TYPE {name} {kind}"]
+        for labels, value in samples:
+            if kind != "histogram":
+                lines.append(f"{name}{render_labels(labels)} {value}")
+                continue
+            buckets, count, total = histogram_buckets(value)
+            for le, n in buckets: lines.append(f"{name}_bucket{render_labels({**labels, 'le': f'{le:.6g}'})} {n}")
+            lines.append(f"{name}_bucket{render_labels({**labels, 'le': '+Inf'})} {count}")
+            lines += [f"{name}_sum{render_labels(labels)} {total:.6f}", f"{name}_count{render_labels(labels)} {count}"]
+    return "\n".join(lines) + "\n"
+
+def metrics_json():
+    out = {}
+    for name, kind, doc, samples in metric_families():
+        rows = []
+        for labels, value in samples:
+            if kind == "histogram":
+                buckets, count, total = histogram_buckets(value)
+                value = {**value.summary(), "sum_s": round(total, 6), "buckets": [[f"{le:.6g}", n] for le, n in buckets]}
+            rows.append({"labels": labels, "value": value})
+        out[name] = {"type": kind, "help": doc, "samples": rows}
+    return out
+
+def metrics(): return flask.Response(metrics_text(), mimetype="text/plain; version=0.0.4")
+
+def metrics_json_view(): return flask.jsonify(metrics_json())
+
+def create_web_app():
+    global app, socketio
+    with web_app_lock:  # Warm-up thread and run_web() can both get here first
+        if app is None:
+            app = flask.Flask(__name__)
+            socketio = flask_socketio.SocketIO(app, cors_allowed_origins="*", async_mode='eventlet', ping_interval=5)
+            app.add_url_rule('/', view_func=index)
+            app.add_url_rule('/metrics', view_func=metrics)
+            app.add_url_rule('/metrics.json', view_func=metrics_json_view)
+            app.add_url_rule('/icon.png', view_func=icon)
+            app.add_url_rule('/manifest.json', view_func=m)
+            socketio.on_event('connect', stream_connect)
+            socketio.on_event('clock', clock_sync)
+            socketio.on_event('frame', h)
+            socketio.on_event('pose', pose_msg)
+    return app
+
+# --- ASYNCIO INGEST ---
+# WEB_SERVER = "asyncio": one event loop serves the page and the metrics over
+# plain HTTP and takes the page's frames as binary WebSocket messages on /ws,
+# with no Flask, Socket.IO or CDN script involved.
+WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+def ws_unmask(payload, mask):
+    """XORs a 4-byte WebSocket mask over payload, 8 bytes at a time, into a new buffer (a memoryview of it)."""
+    n = len(payload)
+    out, k = np.empty(n, np.uint8), n - n % 8
+    np.bitwise_xor(np.frombuffer(payload, np.uint64, k // 8), np.frombuffer(mask * 2, np.uint64), out=out[:k].view(np.uint64))
+    out[k:] = np.frombuffer(payload, np.uint8, n - k, k) ^ np.frombuffer(mask * 2, np.uint8)[:n - k]
+    return memoryview(out)
+
+def ws_frame(payload, opcode=0x2, mask=None):
+    """One unfragmented WebSocket frame. Clients pass a 4-byte `mask`, as browsers must."""
+    n, masked = len(payload), 0x80 if mask else 0
+    if n < 126: head = struct.pack("!BB", 0x80 | opcode, masked | n)
+    elif n < 1 << 16: head = struct.pack("!BBH", 0x80 | opcode, masked | 126, n)
+    else: head = struct.pack("!BBQ", 0x80 | opcode, masked | 127, n)
+    return head + mask + ws_unmask(payload, mask) if mask else head + payload
+
+class IngestServer:
+    """The page, manifest, icon and metrics over HTTP and phone frames over a WebSocket, on one event loop.
+
+    Binary messages go where the Socket.IO events would: "SL" pose packets to
+    pose_msg(), everything else to h(). A "clock" text message is answered
+    with our time; stream settings go out as JSON text messages. Each payload is unmasked straight into the buffer the
+    vision stage decodes from. A connection reads its next message only once
+    the last is handed over, so a busy loop pushes back through TCP to the
+    page, which skips frames while its send buffer is not empty.
+    """
+    def __init__(self, host="0.0.0.0", port=WEB_PORT):
+        self.host, self.port = host, port
+        self.ready, self.tasks = threading.Event(), set()
+        page = HTML_PAGE.replace(SOCKETIO_CLIENT, "").encode()
+        self.routes = {
+            "/": lambda: ("200 OK", "text/html; charset=utf-8", page),
+            "/manifest.json": lambda: ("200 OK", "application/json", json.dumps(MANIFEST).encode()),
+            "/icon.png": self.icon,
+            "/metrics": lambda: ("200 OK", "text/plain; version=0.0.4", metrics_text().encode()),
+            "/metrics.json": lambda: ("200 OK", "application/json", json.dumps(metrics_json()).encode()),
+        }
+
+    def icon(self):
+        if not os.path.exists('icon.png'): return "404 Not Found", "text/plain", b"No Icon Found"
+        with open('icon.png', 'rb') as f: return "200 OK", "image/png", f.read()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        self.ready.wait(5.0)
+        return self
+
+    def run(self): asyncio.run(self.serve())
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(self.connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.ready.set()
+        try: await self.server.serve_forever()
+        except asyncio.CancelledError: pass
+        for task in list(self.tasks): task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.server.close)
+        self.thread.join(1.0)
+
+    async def connection(self, reader, writer):
+        self.tasks.add(asyncio.current_task())
+        try:
+            request, *lines = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+            method, target, version = request.split(" ", 2)
+            headers = {name.strip().lower(): value.strip() for name, _, value in (line.partition(":") for line in lines if line)}
+            url = urllib.parse.urlsplit(target)
+            if url.path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                name = urllib.parse.parse_qs(url.query).get("player", [""])[0]
+                await self.websocket(reader, writer, headers["sec-websocket-key"], players_by_name.get(name, players[0]))
+            else:
+                status, kind, body = self.routes.get(url.path, lambda: ("404 Not Found", "text/plain", b"Not Found"))()
+                writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {kind}\r\nContent-Length: {len(body)}\r\n"
+                             f"Connection: close\r\n\r\n".encode() + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, KeyError, ValueError): pass
+        finally:
+            self.tasks.discard(asyncio.current_task())
+            writer.close()
+
+    async def websocket(self, reader, writer, key, player):
+        accept = base64.b64encode(hashlib.sha1(key.encode() + WS_GUID).digest())
+        writer.write(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                     b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+        push = lambda settings: writer.write(ws_frame(json.dumps({"event": "stream", "data": settings}).encode(), 0x1))
+        player.stream.send = push  # The player's newest page gets its stream settings
+        push(player.stream.settings())
+        try: await self.messages(reader, writer, player)
+        finally:
+            if player.stream.send is push: player.stream.send = None
+        writer.write(ws_frame(b"", 0x8))
+
+    async def messages(self, reader, writer, player):
+        parts, size, text = [], 0, False
+        while True:
+            b0, b1 = await reader.readexactly(2)
+            opcode, n = b0 & 0x0F, b1 & 0x7F
+            if n == 126: n = int.from_bytes(await reader.readexactly(2), "big")
+            elif n == 127: n = int.from_bytes(await reader.readexactly(8), "big")
+            size += n
+            if size > WS_MAX_MESSAGE or not b1 & 0x80: break  # Too big, or unmasked: not a browser
+            mask = await reader.readexactly(4)
+            payload = ws_unmask(await reader.readexactly(n), mask)
+            if opcode == 0x8: break
+            if opcode == 0x9: writer.write(ws_frame(payload, 0xA))
+            if opcode >= 0x8: continue
+            if opcode: text = opcode == 0x1
+            parts.append(payload)
+            if not b0 & 0x80: continue  # More fragments to come
+            data = parts[0] if len(parts) == 1 else memoryview(b"".join(parts))
+            parts, size = [], 0
+            if text:
+                if bytes(data) == b"clock": writer.write(ws_frame(repr(clock_sync()).encode(), 0x1))
+            elif data[:2] == PHONE_POSE_MAGIC: pose_msg(data, player)
+            else: h(data, player)
+            await writer.drain()
+
+def run_web(port=WEB_PORT, server=None, host="0.0.0.0"):
+    if (server or WEB_SERVER) == "asyncio": return IngestServer(host=host, port=port).run()
+    create_web_app()
+    socketio.run(app, host=host, port=port)
 
 
 # ================= UDP NETWORK =================
-def udp_loops():
-    t_disc = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    t_disc.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-    t_list = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    t_list.bind(("0.0.0.0", UDP_HIT_PORT))
-    t_list.setblocking(False) 
-    print(f" [NET] Listening on {UDP_HIT_PORT}")
-    
-    last_broadcast = 0
-    
-    while True:
-        current_time = time.time()
-        
-        if current_time - last_broadcast > 1.0:
-            try: t_disc.sendto(b"AIRDRUM_SERVER", ("255.255.255.255", UDP_DISCOVERY_PORT))
-            except: pass
-            last_broadcast = current_time
-        
+# Parsed hits are plain tuples, the cheapest thing to build on the hot path:
+# (stick, seq, stick_time_us, impact, t_rx). Legacy text packets carry None
+# for seq, stick_time_us and impact.
+STICK_BY_ID = [STICK_NAMES[i] if i < len(STICK_NAMES) else f"STICK{i}" for i in range(256)]
+VELOCITY_SLOPE = (1.0 - MIN_VELOCITY) / (IMPACT_HARD - IMPACT_SOFT)
+
+def impact_to_velocity(impact):
+    if impact is None: return 1.0
+    v = MIN_VELOCITY + (abs(impact) - IMPACT_SOFT) * VELOCITY_SLOPE
+    return MIN_VELOCITY if v < MIN_VELOCITY else (1.0 if v > 1.0 else v)
+
+def parse_hit(data, t_rx):
+    if len(data) == HIT_PACKET.size:
+        magic, version, stick_id, seq, t_us, impact = HIT_PACKET.unpack(data)
+        if magic != HIT_MAGIC or version != HIT_VERSION: return None
+        return (STICK_BY_ID[stick_id], seq, t_us, impact, t_rx)
+
+    # Legacy text packets: "HIT:LEFT", "HIT:Right", "HIT:KICK"
+    msg = data.decode("utf-8", "ignore").upper()
+    if "KICK" in msg: return ("KICK", None, None, None, t_rx)
+    if "LEFT" in msg: return ("LEFT", None, None, None, t_rx)
+    if "RIGHT" in msg: return ("RIGHT", None, None, None, t_rx)
+    return None
+
+def stick_zone(player, role, t_hit=None):
+    if role not in ("LEFT", "RIGHT"): return STICK_FIXED_ZONES.get(role)
+    latest = player.zone[role]
+
+    if HIT_ZONE_MODE != "history" or t_hit is None: return latest
+    pos = player.tips[role].position_at(t_hit)
+    if pos is None: return latest
+    zone = get_drum_zone(min(1.0, max(0.0, pos[0])), min(1.0, max(0.0, pos[1])))
+    zone_stats.inc("lookups")
+    if zone != latest: zone_stats.inc("differs_from_latest")
+    return zone
+
+def dispatch_hit(hit):
+    """Drop repeated copies, debounce, resolve the zone on the stick's player and play it. Returns the zone played, or None.
+
+    A synced stick's hit is placed at its impact time on our clock: the zone is
+    looked up there, and with HIT_SCHEDULE = "jitter-buffer" the sound starts
+    JITTER_TARGET_MS after it whatever the network delay was.
+    """
+    stick, seq, stick_time_us, impact, t_rx = hit
+    if seq is not None:  # Copies of one hit share its number; this is not the debounce, which is by time
+        window = hit_windows.get(stick) or hit_windows.setdefault(stick, SeqWindow())
+        if not window.accept(seq, t_rx): return None
+    player, role = stick_owner.get(stick) or (players[0], stick)  # Ids no player claims act as the first player's
+    hit_stats.inc(("received", stick))
+    clock = stick_clocks.get(stick) if stick_time_us is not None else None
+    t_hit = stick_time_us / 1e6 + clock.offset if clock and clock.offset is not None else None
+    if t_hit is not None: clock.one_way.add(max(0.0, t_rx - t_hit))
+    if t_rx - player.last_hit[role] <= DEBOUNCE_TIME:  # Receive time, so replays debounce the same
+        hit_stats.inc(("debounced", stick))
+        return None
+    zone = stick_zone(player, role, t_rx if t_hit is None else t_hit)
+    if zone is None:
+        hit_stats.inc(("no_zone", stick))
+        return None
+    at = None
+    if HIT_SCHEDULE == "jitter-buffer":
+        if t_hit is None: hit_stats.inc(("unsynced", stick))
+        else:
+            at = t_hit + JITTER_TARGET_MS / 1000.0
+            if at <= time.time():
+                hit_stats.inc(("late", stick))
+                at = None
+    hit_stats.inc(("played", stick))
+    started = None
+    if t_hit is not None:  # Measured when the engine really starts the sound, not when it was asked to
+        started = lambda t: hit_clock_latency.add(max(0.0, t - t_hit))
+    play_sound(zone, impact_to_velocity(impact), at, started)
+    player.last_hit[role] = t_rx
+    hit_latency.add(time.time() - t_rx)
+    return zone
+
+def handle_hit(data, t_rx):
+    if session_recorder: session_recorder.add(REC_HIT, t_rx, data)
+    hit = parse_hit(data, t_rx)
+    if hit: dispatch_hit(hit)
+    else: net_stats.inc("bad_packets")
+
+class SeqWindow:
+    """One stick's hit sequence numbers: the newest and which of the HIT_SEQ_WINDOW before it arrived.
+
+    accept() passes the first copy of each hit and drops the rest. A gap in the
+    numbers counts as lost until a straggler fills it (counted as reordered);
+    a straggler older than any number yet only widens the window it spans.
+    An old number arriving long after the newest means the stick restarted.
+    Numbers are the stick's uint32 and compare across its wrap to 0.
+    """
+    MOD, HALF = 1 << 32, 1 << 31
+
+    def __init__(self, size=HIT_SEQ_WINDOW):
+        self.size, self.mask = size, (1 << size) - 1
+        self.top, self.seen, self.last = None, 0, 0.0  # Newest seq; bit k set = seq top - k arrived
+        self.span = 0  # Numbers from the oldest seen to top, at most `size`
+        self.unique = self.lost = self.duplicates = self.reordered = 0
+
+    def accept(self, seq, t_rx):
+        # How far past the newest, in serial-number arithmetic: negative = older
+        ahead = 0 if self.top is None else (seq - self.top + self.HALF) % self.MOD - self.HALF
+        if self.top is None or (ahead <= 0 and t_rx - self.last > HIT_SEQ_RESTART):
+            self.top, self.seen, self.span = seq, 1, 1
+        elif ahead > 0:
+            self.lost += ahead - 1
+            self.seen = ((self.seen << ahead) | 1) & self.mask if ahead < self.size else 1
+            self.top, self.span = seq, min(self.size, self.span + ahead)
+        elif -ahead >= self.size:
+            return False  # Too late to tell from a copy; it stays counted as lost
+        elif self.seen >> -ahead & 1:
+            self.duplicates += 1
+            return False
+        else:
+            self.seen |= 1 << -ahead
+            self.reordered += 1
+            if -ahead < self.span: self.lost -= 1  # Fills a gap
+            else:  # Older than the first number seen: the ones between are gaps now
+                self.lost += -ahead - self.span
+                self.span = 1 - ahead
+        self.last = t_rx
+        self.unique += 1
+        return True
+
+    def loss_rate(self):
+        return self.lost / (self.unique + self.lost) if self.unique + self.lost else 0.0
+
+    def summary(self):
+        return {"hits": self.unique, "lost": self.lost, "loss_pct": round(100.0 * self.loss_rate(), 2),
+                "duplicates": self.duplicates, "reordered": self.reordered}
+
+hit_windows = {}  # Stick name -> SeqWindow; only the hit receiver thread writes
+
+class StickClock:
+    """One stick's clock against ours, from NTP-style ping exchanges.
+
+    Our time = stick time + `offset`, taken from the lowest-delay exchange of
+    the last SYNC_WINDOW: queueing only ever adds delay, so the quickest round
+    trip is the most symmetric one. `rtt` holds the pings' network round
+    trips, `one_way` receive minus impact time of the stick's hits.
+    """
+    def __init__(self, window=SYNC_WINDOW):
+        self.exchanges = collections.deque(maxlen=window)  # (round-trip delay, offset)
+        self.pending = collections.OrderedDict()  # Answered seq -> (t1, t2, t3) until the next ping brings t4
+        self.offset = None
+        self.rtt, self.one_way = LatencyHistogram(), LatencyHistogram()
+
+    def answered(self, seq, t1, t2, t3):
+        self.pending[seq] = (t1, t2, t3)
+        while len(self.pending) > 4: self.pending.popitem(last=False)  # Replies the stick never got
+
+    def completed(self, seq, t4):
+        if seq not in self.pending: return
+        t1, t2, t3 = self.pending.pop(seq)
+        delay = (t4 - t1) - (t3 - t2)
+        if delay < 0: return
+        self.exchanges.append((delay, ((t2 - t1) + (t3 - t4)) / 2.0))
+        self.rtt.add(delay)
+        self.offset = min(self.exchanges)[1]
+
+stick_clocks = {}  # Stick name -> StickClock; only the hit receiver thread writes
+
+def handle_sync(data, t_rx):
+    """A stick's clock ping -> the reply to send back, or None."""
+    magic, version, stick_id, seq, t1_us, prev_seq, prev_t4_us = SYNC_PING.unpack(data)
+    if version != SYNC_VERSION: return None
+    stick = STICK_BY_ID[stick_id]
+    clock = stick_clocks.get(stick) or stick_clocks.setdefault(stick, StickClock())
+    if prev_t4_us: clock.completed(prev_seq, prev_t4_us / 1e6)
+    t3 = time.time()
+    clock.answered(seq, t1_us / 1e6, t_rx, t3)
+    return SYNC_PONG.pack(SYNC_MAGIC, SYNC_VERSION, stick_id, seq, t1_us, t_rx, t3)
+
+class HitReceiver:
+    """Blocks in epoll until a hit arrives, then drains every queued datagram.
+
+    Each packet is stamped by the kernel on arrival (SO_TIMESTAMPNS), so the
+    latency histogram also covers the time a packet sat in the socket queue.
+    """
+    def __init__(self, on_hit=handle_hit, port=UDP_HIT_PORT, mode=HIT_RECEIVER_MODE, broadcast=True):
+        self.on_hit = on_hit
+        self.mode = mode
+        self.broadcast = broadcast
+        self.running = True
+
+        self.disc = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.disc.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("0.0.0.0", port))
+        self.sock.setblocking(False)
+        self.port = self.sock.getsockname()[1]
+
+        try:
+            self.sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+            self.kernel_ts = True
+        except OSError:
+            self.kernel_ts = False
+        self.anc_size = socket.CMSG_SPACE(16)
+
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.sock, selectors.EVENT_READ)
+        self.last_broadcast = 0.0
+
+    def send_discovery(self):
+        try: self.disc.sendto(b"AIRDRUM_SERVER", ("255.255.255.255", UDP_DISCOVERY_PORT))
+        except OSError: net_stats.inc("send_errors")
+        self.last_broadcast = time.time()
+
+    def recv(self):
+        if not self.kernel_ts:
+            data, addr = self.sock.recvfrom(64)
+            return data, addr, time.time()
+        data, anc, _, addr = self.sock.recvmsg(64, self.anc_size)
+        for level, kind, raw in anc:
+            if level == socket.SOL_SOCKET and kind == SO_TIMESTAMPNS and len(raw) >= 16:
+                sec, nsec = struct.unpack("@qq", raw[:16])
+                return data, addr, sec + nsec * 1e-9
+        return data, addr, time.time()
+
+    def drain(self):
         while True:
+            try: data, addr, t_rx = self.recv()
+            except BlockingIOError: return
+            except OSError as e:
+                net_stats.inc("recv_errors")
+                log_event(f" [DEBUG] UDP Error: {e}")
+                return
             try:
-                data, _ = t_list.recvfrom(32)
-                msg = data.decode("utf-8").upper().strip()
+                if len(data) == SYNC_PING.size and data[:2] == SYNC_MAGIC: self.answer_sync(data, addr, t_rx)
+                else: self.on_hit(data, t_rx)
+            except Exception as e:
+                net_stats.inc("handler_errors")
+                log_event(f" [DEBUG] Hit Error: {e}")
+
+    def answer_sync(self, data, addr, t_rx):
+        reply = handle_sync(data, t_rx)
+        if reply is None: return
+        try: self.sock.sendto(reply, addr)
+        except OSError: net_stats.inc("send_errors")
+
+    def run(self):
+        log_event(f" [NET] Listening on {self.port} ({self.mode}, kernel timestamps: {'ON' if self.kernel_ts else 'OFF'})")
+        try:
+            while self.running:
                 now = time.time()
-                
-                if "KICK" in msg:
-                    if now - last_hit_time["KICK"] > DEBOUNCE_TIME:
-                        play_sound("KICK")
-                        last_hit_time["KICK"] = now
-                        
-                elif "LEFT" in msg: 
-                    if now - last_hit_time["LEFT"] > DEBOUNCE_TIME:
-                        play_sound(current_zone_left)
-                        last_hit_time["LEFT"] = now
-                        
-                elif "RIGHT" in msg: 
-                    if now - last_hit_time["RIGHT"] > DEBOUNCE_TIME:
-                        play_sound(current_zone_right)
-                        last_hit_time["RIGHT"] = now
-                        
-            except BlockingIOError: break 
-            except Exception as e: 
-                print(f" [DEBUG] UDP Error: {e}") 
-                break
-                
-        time.sleep(0.001)
+                if self.broadcast and now - self.last_broadcast > BROADCAST_INTERVAL:
+                    self.send_discovery()
+
+                if self.mode == "poll":
+                    self.drain()
+                    time.sleep(0.001)
+                    continue
+
+                timeout = BROADCAST_INTERVAL - (time.time() - self.last_broadcast) if self.broadcast else 0.2
+                if self.selector.select(max(0.0, timeout)):
+                    self.drain()
+        finally:
+            self.selector.close()
+            self.sock.close()
+            self.disc.close()
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+        return self
+
+    def stop(self): self.running = False
+
+def udp_loops():
+    HitReceiver().run()
+
+# ================= PLAYERS =================
+class PlayerSession:
+    """One drummer: sticks, cameras, pose models, tracker, tip histories, live zones, debounce, phone frame slot.
+
+    Only the player's own vision threads (or its pose worker) write the
+    tracking state; the hit path reads zones and tip histories without a lock.
+    With two feeds (`fusing`), both threads step the one tracker under
+    `track_lock`. The mixer and the zone layout are shared by everyone.
+    """
+    def __init__(self, name, sticks, camera=None, inference=None):
+        self.name, self.camera = name, camera
+        self.roles = {STICK_BY_ID[i]: role for i, role in sticks.items()}  # Stick name -> LEFT / RIGHT / fixed-zone role
+        self.inference = inference or InferenceController(start_level=inference_ctl.level)
+        self.models = {}  # Pose models of a fused second feed
+        self.landmarkers = {}  # POSE_BACKEND = "tasks": feed -> PoseStream
+        self.tracker = TipTracker()
+        self.track_lock = threading.Lock()
+        self.fusing = False  # Webcam and phone both feed this player's tracker (see set_fusing)
+        self.tips = {"LEFT": TipHistory(), "RIGHT": TipHistory()}
+        self.zone = {"LEFT": "SNARE", "RIGHT": "SNARE"}
+        self.last_hit = collections.defaultdict(float)  # Role -> last played hit
+        self.frame_lock = threading.Lock()
+        self.jpeg, self.jpeg_time = None, 0.0  # Newest phone frame, raw bytes, decoded only when the vision loop takes it
+        self.phone_width = 0  # Native width of this player's phone frames, learned from the first decode
+        self.stream = StreamController(name)  # What this player's phone page is asked to send
+        self.arrived = {"camera": threading.Event(), "phone": threading.Event()}  # Set by the webcam thread / phone handler
+        self.worker, self.rings = None, {}  # While an inference pool process serves this player: feed -> ring
+
+    def sources(self):
+        """Feeds this player can use; one following the panel may get either or both."""
+        if self.camera is None: return ["camera", "phone"]
+        feeds = self.camera if isinstance(self.camera, list) else [self.camera]
+        return sorted({"phone" if feed == "phone" else "camera" for feed in feeds})
+
+    def set_fusing(self, on):
+        self.fusing = on
+        self.tracker.mode = FUSION_TRACKER if on else TRACKER_MODE
+
+    def model(self, source=None):
+        """Pose model for one feed; a fused phone feed gets its own so MediaPipe's tracking never jumps between cameras."""
+        if not self.fusing or source in (None, "camera"): return self.inference
+        if source not in self.models: self.models[source] = InferenceController(start_level=self.inference.level)
+        return self.models[source]
+
+    def landmarker(self, source):
+        """The feed's LIVE_STREAM PoseStream, started on its first frame."""
+        if source not in self.landmarkers: self.landmarkers[source] = PoseStream(self, source)
+        return self.landmarkers[source]
+
+    def reset(self):
+        """Fresh tracking and debounce state, so a replay always makes the same decisions."""
+        self.tracker.reset()
+        self.zone.update(LEFT="SNARE", RIGHT="SNARE")
+        for hist in self.tips.values(): hist.clear()
+        self.last_hit.clear()
+        self.inference.reset()
+        for model in self.models.values(): model.reset()
+        for stream in self.landmarkers.values(): stream.close()  # A LIVE_STREAM graph only forgets by closing
+        self.landmarkers.clear()
+
+def set_players(sessions):
+    """Makes `sessions` the live players: hit routing by stick and phone routing by name."""
+    global players, players_by_name, stick_owner
+    players = list(sessions)
+    players_by_name = {player.name: player for player in players}
+    stick_owner = {stick: (player, role) for player in players for stick, role in player.roles.items()}
+
+set_players(PlayerSession(p["name"], p["sticks"], p.get("camera"), inference_ctl if i == 0 else None)
+            for i, p in enumerate(PLAYERS))
+
+# ================= SESSION RECORDING =================
+# Append-only session file: an 8-byte magic, then records of
+# [u32 payload length][u8 kind][3 pad][f64 monotonic][f64 wall clock][payload].
+# The wall-clock field is the time the pipeline itself used (camera capture,
+# frame or hit receive), so a replay feeds back exactly the same timestamps.
+SESSION_MAGIC = b"SDSESS01"
+REC_HEADER = struct.Struct("<IB3xdd")
+REC_CAMERA, REC_PHONE, REC_POSE, REC_HIT = 1, 2, 3, 4  # JPEG, phone envelope, pose packet, UDP datagram
+REC_KINDS = {REC_CAMERA: "camera", REC_PHONE: "phone", REC_POSE: "pose", REC_HIT: "hit"}
+
+class SessionRecorder:
+    """Ingest threads only enqueue; one writer thread JPEG-encodes camera frames and appends."""
+    def __init__(self, path):
+        self.file = open(path, "ab")
+        if self.file.tell() == 0: self.file.write(SESSION_MAGIC)
+        self.queue = queue.SimpleQueue()
+        self.records = 0
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def add(self, kind, wall, payload):
+        self.queue.put((kind, time.monotonic(), wall, payload))
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None: break
+            kind, mono, wall, payload = item
+            if kind == REC_CAMERA:
+                ok, jpeg = cv2.imencode(".jpg", payload, [cv2.IMWRITE_JPEG_QUALITY, SESSION_JPEG_QUALITY])
+                if not ok: continue
+                payload = jpeg
+            payload = bytes(payload)
+            self.file.write(REC_HEADER.pack(len(payload), kind, mono, wall))
+            self.file.write(payload)
+            self.records += 1
+        self.file.close()
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join(5.0)
+
+class SessionReader:
+    """mmaps a session file and indexes it by monotonic time for random access."""
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(SESSION_MAGIC)] != SESSION_MAGIC: raise ValueError(f"{path} is not a session recording")
+        index, off = [], len(SESSION_MAGIC)
+        while off + REC_HEADER.size <= len(self.map):
+            length, kind, mono, wall = REC_HEADER.unpack_from(self.map, off)
+            if off + REC_HEADER.size + length > len(self.map): break  # Torn last record
+            index.append((mono, off))
+            off += REC_HEADER.size + length
+        index.sort()  # Writers enqueue from several threads
+        self.offsets = [off for mono, off in index]
+
+    def __len__(self): return len(self.offsets)
+
+    def __getitem__(self, i):
+        """-> (kind, monotonic, wall clock, payload bytes)"""
+        off = self.offsets[i]
+        length, kind, mono, wall = REC_HEADER.unpack_from(self.map, off)
+        start = off + REC_HEADER.size
+        return kind, mono, wall, self.map[start:start + length]
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+session_recorder = None
+
+def replay_session(path, realtime=False):
+    """Pushes a recording through the live pose, landmark and hit paths.
+
+    Tracking state is reset and pose adaptation frozen first, so replaying the
+    same file always makes the same zone decisions. `realtime` paces records by
+    their recorded monotonic times; otherwise they run back to back.
+    """
+    global ADAPTIVE_INFERENCE
+    reader = SessionReader(path)
+    player = players[0]  # A recording holds one player's frames and sticks
+    player.reset()
+    hit_windows.clear()
+    adaptive, ADAPTIVE_INFERENCE = ADAPTIVE_INFERENCE, False
+    stages = collections.defaultdict(LatencyHistogram)
+    counts = collections.Counter()
+    decisions = []
+    mono0 = reader[0][1] if len(reader) else 0.0
+    t_start = time.perf_counter()
+    try:
+        for i in range(len(reader)):
+            kind, mono, wall, payload = reader[i]
+            if realtime:
+                delay = (mono - mono0) - (time.perf_counter() - t_start)
+                if delay > 0: time.sleep(delay)
+            counts[REC_KINDS.get(kind, "unknown")] += 1
+            t0 = time.perf_counter()
+            if kind in (REC_CAMERA, REC_PHONE):
+                t_capture, jpeg = wall, payload
+                if kind == REC_PHONE:
+                    seq, t_capture, jpeg = parse_phone_frame(payload, wall)
+                    if wall - t_capture > PHONE_MAX_FRAME_AGE: continue
+                frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+                if frame is None: continue
+                t1 = time.perf_counter()
+                stages["decode"].add(t1 - t0)
+                process_pose_frame(player, cv2.flip(frame, 1), True, t_capture)
+                stages["pose"].add(time.perf_counter() - t1)
+                decisions.append((kind, round(t_capture, 6), player.zone["LEFT"], player.zone["RIGHT"]))
+            elif kind == REC_POSE:
+                t_capture = handle_pose_packet(player, payload, wall)
+                if t_capture is None: continue
+                stages["landmarks"].add(time.perf_counter() - t0)
+                decisions.append((kind, round(t_capture, 6), player.zone["LEFT"], player.zone["RIGHT"]))
+            elif kind == REC_HIT:
+                hit = parse_hit(payload, wall)
+                zone = dispatch_hit(hit) if hit else None
+                stages["hit"].add(time.perf_counter() - t0)
+                decisions.append((kind, round(wall, 6), hit and hit[0], zone))
+    finally:
+        ADAPTIVE_INFERENCE = adaptive
+        reader.close()
+    return {
+        "records": dict(counts), "decisions": decisions,
+        "digest": hashlib.sha1(repr(decisions).encode()).hexdigest()[:16],
+        "elapsed_s": round(time.perf_counter() - t_start, 3),
+        "stages": {name: hist.summary() for name, hist in sorted(stages.items())},
+    }
+
+# ================= CONTROL PANEL =================
+class TextCache:
+    """Rendered text surfaces, reused until the text (or its colour) changes."""
+    def __init__(self, limit=256):
+        self.surfaces, self.limit = {}, limit
+
+    def render(self, font, text, color):
+        key = (font, text, color)
+        surf = self.surfaces.get(key)
+        if surf is None:
+            if len(self.surfaces) >= self.limit: self.surfaces.clear()
+            surf = self.surfaces[key] = font.render(text, True, color)
+        return surf
+
+class ControlPanel:
+    """The pygame window, repainted a region at a time.
+
+    Each region remembers the state it last showed and is repainted only when
+    that changes; flush() pushes just those rects to the display.
+    """
+    BG = (15, 15, 20)
+    DRUMS = ["SNARE", "HI-HAT", "CRASH", "RIDE", "FLOOR TOM", "KICK"]
+
+    def __init__(self, screen, ip, cache_text=True):
+        self.screen, self.ip = screen, ip
+        self.font = pygame.font.SysFont("arial", 20, bold=True)
+        self.title_font = pygame.font.SysFont("arial", 28, bold=True)
+        self.small_font = pygame.font.SysFont("arial", 14)
+        self.text = TextCache().render if cache_text else lambda font, text, color: font.render(text, True, color)
+
+        self.btn_pc = pygame.Rect(150, 180, 180, 60)
+        self.btn_mobile = pygame.Rect(370, 180, 180, 60)
+        self.btn_both = pygame.Rect(260, 255, 180, 44)
+        self.btn_ip = pygame.Rect(20, 380, 110, 40)
+        self.btn_headless = pygame.Rect(275, 380, 150, 40)
+        self.sliders, self.slider_regions = {}, {}
+        spacing = 700 / 6
+        for i, name in enumerate(self.DRUMS):
+            x_center = (i * spacing) + (spacing / 2)
+            self.sliders[name] = pygame.Rect(x_center - 15, 120, 30, 200)
+            self.slider_regions[name] = pygame.Rect(int(i * spacing), 90, int(spacing), 262)  # Label to value text
+        self.ip_url_region = pygame.Rect(0, 356, 700, 22)
+        self.status_region = pygame.Rect(0, 10, 560, 30)
+        self.mode_region = pygame.Rect(560, 10, 140, 30)
+        self.kit_region = pygame.Rect(560, 40, 140, 24)
+
+        self.page, self.shown, self.dirty = None, {}, []
+
+    def region(self, key, rect, state, paint):
+        if key in self.shown and self.shown[key] == state: return
+        self.shown[key] = state
+        self.screen.fill(self.BG, rect)
+        paint()
+        self.dirty.append(rect)
+
+    def draw(self, app_state, camera_mode, show_ip):
+        if app_state != self.page:
+            self.page, self.shown = app_state, {}
+            self.screen.fill(self.BG)
+            self.dirty.append(self.screen.get_rect())
+
+        if app_state == "STARTUP":
+            warm = vision_ready.is_set()
+            self.region("startup", self.screen.get_rect(), (warm, show_ip), lambda: self.paint_startup(warm, show_ip))
+
+        elif app_state == "MIXER":
+            for name, rect in self.sliders.items():
+                vol = volumes[name]
+                self.region(name, self.slider_regions[name], (int(vol * rect.height), int(vol * 100)),
+                            lambda: self.paint_slider(name, rect, vol))
+            self.region("headless", self.btn_headless, HEADLESS_MODE, self.paint_headless)
+            if camera_mode in ("MOBILE", "BOTH"):  # IP toggle is visible only when a phone is in use
+                self.region("ip", self.btn_ip, show_ip, lambda: self.paint_ip_button(show_ip))
+                self.region("ip-url", self.ip_url_region, show_ip, lambda: self.paint_ip_url(show_ip))
+            self.region("mode", self.mode_region, camera_mode,
+                        lambda: self.screen.blit(self.text(self.small_font, f"[{camera_mode} MODE]", (150, 150, 150)), (580, 20)))
+            kit = audio.kit.name
+            self.region("kit", self.kit_region, kit,
+                        lambda: self.screen.blit(self.text(self.small_font, f"Kit: {kit} (K)", (150, 150, 150)), (580, 42)))
+            status = None
+            if not inference_pool:
+                ctl = inference_ctl.status()
+                p95 = "--" if ctl["window_p95_ms"] is None else f"{ctl['window_p95_ms']:.1f}"
+                status = f"Pose: complexity {ctl['complexity']}, scale {ctl['scale']}, p95 {p95}/{ctl['budget_ms']:.0f} ms"
+            self.region("status", self.status_region, status,
+                        lambda: status and self.screen.blit(self.text(self.small_font, status, (150, 150, 150)), (20, 20)))
+
+    def flush(self):
+        if self.dirty:
+            pygame.display.update(self.dirty)
+            self.dirty = []
+
+    def paint_startup(self, warm, show_ip):
+        self.screen.blit(self.text(self.title_font, "SPACE DRUMS", (138, 43, 226)), (250, 80))
+        pygame.draw.rect(self.screen, (50, 150, 255), self.btn_pc, border_radius=10)
+        pygame.draw.rect(self.screen, (255, 120, 50), self.btn_mobile, border_radius=10)
+        self.screen.blit(self.text(self.font, "PC Camera", (255, 255, 255)), (self.btn_pc.x + 35, self.btn_pc.y + 18))
+        self.screen.blit(self.text(self.font, "Mobile App", (255, 255, 255)), (self.btn_mobile.x + 35, self.btn_mobile.y + 18))
+        pygame.draw.rect(self.screen, (70, 70, 90), self.btn_both, border_radius=10)
+        self.screen.blit(self.text(self.font, "PC + Phone", (255, 255, 255)), (self.btn_both.x + 38, self.btn_both.y + 10))
+        if not warm:
+            wait_txt = self.text(self.small_font, "Warming up camera tracking...", (150, 150, 150))
+            self.screen.blit(wait_txt, (350 - wait_txt.get_width() // 2, 310))
+        self.paint_ip_button(show_ip)
+        self.paint_ip_url(show_ip)
+
+    def paint_slider(self, name, rect, vol):
+        pygame.draw.rect(self.screen, (40, 40, 50), rect)
+        fill_h = int(vol * rect.height)
+        fill_y = rect.y + (rect.height - fill_h)
+        pygame.draw.rect(self.screen, (max(0, int(138 - (vol * 138))), int(vol * 200), 255), (rect.x, fill_y, rect.width, fill_h))
+        pygame.draw.rect(self.screen, (220, 220, 220), (rect.x-5, fill_y-5, rect.width+10, 10))
+        lbl = self.text(self.small_font, name, (200, 200, 200))
+        self.screen.blit(lbl, (rect.x + 15 - (lbl.get_width()//2), rect.y - 25))
+        val_lbl = self.text(self.small_font, f"{int(vol*100)}%", (255, 255, 255))
+        self.screen.blit(val_lbl, (rect.x + 15 - (val_lbl.get_width()//2), rect.y + rect.height + 10))
+
+    def paint_headless(self):
+        h_color = (138, 43, 226) if HEADLESS_MODE else (100, 100, 100)
+        pygame.draw.rect(self.screen, h_color, self.btn_headless, border_radius=5)
+        h_text = self.text(self.font, f"Headless: {'ON' if HEADLESS_MODE else 'OFF'}", (255, 255, 255))
+        self.screen.blit(h_text, (self.btn_headless.x + 15, self.btn_headless.y + 8))
+
+    def paint_ip_button(self, show_ip):
+        pygame.draw.rect(self.screen, (70, 70, 90), self.btn_ip, border_radius=5)
+        ip_btn_txt = self.text(self.font, "Hide IP" if show_ip else "Show IP", (255, 255, 255))
+        self.screen.blit(ip_btn_txt, (self.btn_ip.x + 10, self.btn_ip.y + 8))
+
+    def paint_ip_url(self, show_ip):
+        if show_ip:
+            ip_txt = self.text(self.small_font, f"Phone URL: http://{self.ip}:{WEB_PORT}", (50, 255, 100))
+            self.screen.blit(ip_txt, (self.btn_ip.x, self.btn_ip.y - 20))
 
 # ================= PYGAME UI & MAIN LOOP =================
 def main():
-    global HEADLESS_MODE, volumes, sounds
+    global HEADLESS_MODE, volumes, session_recorder
 
     # Get local IP for display
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     try: s.connect(("8.8.8.8",80)); ip=s.getsockname()[0]; s.close()
     except: ip="127.0.0.1"
 
-    # Start network thread
-    threading.Thread(target=udp_loops, daemon=True).start()
+    if SESSION_RECORD_PATH: session_recorder = SessionRecorder(SESSION_RECORD_PATH)
 
     # Pygame UI Setup
     screen = pygame.display.set_mode((700, 450))
+    screen.fill((15, 15, 20))
+    pygame.display.flip()
+    startup_mark("window")
+
+    # Hit path next; vision and web stack warm up in the background
+    init_audio()
+    if ZONE_LAYOUT_PATH: threading.Thread(target=watch_zone_layout, daemon=True).start()
+    threading.Thread(target=udp_loops, daemon=True).start()
+    startup_mark("hits playable")
+    threading.Thread(target=warm_up_vision, daemon=True).start()
     pygame.display.set_caption("Space Drums Control Panel")
-    font = pygame.font.SysFont("arial", 20, bold=True)
-    title_font = pygame.font.SysFont("arial", 28, bold=True)
-    small_font = pygame.font.SysFont("arial", 14)
+    panel = ControlPanel(screen, ip)
 
     # UI State
     app_state = "STARTUP" 
     camera_mode = None
-    vs = None
-    lid = None
-
-    # UI Elements Layout
-    btn_pc = pygame.Rect(150, 180, 180, 60)
-    btn_mobile = pygame.Rect(370, 180, 180, 60)
-    btn_ip = pygame.Rect(20, 380, 110, 40)
-    btn_headless = pygame.Rect(275, 380, 150, 40)
-    
+    streams = []
+    vision_stop = threading.Event()
     show_ip = False
-    
-    drum_names = ["SNARE", "HI-HAT", "CRASH", "RIDE", "FLOOR TOM", "KICK"]
-    sliders = {}
-    spacing = 700 / 6
-    for i, name in enumerate(drum_names):
-        x_center = (i * spacing) + (spacing / 2)
-        sliders[name] = pygame.Rect(x_center - 15, 120, 30, 200)
+    next_preview = 0.0
+    kit_index = -1
 
     dragging_slider = None
     clock = pygame.time.Clock()
     running = True
 
     while running:
-        screen.fill((15, 15, 20)) 
+        t0 = time.perf_counter()
 
         # --- EVENT HANDLING ---
         for event in pygame.event.get():
@@ -366,27 +3005,41 @@ def main():
             
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1: 
-                    if app_state == "STARTUP":
-                        if btn_pc.collidepoint(event.pos):
+                    if app_state == "STARTUP" and vision_ready.is_set():
+                        if panel.btn_pc.collidepoint(event.pos):
                             camera_mode = "PC"
-                            vs = WebcamStream(src=0).start()
+                            streams = start_players(camera_mode, vision_stop)
+                            if any(p.camera == "phone" for p in players):
+                                threading.Thread(target=run_web, daemon=True).start()
+                            elif METRICS_IN_PC_MODE:  # Nothing to ingest: keep /metrics off the network
+                                threading.Thread(target=run_web, kwargs={"host": "127.0.0.1"}, daemon=True).start()
                             app_state = "MIXER"
-                        elif btn_mobile.collidepoint(event.pos):
+                        elif panel.btn_mobile.collidepoint(event.pos):
                             camera_mode = "MOBILE"
                             threading.Thread(target=run_web, daemon=True).start()
+                            streams = start_players(camera_mode, vision_stop)
+                            app_state = "MIXER"
+                        elif panel.btn_both.collidepoint(event.pos):
+                            camera_mode = "BOTH"
+                            threading.Thread(target=run_web, daemon=True).start()
+                            streams = start_players(camera_mode, vision_stop)
                             app_state = "MIXER"
-                        elif btn_ip.collidepoint(event.pos):
+                        elif panel.btn_ip.collidepoint(event.pos):
                             show_ip = not show_ip
                     
+                    elif app_state == "STARTUP":
+                        if panel.btn_ip.collidepoint(event.pos): show_ip = not show_ip
+
                     elif app_state == "MIXER":
-                        if btn_headless.collidepoint(event.pos):
+                        if panel.btn_headless.collidepoint(event.pos):
                             HEADLESS_MODE = not HEADLESS_MODE
                             if HEADLESS_MODE: 
+                                preview_frames.clear()
                                 cv2.destroyAllWindows()
-                        elif camera_mode == "MOBILE" and btn_ip.collidepoint(event.pos):
+                        elif camera_mode in ("MOBILE", "BOTH") and panel.btn_ip.collidepoint(event.pos):
                             show_ip = not show_ip
                         
-                        for name, rect in sliders.items():
+                        for name, rect in panel.sliders.items():
                             if rect.collidepoint(event.pos):
                                 dragging_slider = name
             
@@ -396,100 +3049,103 @@ def main():
             
             elif event.type == pygame.MOUSEMOTION:
                 if dragging_slider:
-                    rect = sliders[dragging_slider]
+                    rect = panel.sliders[dragging_slider]
                     rel_y = max(0, min(rect.height, event.pos[1] - rect.y))
                     new_vol = 1.0 - (rel_y / rect.height)
                     volumes[dragging_slider] = new_vol
-                    if sounds.get(dragging_slider):
-                        sounds[dragging_slider].set_volume(new_vol)
+                    audio.set_volume(dragging_slider, new_vol)
 
-        # --- DRAWING UI ---
-        if app_state == "STARTUP":
-            title = title_font.render("SPACE DRUMS", True, (138, 43, 226)) 
-            screen.blit(title, (250, 80))
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_k:
+                kits = available_kits()  # Loads in the background; hits keep the current kit until the swap
+                if kits:
+                    kit_index = (kit_index + 1) % len(kits)
+                    load_kit_async(audio, kits[kit_index])
 
-            pygame.draw.rect(screen, (50, 150, 255), btn_pc, border_radius=10)
-            pygame.draw.rect(screen, (255, 120, 50), btn_mobile, border_radius=10)
+        # --- DRAWING UI (changed regions only) ---
+        panel.draw(app_state, camera_mode, show_ip)
+        panel.flush()
+        ui_pass.add(time.perf_counter() - t0)
 
-            screen.blit(font.render("PC Camera", True, (255, 255, 255)), (btn_pc.x + 35, btn_pc.y + 18))
-            screen.blit(font.render("Mobile App", True, (255, 255, 255)), (btn_mobile.x + 35, btn_mobile.y + 18))
-            
-            # Show/Hide IP Toggle Button
-            pygame.draw.rect(screen, (70, 70, 90), btn_ip, border_radius=5)
-            ip_btn_txt = font.render("Hide IP" if show_ip else "Show IP", True, (255, 255, 255))
-            screen.blit(ip_btn_txt, (btn_ip.x + 10, btn_ip.y + 8))
-            
-            if show_ip:
-                ip_txt = small_font.render(f"Phone URL: http://{ip}:{WEB_PORT}", True, (50, 255, 100))
-                screen.blit(ip_txt, (btn_ip.x, btn_ip.y - 20))
+        # --- PREVIEW (throttled; the vision threads only hand over their newest frames) ---
+        if not HEADLESS_MODE and preview_frames and time.perf_counter() >= next_preview:
+            next_preview = time.perf_counter() + 1.0 / PREVIEW_FPS
+            t0 = time.perf_counter()
+            title = {"PC": 'Space Drums - PC Camera', "MOBILE": 'Space Drums - Mobile Feed'}.get(camera_mode, 'Space Drums - PC + Phone')
+            for name, frame in list(preview_frames.items()):
+                cv2.imshow(title if len(preview_frames) == 1 else f"{title} ({name})", frame)
+            cv2.waitKey(1)
+            preview_pass.add(time.perf_counter() - t0)
 
-        elif app_state == "MIXER":
-            # Draw Sliders
-            for name, rect in sliders.items():
-                pygame.draw.rect(screen, (40, 40, 50), rect) 
-                
-                vol = volumes[name]
-                fill_h = int(vol * rect.height)
-                fill_y = rect.y + (rect.height - fill_h)
-                
-                r = max(0, int(138 - (vol * 138)))
-                g = int(vol * 200)
-                b = 255
-                pygame.draw.rect(screen, (r, g, b), (rect.x, fill_y, rect.width, fill_h)) 
-                pygame.draw.rect(screen, (220, 220, 220), (rect.x-5, fill_y-5, rect.width+10, 10)) 
-                
-                lbl = small_font.render(name, True, (200, 200, 200))
-                screen.blit(lbl, (rect.x + 15 - (lbl.get_width()//2), rect.y - 25))
-                val_lbl = small_font.render(f"{int(vol*100)}%", True, (255, 255, 255))
-                screen.blit(val_lbl, (rect.x + 15 - (val_lbl.get_width()//2), rect.y + rect.height + 10))
-
-            # Draw Headless Toggle
-            h_color = (138, 43, 226) if HEADLESS_MODE else (100, 100, 100)
-            pygame.draw.rect(screen, h_color, btn_headless, border_radius=5)
-            h_text = font.render(f"Headless: {'ON' if HEADLESS_MODE else 'OFF'}", True, (255, 255, 255))
-            screen.blit(h_text, (btn_headless.x + 15, btn_headless.y + 8))
-            
-            # IP Toggle Button (Visible only in Mobile Mode)
-            if camera_mode == "MOBILE":
-                pygame.draw.rect(screen, (70, 70, 90), btn_ip, border_radius=5)
-                ip_btn_txt = font.render("Hide IP" if show_ip else "Show IP", True, (255, 255, 255))
-                screen.blit(ip_btn_txt, (btn_ip.x + 10, btn_ip.y + 8))
-                
-                if show_ip:
-                    ip_txt = small_font.render(f"Phone URL: http://{ip}:{WEB_PORT}", True, (50, 255, 100))
-                    screen.blit(ip_txt, (btn_ip.x, btn_ip.y - 20))
-            
-            mode_txt = small_font.render(f"[{camera_mode} MODE]", True, (150, 150, 150))
-            screen.blit(mode_txt, (580, 20))
-
-            # --- CAMERA PROCESSING ---
-            if camera_mode == "PC":
-                f = vs.read()
-                if f is not None:
-                    frame = process_pose_frame(cv2.flip(f, 1), True)
-                    if not HEADLESS_MODE:
-                        cv2.imshow('Space Drums - PC Camera', frame)
-                        cv2.waitKey(1)
-            
-            elif camera_mode == "MOBILE":
-                with frame_lock:
-                    if latest_frame_from_phone is not None:
-                        cid = id(latest_frame_from_phone)
-                        if cid != lid:
-                            frame = process_pose_frame(cv2.flip(latest_frame_from_phone, 1), True)
-                            lid = cid
-                            if not HEADLESS_MODE:
-                                cv2.imshow('Space Drums - Mobile Feed', frame)
-                                cv2.waitKey(1)
-
-        pygame.display.flip()
-        clock.tick(60)
+        clock.tick(UI_FPS)
 
     # Cleanup
-    if vs: vs.stop()
+    vision_stop.set()
+    for vs in streams: vs.stop()
+    if session_recorder:
+        session_recorder.close()
+        print(f" [REC] {session_recorder.records} records written to {SESSION_RECORD_PATH}")
+    stop_inference_pool()
+    print(f" [STATS] Hit latency (receive -> play): {hit_latency.summary()}")
+    voices = audio.voices.stats.totals()
+    print(f" [STATS] Voices: {voices['played']} started, {voices['stolen']} stolen, {voices['choked']} choked, "
+          f"{voices['dropped']} hits dropped")
+    if vision_pass.count: print(f" [STATS] Vision pass (take -> zones): {vision_pass.summary()}")
+    print(f" [STATS] UI pass (events + redraw): {ui_pass.summary()}")
+    if preview_pass.count: print(f" [STATS] Preview (imshow + waitKey): {preview_pass.summary()}")
+    if phone_stats["received"]:
+        avg = phone_stats["decode_ms"] / max(1, phone_stats["decoded"])
+        print(f" [STATS] Phone frames: {phone_stats['received']} received, {phone_stats['decoded']} decoded "
+              f"({avg:.2f} ms avg), {phone_stats['discarded']} discarded undecoded, {phone_stats['stale']} stale")
+    if phone_stats["landmarks"]:
+        print(f" [STATS] Phone pose packets: {phone_stats['landmarks']}")
+    if frame_age_ingest.count:
+        print(f" [STATS] Phone frame age at ingest: {frame_age_ingest.summary()}")
+    if frame_age_zone.count:
+        print(f" [STATS] Frame age when zones update (capture -> zone): {frame_age_zone.summary()}")
+    for player in players:
+        if player.stream.bytes_per_s:
+            print(f" [STATS] {player.name} phone stream: {player.stream.describe()}, {dict(player.stream.switches)} changes, "
+                  f"last window {player.stream.last_window}")
+    for source in ("camera", "phone"):
+        feed = feed_summary(source)
+        if feed["frames"]:
+            print(f" [STATS] {source.title()} feed: {feed['frames']} frames, {feed['fused']} arms fused, {feed['late']} late, "
+                  f"{feed['lost']} lost, wrist confidence {feed['confidence']}, age {feed['age']}")
+    for player in players:
+        for feed, stream in sorted(player.landmarkers.items()):
+            print(f" [STATS] {player.name} {feed} landmarker: {stream.submitted} submitted, {stream.completed} with results, "
+                  f"{stream.skipped} skipped, submit -> result {stream.latency.summary()}")
+    if hit_stats["received"]:
+        print(f" [STATS] Hits: {hit_stats['received']} received, {hit_stats['played']} played, "
+              f"{hit_stats['debounced']} debounced, {hit_stats['no_zone']} without a zone")
+    for stick, window in sorted(hit_windows.items()):
+        print(f" [STATS] Stick {stick} packets: {window.lost} hits lost ({100.0 * window.loss_rate():.1f}%), "
+              f"{window.duplicates} duplicate copies dropped, {window.reordered} reordered")
+    for stick, clock in sorted(stick_clocks.items()):
+        if clock.rtt.count:
+            print(f" [STATS] Stick {stick} sync: ping round trip {clock.rtt.summary()}, hit delay {clock.one_way.summary()}")
+    if hit_clock_latency.count:
+        print(f" [STATS] Impact -> sound ({HIT_SCHEDULE}): {hit_clock_latency.summary()}, "
+              f"{hit_stats['late']} late, {hit_stats['unsynced']} unsynced")
+    if zone_stats["lookups"]:
+        pct = 100.0 * zone_stats["differs_from_latest"] / zone_stats["lookups"]
+        print(f" [STATS] Hit-time zone differed from latest-frame zone on {pct:.1f}% of {zone_stats['lookups']} hits")
     cv2.destroyAllWindows()
+    audio.close()
     pygame.quit()
     sys.exit()
 
+startup_mark("module")  # Everything above is cheap to import; see LazyModule
+
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 2 and sys.argv[1] == "--bench":  # The suite lives in bench/ at the repository root
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+        import bench
+        init_audio()
+        bench.main(sys.modules[__name__], sys.argv[2:], JSON_OUT)
+    elif len(sys.argv) > 2 and sys.argv[1] == "--replay":
+        init_audio()
+        result = replay_session(sys.argv[2], realtime="--realtime" in sys.argv)
+        result["decisions"] = len(result["decisions"])
+        print(json.dumps(result, indent=2), file=JSON_OUT or sys.stdout, flush=True)
+    else: main()
@@ -0,0 +1,53 @@
+"""Both servers are loaded as plain modules; every test runs against the Linux and the Windows build.
+
+Importing a server only builds its state (players, zone layout, stats). Audio,
+cameras, sockets and MediaPipe start from main() or lazily, so none of them
+is needed here.
+"""
+import importlib.util
+import os
+import sys
+
+import numpy as np
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)  # For the bench package
+SERVERS = {"linux": os.path.join(ROOT, "linux-server", "python_server.py"),
+           "windows": os.path.join(ROOT, "windows-server", "server.py")}
+_loaded = {}
+
+def load_server(name):
+    if name not in _loaded:
+        spec = importlib.util.spec_from_file_location(f"{name}_server", SERVERS[name])
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _loaded[name] = module
+    return _loaded[name]
+
+@pytest.fixture(params=sorted(SERVERS))
+def server(request):
+    """A server module with its first player's tracking, debounce and zones fresh."""
+    srv = load_server(request.param)
+    srv.players[0].reset()
+    return srv
+
+@pytest.fixture
+def bench(server):
+    """The benchmark suite, measuring `server`."""
+    import bench as suite
+    suite.use(server)
+    return suite
+
+@pytest.fixture
+def mixer(server, monkeypatch):
+    """The server's audio engine for one test: a NumPy mixer with a short click per drum and no device."""
+    engine = server.NumpyMixerEngine(files={}, sink=server.NullSink(realtime=False))
+    engine.sink.stop()  # Blocks render only when a test asks
+    click = (np.random.default_rng(0).standard_normal((server.SAMPLE_RATE // 10, 2)) * 0.1).astype(np.float32)
+    for zone in server.SOUND_FILES: engine.add_sample(zone, click)
+    monkeypatch.setattr(server, "audio", engine)
+    return engine
@@ -0,0 +1,61 @@
+"""Stick clock sync: the offset from ping exchanges, and impact-to-sound measured when the sound starts."""
+import numpy as np
+import pytest
+
+TRUE_OFFSET = 1234.5678  # Our clock = stick clock + this
+
+def ping_exchanges(clock, seconds=30.0, interval=0.25, up_ms=(4.0, 6.0), down_ms=(2.0, 1.0), drift_ppm=0.0, seed=0):
+    """Pings as handle_sync() sees them: each reply's t4 arrives with the next ping.
+
+    One-way delays are a base plus gamma-distributed queueing, (base, mean extra)
+    in ms, deliberately different up and down. Returns the true offset at the end.
+    """
+    rng = np.random.default_rng(seed)
+    delay = lambda base, extra: (base + rng.gamma(2.0, extra / 2.0)) / 1000.0
+    offset = lambda ours: TRUE_OFFSET + ours * drift_ppm * 1e-6
+    prev = None
+    for i in range(int(seconds / interval)):
+        t1_ours = i * interval
+        t2 = t1_ours + delay(*up_ms)
+        t3 = t2 + 0.0002
+        if prev is not None: clock.completed(*prev)
+        clock.answered(i, t1_ours - offset(t1_ours), t2, t3)
+        t4_ours = t3 + delay(*down_ms)
+        prev = (i, t4_ours - offset(t4_ours))
+    return offset(seconds)
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("drift_ppm", [0.0, 40.0])
+def test_offset_error_is_bounded(server, drift_ppm, seed):
+    clock = server.StickClock()
+    true = ping_exchanges(clock, drift_ppm=drift_ppm, seed=seed)
+    # The NTP bound: half the quickest round trip kept, plus drift since that exchange (< SYNC_WINDOW pings ago)
+    best_rtt = min(clock.exchanges)[0]
+    assert abs(clock.offset - true) <= best_rtt / 2 + drift_ppm * 1e-6 * server.SYNC_WINDOW * 0.25
+    assert abs(clock.offset - true) < 0.002  # 1 ms of the error is the base asymmetry, 4 ms up vs. 2 ms down
+    assert len(clock.exchanges) == server.SYNC_WINDOW and clock.rtt.count == 119
+
+def test_unknown_and_impossible_replies_are_ignored(server):
+    clock = server.StickClock()
+    clock.completed(7, 1.0)  # Never answered
+    clock.answered(1, 10.0, 20.0, 20.001)
+    clock.completed(1, 10.0)  # Round trip shorter than our turnaround
+    assert clock.offset is None and not clock.exchanges and clock.rtt.count == 0
+    for seq in range(2, 8): clock.answered(seq, 10.0, 20.0, 20.001)
+    clock.completed(2, 10.01)  # Only the newest four replies are kept
+    assert clock.offset is None
+
+def test_impact_to_sound_is_taken_when_the_mixer_starts_the_voice(server, mixer, monkeypatch):
+    hist, clock = server.LatencyHistogram(), server.StickClock()
+    clock.offset = TRUE_OFFSET
+    monkeypatch.setattr(server, "hit_clock_latency", hist)
+    monkeypatch.setattr(server, "HIT_SCHEDULE", "immediate")
+    monkeypatch.setitem(server.stick_clocks, "KICK", clock)
+    monkeypatch.setattr(server, "hit_windows", {})
+    t_rx = server.time.time()
+    t_hit = t_rx - 0.01
+    zone = server.dispatch_hit(("KICK", 1, int((t_hit - TRUE_OFFSET) * 1e6), 200, t_rx))
+    assert zone == "KICK" and hist.count == 0  # Queued, not yet sounding
+    server.time.sleep(0.02)
+    mixer.render()
+    assert hist.count == 1 and hist.max >= 0.03 - 0.002
@@ -0,0 +1,72 @@
+"""Redundant hit packets: one play per hit number whatever the network does to the copies, and an exact loss count."""
+import numpy as np
+import pytest
+
+WRAP = (1 << 32) - 100  # Starts 100 hits before the stick's uint32 wraps to 0
+
+def lossy_link(hits, copies=3, drop=0.1, shuffle=20, seed=0):
+    """(hit indexes in arrival order, lost indexes): some hits never arrive, the rest arrive `copies` times, shuffled.
+
+    The first and last hits always arrive, so every gap lies between numbers seen.
+    """
+    rng = np.random.default_rng(seed)
+    lost = {i for i in range(1, hits - 1) if rng.random() < drop}
+    arrivals = [(i + rng.uniform(0, shuffle), i) for i in range(hits) if i not in lost for _ in range(copies)]
+    return [i for _, i in sorted(arrivals)], lost
+
+def expected_reordered(order):
+    first, top, n = set(), -1, 0
+    for i in order:
+        if i in first: continue
+        first.add(i)
+        if i < top: n += 1
+        top = max(top, i)
+    return n
+
+@pytest.mark.parametrize("base", [0, WRAP])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_window_passes_each_hit_once(server, base, seed):
+    order, lost = lossy_link(400, seed=seed)
+    window, passed = server.SeqWindow(), []
+    for k, i in enumerate(order):
+        if window.accept((base + i) % (1 << 32), k * 1e-3): passed.append(i)
+    assert sorted(passed) == sorted(set(order))
+    assert window.lost == len(lost) and window.unique == 400 - len(lost)
+    assert window.duplicates == 2 * window.unique
+    assert window.reordered == expected_reordered(order)
+    assert window.loss_rate() == len(lost) / 400
+
+def test_wrap_is_not_a_restart_or_a_huge_gap(server):
+    window = server.SeqWindow()
+    for seq in ((1 << 32) - 2, (1 << 32) - 1, 1, 0, 0, (1 << 32) - 1):
+        window.accept(seq, 0.0)
+    assert window.summary() == {"hits": 4, "lost": 0, "loss_pct": 0.0, "duplicates": 2, "reordered": 1}
+
+def test_far_jumps_and_restarts(server):
+    window = server.SeqWindow()
+    window.accept(5, 0.0)
+    assert window.accept(5 + 1000, 0.01) and window.lost == 999
+    assert not window.accept(5 + 1000, 0.02) and not window.accept(5 + 999 - server.HIT_SEQ_WINDOW, 0.03)
+    assert window.accept(3, 0.04 + server.HIT_SEQ_RESTART)  # Rebooted stick starts counting again
+    assert window.accept(4, 0.05 + server.HIT_SEQ_RESTART) and not window.accept(3, 0.06 + server.HIT_SEQ_RESTART)
+
+@pytest.mark.parametrize("base", [0, WRAP])
+def test_dispatch_plays_each_hit_once(server, mixer, monkeypatch, base):
+    """Copies 2 ms apart, some hits lost outright, some neighbours swapped; hits themselves 100 ms apart."""
+    monkeypatch.setattr(server, "hit_windows", {})
+    monkeypatch.setattr(server, "hit_stats", server.Counters(*server.hit_stats.names))
+    rng = np.random.default_rng(3)
+    slots = list(range(200))
+    for i in range(0, 198, 10): slots[i], slots[i + 1] = slots[i + 1], slots[i]
+    lost = {i for i in range(1, 199) if rng.random() < 0.1}
+    played = []
+    for slot, i in enumerate(slots):
+        if i in lost: continue
+        for copy in range(3):
+            hit = ("KICK", (base + i) % (1 << 32), None, None, 100.0 + slot * 0.1 + copy * 0.002)
+            if server.dispatch_hit(hit): played.append(i)
+    assert sorted(played) == sorted(set(range(200)) - lost)
+    assert len(mixer.pending) == len(played)
+    stats, window = server.hit_stats.snapshot(), server.hit_windows["KICK"]
+    assert stats[("played", "KICK")] == stats[("received", "KICK")] == len(played)
+    assert window.lost == len(lost) and window.duplicates == 2 * len(played)
@@ -0,0 +1,54 @@
+"""Latency histograms and counters fed from several threads at once lose nothing."""
+import sys
+import threading
+
+THREADS, PER_THREAD = 8, 20000
+
+def hammer(fn):
+    start = threading.Barrier(THREADS)
+    def run(k):
+        start.wait()
+        for i in range(PER_THREAD): fn(k, i)
+    threads = [threading.Thread(target=run, args=(k,)) for k in range(THREADS)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+
+def test_histogram_keeps_every_sample(server):
+    old = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # Switch threads as often as possible
+    try:
+        hist = server.LatencyHistogram()
+        hammer(lambda k, i: hist.add((k + 1) * 1e-3))
+    finally:
+        sys.setswitchinterval(old)
+    counts, count, total, peak = hist.snapshot()
+    assert count == sum(counts) == THREADS * PER_THREAD
+    assert abs(total - PER_THREAD * 1e-3 * THREADS * (THREADS + 1) / 2) < 1e-6
+    assert peak == THREADS * 1e-3
+
+def test_histogram_metrics_agree(server):
+    hist = server.LatencyHistogram()
+    for ms in (0.5, 2.0, 2.0, 40.0): hist.add(ms / 1000.0)
+    buckets, count, total = server.histogram_buckets(hist)
+    assert count == 4 and abs(total - 0.0445) < 1e-12
+    assert [n for _, n in buckets] == sorted(n for _, n in buckets) and buckets[-1][1] == 4
+    summary = hist.summary()
+    assert summary["count"] == 4 and summary["max_ms"] == 40.0 and summary["p50_ms"] <= summary["p99_ms"] <= 40.0
+
+def test_counters_keep_every_increment(server):
+    counters = server.Counters("played")
+    hammer(lambda k, i: counters.inc(("played", f"STICK{k}")))
+    assert counters["played"] == THREADS * PER_THREAD
+
+def test_counters_fold_exited_threads(server):
+    counters = server.Counters("played", "dropped")
+    for k in range(50):  # Threads that come and go, like restarted workers
+        t = threading.Thread(target=lambda: [counters.inc(("played", f"STICK{k % 3}")) for _ in range(10)])
+        t.start()
+        t.join()
+    counters.inc("dropped")
+    assert len(counters.shards) == 1  # Only this thread's
+    assert counters.snapshot() == {"played": 0, "dropped": 1, ("played", "STICK0"): 170,
+                                   ("played", "STICK1"): 170, ("played", "STICK2"): 160}
+    counters.reset()
+    assert counters.totals() == {"played": 0, "dropped": 0}
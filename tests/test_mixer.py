@@ -0,0 +1,38 @@
+"""NumPy mixer bookkeeping and kit round robin, as the hit, vision and audio threads use them."""
+import threading
+
+import numpy as np
+
+def test_voice_mask_follows_voices(server, mixer, monkeypatch):
+    seen, allocate = [], mixer.voices.allocate
+    def recording(zone, busy):
+        seen.append(busy)
+        return allocate(zone, busy)
+    monkeypatch.setattr(mixer.voices, "allocate", recording)
+    for zone in ("KICK", "SNARE", "HI-HAT", "HI-HAT"): mixer.play(zone)  # The second hi-hat chokes the first
+    mixer.render()
+    assert all(busy is mixer.v_active for busy in seen)  # The live mask, no list built per hit
+    assert mixer.active_voices() == 3
+    assert mixer.v_active == (mixer.v_zone >= 0).tolist()
+    for _ in range(server.SAMPLE_RATE // 10 // mixer.block + 1): mixer.render()  # The clicks are 100 ms
+    assert mixer.active_voices() == 0 and not any(mixer.v_active) and (mixer.v_zone == -1).all()
+
+def test_render_mixes_only_active_voices(server, mixer):
+    mixer.play("KICK", 1.0)
+    out = mixer.render().copy()
+    assert np.abs(out).max() > 0
+    mixer.release(mixer.v_active.index(True))
+    assert not mixer.render().any()
+
+def test_round_robin_is_exact_across_threads(server):
+    kit = server.Kit()
+    kit.set("SNARE", ["a", "b", "c"])
+    picks, start = [], threading.Barrier(8)
+    def run():
+        start.wait()
+        mine = [kit.pick("SNARE", 1.0) for _ in range(3000)]
+        picks.extend(mine)
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert {take: picks.count(take) for take in "abc"} == {"a": 8000, "b": 8000, "c": 8000}
@@ -0,0 +1,56 @@
+"""Phone-side pose: recorded landmark streams through handle_pose_packet() into the tracker and zones."""
+import math
+
+T0 = 1000.0
+RIGHT_ELBOW, RIGHT_WRIST = (0.5, 0.9), (0.45, 0.75)  # Mirrored frame coordinates, as the zones see them
+
+def left_tip(t):
+    """The left stick tip circles the kit once every 4 s."""
+    return 0.5 + 0.35 * math.cos(math.pi / 2 * t), 0.5 + 0.35 * math.sin(math.pi / 2 * t)
+
+def landmark_stream(server, seconds=4.0, rate=30, delay=0.02):
+    """[(packet, receive time, left tip)] as the page sends them: unmirrored x, server-clock capture times."""
+    stream, ext = [], server.STICK_EXTENSION
+    for i in range(int(seconds * rate)):
+        t = i / rate
+        (tx, ty), (ex, ey) = left_tip(t), (0.5, 0.9)
+        wx, wy = (tx + ex * ext) / (1 + ext), (ty + ey * ext) / (1 + ext)  # Tip = wrist + (wrist - elbow) * ext
+        packet = server.PHONE_POSE_PACKET.pack(server.PHONE_POSE_MAGIC, 1, i, T0 + t,
+                                               1.0 - ex, ey, 1.0, 1.0 - wx, wy, 1.0,
+                                               1.0 - RIGHT_ELBOW[0], RIGHT_ELBOW[1], 1.0,
+                                               1.0 - RIGHT_WRIST[0], RIGHT_WRIST[1], 1.0)
+        stream.append((packet, T0 + t + delay, (tx, ty)))
+    return stream
+
+def replay(server, stream):
+    player, out = server.players[0], []
+    for packet, t_rx, tip in stream:
+        t_capture = server.handle_pose_packet(player, packet, t_rx)
+        out.append((t_capture, server.get_drum_zone(*tip), player.zone["LEFT"], player.zone["RIGHT"]))
+    return out
+
+def test_zones_follow_the_landmarks(server):
+    stream = landmark_stream(server)
+    out = replay(server, stream)
+    assert [t for t, *_ in out] == [server.PHONE_POSE_PACKET.unpack(p)[3] for p, _, _ in stream]
+    # The filter lags and predicts ahead, so a few packets at each zone border disagree
+    agreement = sum(expected == left for _, expected, left, _ in out) / len(out)
+    assert agreement >= 0.85
+    right = server.get_drum_zone(*server.extend_line(*RIGHT_ELBOW, *RIGHT_WRIST, server.STICK_EXTENSION))
+    assert {r for *_, r in out[5:]} == {right}
+
+def test_replay_is_deterministic(server):
+    stream = landmark_stream(server)
+    first = replay(server, stream)
+    server.players[0].reset()
+    assert replay(server, stream) == first
+
+def test_stale_and_malformed_packets_leave_zones_alone(server):
+    player = server.players[0]
+    stream = landmark_stream(server, seconds=1.0)
+    replay(server, stream)
+    zones, packet = dict(player.zone), stream[0][0]
+    assert server.handle_pose_packet(player, packet, T0 + server.PHONE_MAX_FRAME_AGE + 0.01) is None
+    assert server.handle_pose_packet(player, packet[:-1], T0) is None
+    assert server.handle_pose_packet(player, b"XX" + packet[2:], T0) is None
+    assert player.zone == zones
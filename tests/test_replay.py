@@ -0,0 +1,34 @@
+"""Session recorder and replay harness: same recording, same zone decisions."""
+import pytest
+
+def test_reader_returns_what_was_recorded(server, tmp_path):
+    path = str(tmp_path / "session.sdr")
+    records = [(server.REC_HIT, 10.0 + i, b"HIT:LEFT:%d" % i) for i in range(5)] + [(server.REC_POSE, 20.0, b"x" * 100)]
+    rec = server.SessionRecorder(path)
+    for kind, wall, payload in records: rec.add(kind, wall, payload)
+    rec.close()
+    with open(path, "ab") as f: f.write(server.REC_HEADER.pack(50, server.REC_HIT, 0.0, 0.0) + b"torn")
+    reader = server.SessionReader(path)
+    try:
+        assert [(kind, wall, bytes(payload)) for kind, mono, wall, payload in (reader[i] for i in range(len(reader)))] == records
+    finally:
+        reader.close()
+
+def test_replay_digest_is_stable(server, bench, mixer, tmp_path):
+    path = str(tmp_path / "session.sdr")
+    expected = bench.pipeline.record_synthetic_session(path, seconds=4.0, camera_fps=0)
+    runs = [server.replay_session(path) for _ in range(3)]
+    assert runs[0]["records"] == {"pose": 120, "hit": 18}
+    assert len({run["digest"] for run in runs}) == 1
+    assert runs[0]["decisions"] == runs[2]["decisions"]
+    hits = [(expected[t], zone) for kind, t, stick, zone in runs[0]["decisions"] if kind == server.REC_HIT]
+    assert len(hits) == 18 and sum(a == b for a, b in hits) / len(hits) >= 0.75
+
+def test_replay_with_camera_frames_is_deterministic(server, bench, mixer, tmp_path):
+    inference = server.players[0].inference
+    if not inference.usable(inference.level): pytest.skip("pose model unavailable (first run offline?)")
+    path = str(tmp_path / "session.sdr")
+    bench.pipeline.record_synthetic_session(path, seconds=2.0, camera_fps=5)
+    runs = [server.replay_session(path) for _ in range(2)]
+    assert runs[0]["records"]["camera"] == 10
+    assert runs[0]["digest"] == runs[1]["digest"]
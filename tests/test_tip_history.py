@@ -0,0 +1,48 @@
+"""Tip history: lock-free snapshots never return a slot the writer is filling."""
+import numpy as np
+import pytest
+
+def racing_history(server, size=8):
+    """A TipHistory whose writer gets in right after a snapshot reads `count`.
+
+    It publishes one more frame and writes the time of the frame after that,
+    leaving its position and the count for later, as a writer in another
+    process can.
+    """
+    class Racing(server.TipHistory):
+        race = False
+
+        @property
+        def count(self):
+            c = int(self.counter[0])
+            if self.race:
+                self.race = False
+                t = self.t[(c - 1) % self.size]
+                self.push(t + 0.01, 9.0, 9.0)
+                self.t[(c + 1) % self.size] = t + 0.02
+            return c
+
+    return Racing(size)
+
+@pytest.mark.parametrize("frames", [3, 7, 8, 9, 20, 21])
+def test_snapshot_skips_the_slots_being_written(server, frames):
+    history = racing_history(server)
+    for i in range(frames): history.push(i * 0.01, 0.1 * i, 0.5)
+    history.race = True
+    t, xy = history.snapshot()
+    assert (np.diff(t) > 0).all() and t[-1] == pytest.approx((frames - 1) * 0.01)
+    assert len(t) == min(frames, history.size - 2) and (xy[:, 0] < 9.0).all()
+
+def test_position_at_interpolates_a_raced_snapshot(server):
+    history = racing_history(server)
+    for i in range(20): history.push(i * 0.01, 0.1 * i, 0.5)
+    history.race = True
+    x, y = history.position_at(0.185)
+    assert x == pytest.approx(1.85) and y == pytest.approx(0.5)
+
+def test_snapshot_needs_a_frame(server):
+    history = server.TipHistory(8)
+    assert history.snapshot() is None and history.position_at(0.0) is None
+    history.push(1.0, 0.2, 0.3)
+    t, xy = history.snapshot()
+    assert t.tolist() == [1.0] and xy.tolist() == [[0.2, 0.3]]
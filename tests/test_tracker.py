@@ -0,0 +1,57 @@
+"""Tip tracker: prediction PREDICTION_MS ahead at any frame rate, at least as accurate as the old per-frame filter."""
+import numpy as np
+import pytest
+
+from bench.vision import drumming_tip, legacy_tip_predictions
+
+BOTH = np.array([True, True])
+
+def recorded_stream(fps, noise, seconds=20.0, seed=7):
+    """Drumming tips as a camera delivers them: capture-time jitter, ~10% of frames lost, landmark noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(0.0, seconds, 1.0 / fps)
+    t = np.sort((t + rng.uniform(-0.003, 0.003, len(t)))[rng.random(len(t)) > 0.1])
+    tips = np.stack(drumming_tip(t), axis=1) + rng.normal(0.0, noise, (len(t), 2))
+    return t, tips
+
+def track(server, mode, t, tips):
+    tracker, z, pred = server.TipTracker(mode=mode), np.zeros((2, 2)), np.zeros((len(t), 2))
+    for i, tip in enumerate(tips):
+        z[:] = tip
+        tracker.update(t[i], z, BOTH)
+        pred[i] = tracker.predict(server.PREDICTION_MS / 1000.0)[0]
+    return pred
+
+def rmse(server, pred, t):
+    true = np.stack(drumming_tip(t + server.PREDICTION_MS / 1000.0), axis=1)
+    return float(np.sqrt(np.mean(np.sum((pred - true) ** 2, axis=1))))
+
+def test_default_look_ahead_matches_the_old_one_at_60_fps(server):
+    assert server.PREDICTION_MS == pytest.approx(4 * 1000.0 / 60, abs=1.0)
+
+@pytest.mark.parametrize("noise", [0.01, 0.02])
+@pytest.mark.parametrize("fps", [20, 30, 60])
+@pytest.mark.parametrize("mode", ["alpha-beta", "kalman"])
+def test_more_accurate_than_legacy(server, mode, fps, noise):
+    t, tips = recorded_stream(fps, noise)
+    legacy = rmse(server, legacy_tip_predictions(tips), t)
+    assert rmse(server, track(server, mode, t, tips), t) < legacy
+
+@pytest.mark.parametrize("fps", [20, 60])
+@pytest.mark.parametrize("mode", ["alpha-beta", "kalman"])
+def test_look_ahead_is_in_milliseconds(server, mode, fps):
+    t = np.arange(0.0, 3.0, 1.0 / fps)
+    tips = np.stack([0.2 + 0.1 * t, 0.5 + 0.05 * t], axis=1)  # Constant velocity, no noise
+    pred = track(server, mode, t, tips)
+    ahead = t[-1] + server.PREDICTION_MS / 1000.0
+    np.testing.assert_allclose(pred[-1], [0.2 + 0.1 * ahead, 0.5 + 0.05 * ahead], atol=1e-3)
+
+def test_arms_update_independently_and_restart_after_a_gap(server):
+    tracker = server.TipTracker()
+    tracker.update(0.0, np.array([[0.2, 0.2], [0.8, 0.8]]), BOTH)
+    tracker.update(0.02, np.array([[0.3, 0.2], [0.0, 0.0]]), np.array([True, False]))
+    assert tracker.t.tolist() == [0.02, 0.0]
+    assert tracker.state[1].tolist() == [0.8, 0.8, 0.0, 0.0]
+    gap = 0.02 + server.TRACK_RESET_AFTER + 0.1
+    tracker.update(gap, np.array([[0.6, 0.7], [0.0, 0.0]]), np.array([True, False]))
+    assert tracker.state[0].tolist() == [0.6, 0.7, 0.0, 0.0]
@@ -0,0 +1,55 @@
+"""Voice allocation under a hit burst: nothing dropped, kick and snare never cut by a lower-priority drum."""
+import collections
+
+import numpy as np
+import pytest
+
+LENGTHS = {"KICK": 0.6, "SNARE": 0.5, "HI-HAT": 0.4, "FLOOR TOM": 1.0, "CRASH": 4.0, "RIDE": 3.0}  # Seconds, as in --bench voices
+
+def voice_manager(server):
+    voices = server.VoiceManager(server.MAX_VOICES)
+    for zone in LENGTHS: voices.add_zone(zone)
+    return voices
+
+def play(voices, t, zone, ends, cuts):
+    """One hit at `t`; voices ring until their sample ends or something stops them."""
+    held, stolen = list(voices.zone), voices.stats["stolen"]
+    v, stop = voices.allocate(zone, [end > t for end in ends])
+    if voices.stats["stolen"] > stolen: cuts[(zone, held[v])] += 1  # A choked voice is free again, not stolen
+    for s in stop: ends[s] = t
+    if v is not None: ends[v] = t + LENGTHS[zone]
+    return v
+
+def burst(server, hits, rate, seed=0, zones=tuple(LENGTHS)):
+    voices, ends, cuts = voice_manager(server), [0.0] * server.MAX_VOICES, collections.Counter()
+    rng = np.random.default_rng(seed)
+    for i in range(hits): play(voices, i / rate, zones[int(rng.integers(len(zones)))], ends, cuts)
+    return voices, cuts
+
+def protected_cuts(server, cuts):
+    priority = lambda zone: server.VOICE_GROUPS[zone][1]
+    return sum(n for (thief, victim), n in cuts.items()
+               if victim in ("KICK", "SNARE") and priority(thief) < priority(victim))
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("rate", [40.0, 200.0])
+def test_burst_drops_nothing_and_spares_kick_and_snare(server, rate, seed):
+    voices, cuts = burst(server, 400, rate, seed)
+    totals = voices.stats.totals()
+    assert totals["dropped"] == 0 and totals["played"] == 400
+    assert protected_cuts(server, cuts) == 0
+    if rate == 200.0: assert sum(cuts.values()) > 0  # Dense enough that stealing really happens
+
+def test_cymbal_roll_cannot_take_reserved_drum_voices(server):
+    voices, ends, cuts = voice_manager(server), [0.0] * server.MAX_VOICES, collections.Counter()
+    for i, zone in enumerate(["KICK", "KICK", "SNARE", "SNARE", "SNARE"]): play(voices, i * 1e-3, zone, ends, cuts)
+    for i in range(200): play(voices, 0.01 + i * 1e-3, "CRASH" if i % 2 else "RIDE", ends, cuts)
+    assert sorted(z for z, end in zip(voices.zone, ends) if end > 0.2 and z in ("KICK", "SNARE")) == ["KICK"] * 2 + ["SNARE"] * 3
+    assert protected_cuts(server, cuts) == 0 and voices.stats.totals()["dropped"] == 0
+
+def test_hi_hat_chokes_itself(server):
+    voices, ends, cuts = voice_manager(server), [0.0] * server.MAX_VOICES, collections.Counter()
+    play(voices, 0.0, "HI-HAT", ends, cuts)
+    play(voices, 0.05, "HI-HAT", ends, cuts)
+    assert [end for end in ends if end > 0.06] == [pytest.approx(0.45)]  # Only the new hit rings
+    assert voices.stats.snapshot()[("choked", "HI-HAT")] == 1 and not cuts
@@ -0,0 +1,55 @@
+"""Zone layouts: the label map matches the pads it was built from, and hot swaps never leave a gap."""
+import time
+
+import numpy as np
+import pytest
+
+SHAPES = {"default": "SNARE", "pads": [
+    {"zone": "RIDE", "polygon": [[0.1, 0.1], [0.9, 0.2], [0.5, 0.95]]},
+    {"zone": "TOM 1", "circle": [0.5, 0.5, 0.1]},
+    {"zone": "CRASH", "rect": [-0.2, -0.2, 0.2, 0.2]},
+]}
+
+def if_chain(server, x, y):
+    """The zone lookup before layouts existed."""
+    if y < server.CYMBAL_HEIGHT: return "CRASH" if x < server.DIVIDER_2 else "RIDE"
+    if x < server.DIVIDER_1: return "HI-HAT"
+    return "SNARE" if x < server.DIVIDER_2 else "FLOOR TOM"
+
+def wait_for_swap(layout, swaps, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while layout.swaps == swaps and layout.building and time.monotonic() < deadline: time.sleep(0.001)
+
+def test_default_kit_matches_the_old_if_chain(server):
+    layout = server.ZoneLayout()
+    points = np.random.default_rng(0).random((20000, 2)).tolist()
+    assert all(layout.zone_at(x, y) == if_chain(server, x, y) for x, y in points)
+
+def test_pads_and_paint_order(server):
+    layout = server.ZoneLayout(SHAPES, (360, 640))
+    assert layout.zone_at(0.5, 0.5) == "TOM 1"      # Circle over the polygon
+    assert layout.zone_at(0.5, 0.65) == "TOM 1"     # Radius is in frame widths: 0.1 * 640 / 360 of the height
+    assert layout.zone_at(0.62, 0.5) == "RIDE"
+    assert layout.zone_at(0.5, 0.7) == "RIDE"
+    assert layout.zone_at(0.05, 0.05) == "CRASH"    # Rect hanging off the frame
+    assert layout.zone_at(-1.0, -1.0) == "CRASH"    # Off-frame lookups clamp to the border
+    assert layout.zone_at(0.9, 0.9) == "SNARE"      # Uncovered
+
+@pytest.mark.parametrize("shape", [(360, 640), (37, 51)])
+def test_chunked_raster_matches_one_pass(server, shape):
+    one = server.rasterize_zones(SHAPES, shape, rows_per_chunk=shape[0])
+    for rows in (1, 7, server.ZONE_RASTER_ROWS):
+        chunked = server.rasterize_zones(SHAPES, shape, rows_per_chunk=rows)
+        assert chunked[:4] == one[:4]
+        np.testing.assert_array_equal(chunked[5], one[5])
+
+def test_hot_swap_and_rejected_layouts(server):
+    layout = server.ZoneLayout(shape=(90, 160))
+    layout.request(layout=SHAPES, shape=(180, 320))
+    wait_for_swap(layout, 0)
+    assert layout.swaps == 1 and layout.zone_at(0.5, 0.5) == "TOM 1"
+    layout.request(layout={"pads": [{"zone": "COWBELL"}]})  # No shape: keeps the last good map
+    wait_for_swap(layout, 1)
+    assert layout.swaps == 1 and layout.layout is SHAPES and not layout.building
+    with pytest.raises(ValueError):
+        server.rasterize_zones({"pads": [{"zone": str(i), "rect": [0, 0, 1, 1]} for i in range(256)]}, (4, 4))